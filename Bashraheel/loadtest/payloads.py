@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic stores, products and invoice payloads for the load tests.
+"""
+
+import random
+from datetime import datetime
+
+STORE_PREFIX = "LOADTEST-STORE-"
+PRODUCT_PREFIX = "LOADTEST-SKU-"
+
+
+def store_ids(count):
+    """Ids of the synthetic stores, see setup_stores.py."""
+    return ["%s%03d" % (STORE_PREFIX, index) for index in range(1, count + 1)]
+
+
+def product_catalog(count=200, seed=42):
+    """Synthetic products as (sku, unit price)."""
+    rng = random.Random(seed)
+    return [
+        ("%s%04d" % (PRODUCT_PREFIX, index), round(rng.uniform(5, 500), 2))
+        for index in range(1, count + 1)
+    ]
+
+
+def make_invoice(invoice_no, store_id, products, lines, rng):
+    """One out_invoice with `lines` random lines, in the /invoice/create format."""
+    now = datetime.now()
+    return {
+        "invoiceNo": invoice_no,
+        "move_type": "out_invoice",
+        "documentDate": now.strftime("%Y-%m-%d"),
+        "thirdparty_sa_confirmation_datetime": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "store": {"id": store_id},
+        "lines": [
+            {
+                "skuCode": sku,
+                "qty": rng.randint(1, 5),
+                "sellingPrice": price,
+                "discount": rng.choice([0, 0, 0, 5, 10]),
+            }
+            for sku, price in rng.sample(products, lines)
+        ],
+    }
+
+
+def make_batch(run_id, request_no, batch_size, stores, products, lines, rng):
+    """A create request body with `batch_size` invoices of one random store."""
+    store_id = rng.choice(stores)
+    return {
+        "invoiceList": [
+            make_invoice("LT-%s-%06d-%03d" % (run_id, request_no, index), store_id, products, lines, rng)
+            for index in range(batch_size)
+        ]
+    }
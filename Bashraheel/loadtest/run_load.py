@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+"""
+Asyncio load test of the invoice creation APIs.
+
+Sends synthetic invoice batches to /api/v1/invoice/create (FastAPI, JWT) or
+/api/create_odoo_invoice (JSON-RPC, API key) with a fixed number of
+concurrent clients, then reports p50/p95/p99 latency, invoices per second
+and, with --dsn, the PostgreSQL connections of the database during the run.
+
+    python run_load.py --target fastapi --login pos --password secret --concurrency 20 --requests 500
+    python run_load.py --target jsonrpc --api-key KEY --batch-size 50 --dsn "dbname=bashraheel"
+
+Exits with status 1 when --max-p95-ms or --min-invoices-per-sec is not met,
+so it can guard against regressions in CI.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+import httpx
+
+from payloads import make_batch, product_catalog, store_ids
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+
+class ConnectionMonitor(threading.Thread):
+    """Sample pg_stat_activity of the database while the load runs."""
+
+    QUERY = """
+        SELECT count(*), count(*) FILTER (WHERE state = 'active')
+        FROM pg_stat_activity WHERE datname = current_database()
+    """
+
+    def __init__(self, dsn, interval=0.5):
+        super().__init__(daemon=True)
+        self.dsn = dsn
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        connection = psycopg2.connect(self.dsn)
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cr:
+                while not self._stop_event.is_set():
+                    cr.execute(self.QUERY)
+                    self.samples.append(cr.fetchone())
+                    self._stop_event.wait(self.interval)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        total = [sample[0] for sample in self.samples]
+        active = [sample[1] for sample in self.samples]
+        return {
+            "db_connections_max": max(total),
+            "db_connections_avg": round(statistics.mean(total), 1),
+            "db_active_max": max(active),
+            "db_active_avg": round(statistics.mean(active), 1),
+        }
+
+
+class LoadTest:
+
+    def __init__(self, options):
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self.stores = store_ids(options.stores)
+        self.products = product_catalog()
+        self.run_id = uuid.uuid4().hex[:8]
+        self.latencies = []
+        self.invoices_ok = 0
+        self.invoices_failed = 0
+        self.status_counts = {}
+        self._next_request = 0
+
+    async def _get_headers(self, client):
+        if self.options.target == "jsonrpc":
+            if self.options.api_key_header:
+                return {self.options.api_key_header: self.options.api_key}
+            return {"Authorization": "Bearer %s" % self.options.api_key}
+        response = await client.post("/api/v1/auth/login", json={
+            "login": self.options.login,
+            "password": self.options.password,
+            "long_lived": True,
+        })
+        response.raise_for_status()
+        return {"Authorization": "Bearer %s" % response.json()["data"]["access_token"]}
+
+    def _count_results(self, response):
+        self.status_counts[response.status_code] = self.status_counts.get(response.status_code, 0) + 1
+        if response.status_code != 200:
+            self.invoices_failed += self.options.batch_size
+            return
+        body = response.json()
+        if self.options.target == "jsonrpc":
+            body = body.get("result") or {}
+        items = body.get("data") or []
+        ok = sum(1 for item in items if item.get("status") == "success")
+        self.invoices_ok += ok
+        self.invoices_failed += self.options.batch_size - ok
+
+    async def _client(self, client, headers, path, deadline):
+        while True:
+            if self._next_request >= self.options.requests or time.monotonic() > deadline:
+                return
+            request_no = self._next_request
+            self._next_request += 1
+            body = make_batch(
+                self.run_id, request_no, self.options.batch_size,
+                self.stores, self.products, self.options.lines, self.rng,
+            )
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=body, headers=headers)
+            except httpx.HTTPError as e:
+                self.status_counts[type(e).__name__] = self.status_counts.get(type(e).__name__, 0) + 1
+                self.invoices_failed += self.options.batch_size
+                continue
+            self.latencies.append((time.perf_counter() - start) * 1000)
+            self._count_results(response)
+
+    async def run(self):
+        path = "/api/v1/invoice/create" if self.options.target == "fastapi" else "/api/create_odoo_invoice"
+        limits = httpx.Limits(max_connections=self.options.concurrency)
+        async with httpx.AsyncClient(base_url=self.options.url, timeout=self.options.timeout, limits=limits) as client:
+            headers = await self._get_headers(client)
+            deadline = time.monotonic() + (self.options.duration or float("inf"))
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                self._client(client, headers, path, deadline) for _i in range(self.options.concurrency)
+            ))
+            return time.perf_counter() - start
+
+    def summary(self, elapsed):
+        result = {
+            "target": self.options.target,
+            "concurrency": self.options.concurrency,
+            "batch_size": self.options.batch_size,
+            "requests": len(self.latencies),
+            "elapsed_s": round(elapsed, 2),
+            "invoices_ok": self.invoices_ok,
+            "invoices_failed": self.invoices_failed,
+            "invoices_per_sec": round(self.invoices_ok / elapsed, 2) if elapsed else 0.0,
+            "status_counts": {str(key): value for key, value in self.status_counts.items()},
+        }
+        if len(self.latencies) >= 2:
+            percentiles = statistics.quantiles(self.latencies, n=100)
+            result.update({
+                "latency_p50_ms": round(percentiles[49], 1),
+                "latency_p95_ms": round(percentiles[94], 1),
+                "latency_p99_ms": round(percentiles[98], 1),
+                "latency_max_ms": round(max(self.latencies), 1),
+            })
+        return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8069", help="Odoo base URL")
+    parser.add_argument("--target", choices=["fastapi", "jsonrpc"], default="fastapi")
+    parser.add_argument("--login", help="API user login (fastapi)")
+    parser.add_argument("--password", help="API user password (fastapi)")
+    parser.add_argument("--api-key", help="Odoo API key (jsonrpc)")
+    parser.add_argument("--api-key-header", help="Send the API key raw in this header instead of Authorization: Bearer")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="Total create requests")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--batch-size", type=int, default=1, help="Invoices per request")
+    parser.add_argument("--lines", type=int, default=3, help="Lines per invoice")
+    parser.add_argument("--stores", type=int, default=10, help="Synthetic stores, see setup_stores.py")
+    parser.add_argument("--timeout", type=float, default=120, help="Request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--dsn", help="PostgreSQL DSN of the Odoo database to sample connection usage")
+    parser.add_argument("--json", dest="json_path", help="Also write the summary to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail when p95 latency is above this")
+    parser.add_argument("--min-invoices-per-sec", type=float, help="Fail when throughput is below this")
+    options = parser.parse_args(argv)
+    if options.target == "fastapi" and not (options.login and options.password):
+        parser.error("--login and --password are required for the fastapi target")
+    if options.target == "jsonrpc" and not options.api_key:
+        parser.error("--api-key is required for the jsonrpc target")
+    if options.dsn and psycopg2 is None:
+        parser.error("--dsn requires psycopg2")
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    monitor = ConnectionMonitor(options.dsn) if options.dsn else None
+    if monitor:
+        monitor.start()
+    load_test = LoadTest(options)
+    try:
+        elapsed = asyncio.run(load_test.run())
+    finally:
+        if monitor:
+            monitor.stop()
+
+    summary = load_test.summary(elapsed)
+    if monitor:
+        summary.update(monitor.summary())
+    print(json.dumps(summary, indent=2))
+    if options.json_path:
+        with open(options.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    failures = []
+    if options.max_p95_ms is not None and summary.get("latency_p95_ms", float("inf")) > options.max_p95_ms:
+        failures.append("p95 latency %s ms > %s ms" % (summary.get("latency_p95_ms"), options.max_p95_ms))
+    if options.min_invoices_per_sec is not None and summary["invoices_per_sec"] < options.min_invoices_per_sec:
+        failures.append("%s invoices/s < %s" % (summary["invoices_per_sec"], options.min_invoices_per_sec))
+    for failure in failures:
+        print("FAILED: %s" % failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+Create the sales journals and products of the synthetic load-test stores (XML-RPC).
+
+Products get the company's 15% sales tax, as ZATCA requires a VAT category
+on every line; invoices for an unknown SKU are rejected by the API. New
+journals are onboarded to ZATCA, i.e. to the stub Odoo is pointed at.
+
+    python setup_stores.py --url http://localhost:8069 --db bashraheel --login admin --password admin --stores 10
+"""
+
+import argparse
+import sys
+import xmlrpc.client
+
+from payloads import product_catalog, store_ids
+
+SALES_TAX_DOMAIN = [("type_tax_use", "=", "sale"), ("amount_type", "=", "percent"), ("amount", "=", 15.0)]
+
+
+def setup_products(call, products):
+    """Create the missing LOADTEST-SKU-* products; return how many were created."""
+    taxes = call("account.tax", "search", SALES_TAX_DOMAIN, limit=1)
+    if not taxes:
+        sys.exit("No 15% sales tax found: install the Saudi chart of accounts on the load-test company")
+    skus = [sku for sku, _price in products]
+    existing = {
+        product["default_code"]
+        for product in call("product.product", "search_read", [("default_code", "in", skus)], fields=["default_code"])
+    }
+    missing = [
+        {
+            "name": "Load Test %s" % sku,
+            "default_code": sku,
+            "type": "consu",
+            "list_price": price,
+            "taxes_id": [(6, 0, taxes)],
+        }
+        for sku, price in products
+        if sku not in existing
+    ]
+    if missing:
+        call("product.product", "create", missing)
+    return len(missing)
+
+
+def onboard_journal(call, journal_id):
+    """Onboard a journal as the "Onboard Journal" button does; any OTP is accepted by the stub."""
+    context = {"active_model": "account.journal", "active_id": journal_id, "active_ids": [journal_id]}
+    wizard_id = call("l10n_sa_edi.otp.wizard", "create", {"l10n_sa_otp": "123456"}, context=context)
+    call("l10n_sa_edi.otp.wizard", "validate", [wizard_id], context=context)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8069")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--login", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--stores", type=int, default=10)
+    options = parser.parse_args()
+
+    common = xmlrpc.client.ServerProxy("%s/xmlrpc/2/common" % options.url)
+    uid = common.authenticate(options.db, options.login, options.password, {})
+    models = xmlrpc.client.ServerProxy("%s/xmlrpc/2/object" % options.url, allow_none=True)
+
+    def call(model, method, *args, **kwargs):
+        return models.execute_kw(options.db, uid, options.password, model, method, list(args), kwargs)
+
+    for index, store_id in enumerate(store_ids(options.stores), start=1):
+        if call("account.journal", "search", [("thirdparty_store_id", "=", store_id)], limit=1):
+            continue
+        journal_id = call("account.journal", "create", {
+            "name": "Load Test %s" % store_id,
+            "code": "LT%03d" % index,
+            "type": "sale",
+            "thirdparty_store_id": store_id,
+            "l10n_sa_serial_number": "LOADTEST-%03d" % index,
+        })
+        print("Created journal for %s" % store_id)
+        try:
+            onboard_journal(call, journal_id)
+        except xmlrpc.client.Fault as e:
+            print("Could not onboard the journal of %s, onboard it from its form: %s" % (store_id, e.faultString))
+
+    created = setup_products(call, product_catalog())
+    print("Created %d products" % created)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+Local stub of the ZATCA e-invoicing API with configurable latency and error rate.
+
+Answers the calls l10n_sa_edi makes, so the real EDI path (UBL build,
+signature, invoice chain) runs against it:
+
+- POST /compliance                  compliance CSID, issued from the journal's CSR
+- POST /compliance/invoices         compliance checks of the onboarding
+- POST /production/csids            production CSID
+- POST /invoices/reporting/single   simplified invoices (B2C)
+- POST /invoices/clearance/single   standard invoices (B2B), cleared as sent
+
+Point Odoo at it with `bashraheel_zatca_api_url = http://127.0.0.1:8099/` in
+odoo.conf. GET /stats returns the number of requests served per endpoint.
+
+    python zatca_stub.py --port 8099 --latency-ms 300 --jitter-ms 200 --error-rate 0.01
+"""
+
+import argparse
+import base64
+import datetime
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+PASS_RESULTS = {
+    "infoMessages": [{
+        "type": "INFO",
+        "code": "XSD_ZATCA_VALID",
+        "category": "XSD validation",
+        "message": "Complied with UBL 2.1 standards in line with ZATCA specifications",
+        "status": "PASS",
+    }],
+    "warningMessages": [],
+    "errorMessages": [],
+    "status": "PASS",
+}
+
+
+class CertificateAuthority:
+    """Issues CSIDs: certificates for the CSR's key, signed by a throwaway CA."""
+
+    def __init__(self):
+        self.key = ec.generate_private_key(ec.SECP256K1())
+        self.name = x509.Name([
+            x509.NameAttribute(NameOID.COUNTRY_NAME, "SA"),
+            x509.NameAttribute(NameOID.ORGANIZATION_NAME, "ZATCA Stub"),
+            x509.NameAttribute(NameOID.COMMON_NAME, "ZATCA Stub CA"),
+        ])
+
+    def issue(self, csr_b64):
+        """Return the binarySecurityToken of a certificate for the given CSR."""
+        csr = base64.b64decode(csr_b64)
+        if not csr.lstrip().startswith(b"-----BEGIN"):
+            csr = base64.b64decode(csr)
+        request = x509.load_pem_x509_csr(csr)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(request.subject)
+            .issuer_name(self.name)
+            .public_key(request.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=365))
+            .sign(self.key, hashes.SHA256())
+        )
+        # Like ZATCA: base64 of the base64 encoded DER certificate
+        der = certificate.public_bytes(serialization.Encoding.DER)
+        return base64.b64encode(base64.b64encode(der)).decode()
+
+
+class ZatcaStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, options):
+        super().__init__(address, ZatcaStubHandler)
+        self.options = options
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.authority = CertificateAuthority()
+        self.csrs = {}
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+
+class ZatcaStubHandler(BaseHTTPRequestHandler):
+    server_version = "ZatcaStub/2.0"
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _csid(self, csr):
+        request_id = random.randint(10 ** 12, 10 ** 13 - 1)
+        with self.server.lock:
+            self.server.csrs[request_id] = csr
+        return {
+            "requestID": request_id,
+            "dispositionMessage": "ISSUED",
+            "binarySecurityToken": self.server.authority.issue(csr),
+            "secret": uuid.uuid4().hex,
+        }
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.server.lock:
+                self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_json(404, {"message": "Not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = {}
+        path = self.path.split("?")[0].strip("/")
+        self.server.count(path)
+
+        # Onboarding is not timed: answer at once
+        if path == "compliance":
+            if not body.get("csr"):
+                return self._send_json(400, {"errors": ["Missing CSR"]})
+            return self._send_json(200, self._csid(body["csr"]))
+        if path == "production/csids":
+            # The production CSID is issued for the key of the compliance one
+            with self.server.lock:
+                csr = self.server.csrs.get(int(body.get("compliance_request_id") or 0))
+            if not csr:
+                return self._send_json(400, {"errors": ["Unknown compliance request"]})
+            return self._send_json(200, self._csid(csr))
+        if path == "compliance/invoices":
+            return self._send_json(200, {
+                "validationResults": PASS_RESULTS,
+                "reportingStatus": "REPORTED",
+                "clearanceStatus": "CLEARED",
+            })
+        if path not in ("invoices/reporting/single", "invoices/clearance/single"):
+            return self._send_json(404, {"message": "Not found"})
+
+        options = self.server.options
+        time.sleep((options.latency_ms + random.uniform(0, options.jitter_ms)) / 1000.0)
+        if random.random() < options.error_rate:
+            self.server.count("errors")
+            return self._send_json(503, {"message": "Simulated ZATCA outage"})
+        if path == "invoices/reporting/single":
+            return self._send_json(200, {"validationResults": PASS_RESULTS, "reportingStatus": "REPORTED"})
+        self._send_json(200, {
+            "validationResults": PASS_RESULTS,
+            "clearanceStatus": "CLEARED",
+            # ZATCA returns the invoice with its stamp; the stub returns it as sent
+            "clearedInvoice": body.get("invoice"),
+        })
+
+    def log_message(self, format, *args):
+        if not self.server.options.quiet:
+            super().log_message(format, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=300, help="Base latency of every invoice submission")
+    parser.add_argument("--jitter-ms", type=float, default=200, help="Random extra latency, uniform")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of submissions answered with 503")
+    parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+    options = parser.parse_args()
+
+    server = ZatcaStubServer((options.host, options.port), options)
+    print("ZATCA stub listening on http://%s:%d/" % (options.host, options.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
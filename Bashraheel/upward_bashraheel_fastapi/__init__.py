@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
 
 from . import controllers
+from . import fastapi_dispatcher
+from . import models
 from . import services
@@ -19,7 +19,10 @@
     'category': 'Accounting/Localizations/EDI',
     'depends': ['base', 'fastapi', 'upward_bashraheel_invoice_integration'],
     'data': [
+        'security/ir_model_access.xml',
+        'data/res_users.xml',
         'data/fastapi_endpoint.xml',
+        'data/ir_cron.xml',
     ],
     'demo': [],
     'external_dependencies': {
@@ -5,14 +5,20 @@ JWT Authentication dependencies for FastAPI endpoints.
 """
 
 import logging
-from fastapi import Depends
+from typing import Annotated
+
+from fastapi import Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from odoo import api
+from odoo.api import Environment
+from starlette.concurrency import run_in_threadpool
+
+from odoo.addons.fastapi.dependencies import odoo_env
 
-from ..core.constants import SERVICE_JWT, TOKEN_TYPE_ACCESS
+from ..core.constants import SERVICE_JWT, TOKEN_TYPE_ACCESS, MODEL_RATE_LIMIT_BUCKET
 from ..core.exceptions import (
     InvalidOrExpiredTokenError,
     JWTUnauthorizedError,
+    RateLimitExceededError,
     UserInactive,
 )
 
@@ -27,26 +33,27 @@ bearer_scheme = HTTPBearer(
 )
 
 
-def create_jwt_auth_dependency(registry, uid, context):
+def create_jwt_auth_dependency():
     """
     Factory function to create a JWT authentication dependency.
 
-    Args:
-        registry: Odoo registry
-        uid: User ID
-        context: Odoo context
+    The token is checked on the dispatcher env without extra queries: the
+    signing key and each user's active flag are ormcached and dropped by Odoo's
+    cache invalidation (signalled to the other workers) when they change.
 
     Returns:
         Callable: FastAPI dependency function that validates JWT and returns auth context
     """
 
     def verify_jwt_token(
+        env: Annotated[Environment, Depends(odoo_env)],
         credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
     ) -> dict:
         """
         Verify JWT token and return authentication context.
 
         Args:
+            env: Odoo environment of the dispatcher
             credentials: HTTP Authorization credentials (Bearer token)
 
         Returns:
@@ -62,29 +69,61 @@ def create_jwt_auth_dependency(registry, uid, context):
 
         token = credentials.credentials
 
-        with registry.cursor() as cr:
-            env = api.Environment(cr, 1, context)
-            jwt_service = env[SERVICE_JWT]
+        jwt_service = env[SERVICE_JWT]
 
-            # Validate the token
-            payload = jwt_service.validate_token(token, TOKEN_TYPE_ACCESS)
+        # Validate the token
+        payload = jwt_service.validate_token(token, TOKEN_TYPE_ACCESS)
 
-            user_id = payload.get("user_id")
-            partner_id = payload.get("partner_id")
-            email = payload.get("email")
+        user_id = payload.get("user_id")
+        partner_id = payload.get("partner_id")
+        email = payload.get("email")
 
-            if not user_id:
-                raise InvalidOrExpiredTokenError("Invalid token payload")
+        if not user_id:
+            raise InvalidOrExpiredTokenError("Invalid token payload")
 
-            # Verify user is still active
-            user = env["res.users"].sudo().browse(user_id)
-            if not user.exists() or not user.active:
-                raise UserInactive("User account is inactive")
+        # Verify user is still active
+        if not jwt_service.is_user_active(user_id):
+            raise UserInactive("User account is inactive")
 
-            return {
-                "user_id": user_id,
-                "partner_id": partner_id,
-                "email": email,
-            }
+        return {
+            "user_id": user_id,
+            "partner_id": partner_id,
+            "email": email,
+        }
 
     return verify_jwt_token
+
+
+def create_rate_limit_dependency(jwt_auth):
+    """
+    Factory function to create the rate limit dependency of invoice creation.
+
+    Takes one token from the bucket of the JWT subject and of every store
+    in the invoice list. The buckets live in the database, so the limits
+    hold across all Odoo workers.
+
+    Args:
+        jwt_auth: JWT authentication dependency providing the subject
+
+    Returns:
+        Callable: FastAPI dependency raising a 429 with Retry-After when throttled
+    """
+
+    async def enforce_rate_limit(
+        request: Request,
+        env: Annotated[Environment, Depends(odoo_env)],
+        auth: dict = Depends(jwt_auth),
+    ) -> None:
+        try:
+            body = await request.json()
+        except ValueError:
+            # Left to the request validation of the endpoint
+            body = {}
+
+        buckets = env[MODEL_RATE_LIMIT_BUCKET].sudo()
+        keys = buckets._get_request_keys(body, auth.get("user_id"))
+        retry_after = await run_in_threadpool(buckets._consume, keys)
+        if retry_after:
+            raise RateLimitExceededError(retry_after)
+
+    return enforce_rate_limit
@@ -1,13 +1,16 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 
 import logging
 
+from ..core.constants import GZIP_MINIMUM_SIZE, ROUTING_TYPE_BASHRAHEEL
 from ..routers.invoice_router import create_invoice_router
 from ..routers.auth_router import create_auth_router
+from ..utils.middlewares import ServerTimingMiddleware
 
 _logger = logging.getLogger(__name__)
 
@@ -27,6 +30,43 @@ class BashraeelFastapiEndpoint(models.Model):
         ondelete={"bashraheel_invoice": "cascade"},
     )
 
+    @api.model
+    @tools.ormcache()
+    def _get_bashraheel_routers(self):
+        """
+        Build the Bashraheel routers once per registry.
+
+        The app pool creates several app instances per worker; they all
+        include these routers. They hold no env, registry or context of the
+        caller: handlers get the request's env from the odoo_env dependency.
+        """
+        _logger.info("Building Bashraheel Invoice FastAPI routers")
+        return (
+            # Auth router (login/refresh endpoints)
+            create_auth_router(),
+            # Invoice router (protected endpoints)
+            create_invoice_router(),
+        )
+
+    @api.model
+    @tools.ormcache()
+    def _get_bashraheel_middlewares(self):
+        """Build the Bashraheel middleware stack once per registry (outermost first)."""
+        return (
+            # Allow cross-origin requests
+            Middleware(
+                CORSMiddleware,
+                allow_origins=["*"],
+                allow_credentials=True,
+                allow_methods=["*"],
+                allow_headers=["*"],
+            ),
+            # Server-Timing header per route, compression time included
+            Middleware(ServerTimingMiddleware),
+            # Compress large responses (reports) for clients sending Accept-Encoding: gzip
+            Middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE),
+        )
+
     def _get_fastapi_routers(self):
         """
         Return the FastAPI routers for this endpoint.
@@ -36,44 +76,26 @@ class BashraeelFastapiEndpoint(models.Model):
         routers = super()._get_fastapi_routers()
 
         if self.app == "bashraheel_invoice":
-            _logger.info("Loading Bashraheel Invoice FastAPI routers")
-            # Add auth router (login/refresh endpoints)
-            routers.append(
-                create_auth_router(
-                    self.env.registry,
-                    self.env.uid,
-                    self.env.context,
-                )
-            )
-            # Add invoice router (protected endpoints)
-            routers.append(
-                create_invoice_router(
-                    self.env.registry,
-                    self.env.uid,
-                    self.env.context,
-                )
-            )
+            routers.extend(self._get_bashraheel_routers())
 
         return routers
 
+    def _get_routing_info(self):
+        """Serve the Bashraheel app with its own dispatcher, other apps keep the fastapi one."""
+        routing = super()._get_routing_info()
+        if self.app == "bashraheel_invoice":
+            routing["type"] = ROUTING_TYPE_BASHRAHEEL
+        return routing
+
     def _get_fastapi_app_middlewares(self):
         """
         Return the FastAPI middlewares for this endpoint.
 
-        Adds CORS middleware for cross-origin requests.
+        Adds CORS, Server-Timing and GZip middlewares.
         """
         middlewares = super()._get_fastapi_app_middlewares()
 
         if self.app == "bashraheel_invoice":
-            # Add CORS middleware to allow cross-origin requests
-            middlewares.append(
-                Middleware(
-                    CORSMiddleware,
-                    allow_origins=["*"],
-                    allow_credentials=True,
-                    allow_methods=["*"],
-                    allow_headers=["*"],
-                )
-            )
+            middlewares.extend(self._get_bashraheel_middlewares())
 
         return middlewares
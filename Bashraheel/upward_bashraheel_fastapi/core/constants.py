@@ -5,20 +5,42 @@ SERVICE_INVOICE = "bashraheel.invoice.service"
 SERVICE_JWT = "bashraheel.jwt.service"
 SERVICE_AUTH = "bashraheel.auth.service"
 
+# Models from upward_bashraheel_invoice_integration
+MODEL_IDEMPOTENCY_KEY = "bashraheel.idempotency.key"
+MODEL_RATE_LIMIT_BUCKET = "bashraheel.rate.limit.bucket"
+
+# Models
+MODEL_JWT_REVOCATION = "bashraheel.jwt.revocation"
+
+# Request headers
+HEADER_IDEMPOTENCY_KEY = "Idempotency-Key"
+
+# Streamed responses (passed through by the dispatcher instead of buffered)
+MEDIA_TYPE_NDJSON = "application/x-ndjson"
+# Routing type of the Bashraheel endpoints, served by BashraheelFastApiDispatcher
+ROUTING_TYPE_BASHRAHEEL = "bashraheel_fastapi"
+
+# Responses smaller than this are sent uncompressed
+GZIP_MINIMUM_SIZE = 1024
+
 # JWT Configuration
 DEFAULT_JWT_ALGORITHM = "HS256"
 DEFAULT_ACCESS_TOKEN_EXPIRE_MINUTES = 60
 DEFAULT_REFRESH_TOKEN_EXPIRE_DAYS = 7
+DEFAULT_LONG_LIVED_REFRESH_TOKEN_EXPIRE_DAYS = 90
 DEFAULT_JWT_SECRET = "bashraheel-fastapi-secret-key-change-in-production"
 
 # Token types
 TOKEN_TYPE_ACCESS = "access"
 TOKEN_TYPE_REFRESH = "refresh"
+# Revocation of every token issued from one login (see the "family" claim)
+TOKEN_TYPE_FAMILY = "family"
 
 # System parameter keys for JWT config
 PARAM_KEY_JWT_SECRET = "upward_bashraheel_fastapi.jwt_secret_key"
 PARAM_KEY_ACCESS_EXPIRE_MIN = "upward_bashraheel_fastapi.access_token_expire_minutes"
 PARAM_KEY_REFRESH_EXPIRE_DAYS = "upward_bashraheel_fastapi.refresh_token_expire_days"
+PARAM_KEY_LONG_LIVED_REFRESH_EXPIRE_DAYS = "upward_bashraheel_fastapi.long_lived_refresh_token_expire_days"
 
 # Response keys
 KEY_SUCCESS = "success"
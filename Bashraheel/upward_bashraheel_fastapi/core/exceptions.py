@@ -10,8 +10,9 @@ class BaseAPIException(HTTPException):
         self,
         status_code: int = status.HTTP_400_BAD_REQUEST,
         detail: str = "An error occurred",
+        headers: dict = None,
     ):
-        super().__init__(status_code=status_code, detail=detail)
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
 
 
 class ValidationError(BaseAPIException):
@@ -51,6 +52,28 @@ class InternalServerError(BaseAPIException):
         )
 
 
+class RateLimitExceededError(BaseAPIException):
+    """Raised when a store or API user sends requests faster than allowed"""
+
+    def __init__(self, retry_after: int, detail: str = "Too many requests - please retry later"):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class IdempotencyInProgressError(BaseAPIException):
+    """Raised when a request with the same Idempotency-Key is still being processed"""
+
+    def __init__(self, retry_after: int, detail: str = "Request with this Idempotency-Key still in progress"):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
 # Authentication Exceptions
 class JWTUnauthorizedError(BaseAPIException):
     """Base class for JWT authentication errors"""
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+from contextlib import ExitStack
+from io import BytesIO
+from itertools import chain
+
+from odoo.http import request
+
+from odoo.addons.fastapi.fastapi_dispatcher import FastApiDispatcher
+from odoo.addons.fastapi.pools import fastapi_app_pool
+
+from .core.constants import MEDIA_TYPE_NDJSON, ROUTING_TYPE_BASHRAHEEL
+
+
+class BashraheelFastApiDispatcher(FastApiDispatcher):
+    """
+    FastAPI dispatcher that passes streamed responses through.
+
+    Only the Bashraheel endpoint uses it (see fastapi.endpoint
+    `_get_routing_info`); other FastAPI apps keep the base dispatcher.
+
+    The base dispatcher copies every response body into a BytesIO before
+    handing it to Odoo. Responses with an NDJSON content type (the streamed
+    invoice reports) are returned as an iterator instead, so the first bytes
+    leave immediately and memory stays flat. The app stays out of the pool
+    and the env context stays set until the response is closed, i.e. once
+    the body is fully sent. The body must not use the request's cursor: it
+    is consumed after that cursor is closed. Every other response is
+    buffered exactly as before.
+    """
+
+    routing_type = ROUTING_TYPE_BASHRAHEEL
+
+    def dispatch(self, endpoint, args):
+        self.request.params = {}
+        environ = self._get_environ()
+        path = environ["PATH_INFO"]
+        with ExitStack() as stack:
+            app = stack.enter_context(fastapi_app_pool.get_app(env=request.env, root_path=path))
+            uid = request.env["fastapi.endpoint"].sudo().get_uid(path)
+            stack.enter_context(self._manage_odoo_env(uid))
+            body = iter(app(environ, self._make_response))
+            if hasattr(body, "close"):
+                # Stop the app first if the client goes away mid-stream
+                stack.callback(body.close)
+            # The status and headers are known once the first chunk is out
+            first_chunk = next(body, b"")
+            if self.inner_exception:
+                raise self.inner_exception
+            if self._is_streamed_response():
+                response = self.request.make_response(
+                    chain([first_chunk], body), headers=self.headers, status=self.status
+                )
+                # Hand the app and env context over to the response, released on close
+                response.call_on_close(stack.pop_all().close)
+                return response
+            data = BytesIO()
+            data.write(first_chunk)
+            for r in body:
+                data.write(r)
+            if self.inner_exception:
+                raise self.inner_exception
+            return self.request.make_response(
+                data.getvalue(), headers=self.headers, status=self.status
+            )
+
+    def _is_streamed_response(self):
+        return any(
+            name.lower() == "content-type" and value.startswith(MEDIA_TYPE_NDJSON)
+            for name, value in self.headers or []
+        )
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import res_users
+from . import bashraheel_jwt_revocation
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+import psycopg2
+
+from odoo import api, fields, models, tools
+
+from ..core.constants import MODEL_JWT_REVOCATION, TOKEN_TYPE_ACCESS, TOKEN_TYPE_REFRESH, TOKEN_TYPE_FAMILY
+
+_logger = logging.getLogger(__name__)
+
+
+class BashraheelJwtRevocation(models.Model):
+    """
+    Revoked JWT ids.
+
+    Refresh tokens are revoked on every rotation: the unique jti index makes
+    a second use of the same refresh token fail. Such a reuse means the
+    token leaked, so the whole family of tokens issued from that login is
+    revoked with it. Revoked access tokens and families are rare and are
+    checked on every request, so their ids are kept in an in-process set
+    rebuilt only when one is added.
+    """
+
+    _name = MODEL_JWT_REVOCATION
+    _description = "Bashraheel Revoked JWT"
+    _order = "id desc"
+    _rec_name = "jti"
+
+    jti = fields.Char(string="Token ID", required=True, readonly=True)
+    token_type = fields.Selection(
+        [(TOKEN_TYPE_ACCESS, "Access"), (TOKEN_TYPE_REFRESH, "Refresh"), (TOKEN_TYPE_FAMILY, "Token Family")],
+        string="Token Type", required=True, readonly=True,
+    )
+    user_id = fields.Many2one("res.users", string="User", ondelete="cascade", readonly=True)
+    expiration_date = fields.Datetime(
+        string="Token Expires On", required=True, readonly=True, index=True,
+        help="The entry is removed once the token could not be used anymore",
+    )
+    reason = fields.Char(string="Reason")
+
+    _sql_constraints = [
+        ("jti_uniq", "unique (jti)", "A token can only be revoked once"),
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        if any(record.token_type in (TOKEN_TYPE_ACCESS, TOKEN_TYPE_FAMILY) for record in records):
+            # Drop the cached set in this worker and signal the others
+            self.env.registry.clear_cache()
+        return records
+
+    @api.model
+    @tools.ormcache()
+    def _get_revoked_access_jtis(self):
+        """Get the ids of revoked access tokens and token families not expired yet, cached per worker"""
+        self.env.cr.execute(
+            "SELECT jti FROM bashraheel_jwt_revocation WHERE token_type IN %s AND expiration_date > NOW() AT TIME ZONE 'UTC'",
+            [(TOKEN_TYPE_ACCESS, TOKEN_TYPE_FAMILY)],
+        )
+        return frozenset(row[0] for row in self.env.cr.fetchall())
+
+    @api.model
+    def _revoke(self, jti, token_type, user_id, expiration_date, reason=None):
+        """
+        Revoke a token id.
+
+        Returns:
+            bool: False if the token id was already revoked, e.g. by a
+                concurrent refresh with the same refresh token
+        """
+        try:
+            with self.env.cr.savepoint():
+                self.sudo().create({
+                    "jti": jti,
+                    "token_type": token_type,
+                    "user_id": user_id,
+                    "expiration_date": expiration_date,
+                    "reason": reason,
+                })
+        except psycopg2.IntegrityError:
+            return False
+        return True
+
+    @api.model
+    def _revoke_family(self, family, user_id, expiration_date, reason=None):
+        """
+        Revoke every token of a family, on its own cursor.
+
+        The caller rejects the token it is checking, which rolls back its
+        own transaction: the revocation must be committed regardless.
+        """
+        with self.env.registry.cursor() as cr:
+            return self.with_env(self.env(cr=cr))._revoke(
+                family, TOKEN_TYPE_FAMILY, user_id, expiration_date, reason
+            )
+
+    @api.model
+    def _gc_expired_revocations(self):
+        """Cron: delete revocations of tokens that have expired anyway."""
+        expired = self.sudo().search([("expiration_date", "<=", fields.Datetime.now())])
+        _logger.info("Removing %d expired JWT revocations", len(expired))
+        expired.unlink()
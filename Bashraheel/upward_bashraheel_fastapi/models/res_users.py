@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+
+
+class ResUsers(models.Model):
+    _inherit = "res.users"
+
+    # New users need no invalidation: the JWT service caches the active flag
+    # per user id, only for users who presented a token.
+
+    def write(self, vals):
+        # Odoo only signals whole caches to the other workers, so the cached
+        # flags are dropped only when a user is actually (un)archived.
+        changed = "active" in vals and any(user.active != bool(vals["active"]) for user in self)
+        res = super().write(vals)
+        if changed:
+            self._clear_active_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        # A deleted user's tokens must stop working
+        self._clear_active_cache()
+        return res
+
+    def _clear_active_cache(self):
+        """Drop the cached active flags now and once the transaction ends.
+
+        Until then, requests of other threads can cache the committed value
+        again; clearing after commit (or rollback) drops what they cached.
+        """
+        registry = self.env.registry
+        registry.clear_cache()
+        self.env.cr.postcommit.add(registry.clear_cache)
+        self.env.cr.postrollback.add(registry.clear_cache)
@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
 
-from fastapi import APIRouter
-from odoo import api
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from fastapi.security import HTTPAuthorizationCredentials
+from odoo.api import Environment
+
+from odoo.addons.fastapi.dependencies import odoo_env
 
 import logging
 
@@ -10,24 +15,26 @@ from ..schemas.auth_schemas import (
     LoginResponse,
     RefreshTokenRequest,
     RefreshTokenResponse,
+    LogoutRequest,
+    LogoutResponse,
     TokenData,
     RefreshTokenData,
     UserSchema,
 )
-from ..core.constants import SERVICE_AUTH, SERVICE_JWT, TOKEN_TYPE_REFRESH
+from ..auth.dependencies import bearer_scheme
+from ..core.constants import SERVICE_AUTH, SERVICE_JWT, TOKEN_TYPE_ACCESS
+from ..core.exceptions import JWTUnauthorizedError, UserInactive
 from ..utils.decorators import handle_router_errors
 
 _logger = logging.getLogger(__name__)
 
 
-def create_auth_router(registry, uid, context):
+def create_auth_router():
     """
-    Factory function to create the auth router with Odoo context.
+    Factory function to create the auth router.
 
-    Args:
-        registry: Odoo registry
-        uid: User ID
-        context: Odoo context
+    Handlers run on the env and transaction opened by the FastAPI dispatcher
+    (odoo_env dependency), as superuser: the caller is not authenticated yet.
 
     Returns:
         APIRouter: FastAPI router with auth endpoints
@@ -41,42 +48,49 @@ def create_auth_router(registry, uid, context):
         description="Authenticate user and return JWT tokens",
     )
     @handle_router_errors
-    def login(request: LoginRequest) -> LoginResponse:
+    def login(
+        request: LoginRequest,
+        env: Annotated[Environment, Depends(odoo_env)],
+    ) -> LoginResponse:
         """
         Authenticate user with email and password.
 
-        Returns JWT access and refresh tokens on success.
+        Returns JWT access and refresh tokens on success. With long_lived,
+        the refresh token lasts long enough for a POS terminal to never send
+        its password again: password hashing only runs on this endpoint.
         """
         _logger.info(f"Login attempt for: {request.login}")
 
-        with registry.cursor() as cr:
-            env = api.Environment(cr, 1, context)
-            auth_service = env[SERVICE_AUTH]
-            jwt_service = env[SERVICE_JWT]
-
-            # Authenticate user
-            user_data = auth_service.authenticate_user(request.login, request.password)
-
-            # Generate tokens
-            access_token = jwt_service.generate_access_token(user_data)
-            refresh_token = jwt_service.generate_refresh_token(user_data)
-            expires_in = jwt_service.get_token_expiry_seconds()
-
-            return LoginResponse(
-                success=True,
-                data=TokenData(
-                    access_token=access_token,
-                    refresh_token=refresh_token,
-                    expires_in=expires_in,
-                    token_type="Bearer",
-                    user=UserSchema(
-                        id=user_data["user_id"],
-                        email=user_data["email"],
-                        name=user_data["name"],
-                        phone=user_data.get("phone"),
-                    ),
+        env = env(su=True)
+        auth_service = env[SERVICE_AUTH]
+        jwt_service = env[SERVICE_JWT]
+
+        # Authenticate user
+        user_data = auth_service.authenticate_user(request.login, request.password)
+
+        # Generate tokens, one family per login
+        family = jwt_service.new_token_family()
+        access_token = jwt_service.generate_access_token(user_data, family)
+        refresh_token = jwt_service.generate_refresh_token(user_data, request.long_lived, family)
+        expires_in = jwt_service.get_token_expiry_seconds()
+        refresh_expires_in = jwt_service.get_refresh_token_expiry_days(request.long_lived) * 86400
+
+        return LoginResponse(
+            success=True,
+            data=TokenData(
+                access_token=access_token,
+                refresh_token=refresh_token,
+                expires_in=expires_in,
+                refresh_expires_in=refresh_expires_in,
+                token_type="Bearer",
+                user=UserSchema(
+                    id=user_data["user_id"],
+                    email=user_data["email"],
+                    name=user_data["name"],
+                    phone=user_data.get("phone"),
                 ),
-            )
+            ),
+        )
 
     @router.post(
         "/refresh",
@@ -85,43 +99,88 @@ def create_auth_router(registry, uid, context):
         description="Get new access token using refresh token",
     )
     @handle_router_errors
-    def refresh_token(request: RefreshTokenRequest) -> RefreshTokenResponse:
+    def refresh_token(
+        request: RefreshTokenRequest,
+        env: Annotated[Environment, Depends(odoo_env)],
+    ) -> RefreshTokenResponse:
         """
         Refresh the access token using a valid refresh token.
 
-        Returns new access and refresh tokens.
+        Returns new access and refresh tokens. The refresh token is rotated:
+        it is revoked here, and presenting it again revokes every token of
+        its login. No password is hashed: the cost is a signature check,
+        the credential fingerprint lookup and the rotation insert.
         """
         _logger.info("Token refresh requested")
 
-        with registry.cursor() as cr:
-            env = api.Environment(cr, 1, context)
-            auth_service = env[SERVICE_AUTH]
-            jwt_service = env[SERVICE_JWT]
+        env = env(su=True)
+        jwt_service = env[SERVICE_JWT]
+
+        # Validate and revoke the refresh token
+        payload = jwt_service.rotate_refresh_token(request.refresh_token)
+
+        user_id = payload.get("user_id")
+
+        # Verify user is still active (cached set of active users)
+        if not jwt_service.is_user_active(user_id):
+            raise UserInactive("User account is inactive or does not exist")
+
+        user_data = {
+            "user_id": user_id,
+            "partner_id": payload.get("partner_id"),
+            "email": payload.get("email"),
+        }
+        long_lived = bool(payload.get("long_lived"))
+
+        # Generate new tokens, a long-lived refresh token stays long-lived and in its family
+        family = payload.get("family")
+        new_access_token = jwt_service.generate_access_token(user_data, family)
+        new_refresh_token = jwt_service.generate_refresh_token(user_data, long_lived, family)
+        expires_in = jwt_service.get_token_expiry_seconds()
+        refresh_expires_in = jwt_service.get_refresh_token_expiry_days(long_lived) * 86400
+
+        return RefreshTokenResponse(
+            success=True,
+            data=RefreshTokenData(
+                access_token=new_access_token,
+                refresh_token=new_refresh_token,
+                expires_in=expires_in,
+                refresh_expires_in=refresh_expires_in,
+                token_type="Bearer",
+            ),
+        )
 
-            # Validate refresh token
-            payload = jwt_service.validate_token(request.refresh_token, TOKEN_TYPE_REFRESH)
+    @router.post(
+        "/logout",
+        response_model=LogoutResponse,
+        summary="Logout",
+        description="Revoke the current access token and, if given, the refresh token",
+    )
+    @handle_router_errors
+    def logout(
+        request: LogoutRequest,
+        env: Annotated[Environment, Depends(odoo_env)],
+        credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    ) -> LogoutResponse:
+        """
+        Revoke the tokens of this session only.
 
-            user_id = payload.get("user_id")
+        Other sessions of the user and other terminals keep working.
+        """
+        if not credentials:
+            raise JWTUnauthorizedError("Authorization header missing")
 
-            # Verify user is still active
-            auth_service.validate_user_active(user_id)
+        env = env(su=True)
+        jwt_service = env[SERVICE_JWT]
 
-            # Get fresh user data
-            user_data = auth_service.get_user_by_id(user_id)
+        payload = jwt_service.validate_token(credentials.credentials, TOKEN_TYPE_ACCESS)
+        user_id = payload.get("user_id")
+        _logger.info(f"Logout for user {user_id}")
 
-            # Generate new tokens
-            new_access_token = jwt_service.generate_access_token(user_data)
-            new_refresh_token = jwt_service.generate_refresh_token(user_data)
-            expires_in = jwt_service.get_token_expiry_seconds()
+        jwt_service.revoke_token(credentials.credentials, "Logout", user_id)
+        if request.refresh_token:
+            jwt_service.revoke_token(request.refresh_token, "Logout", user_id)
 
-            return RefreshTokenResponse(
-                success=True,
-                data=RefreshTokenData(
-                    access_token=new_access_token,
-                    refresh_token=new_refresh_token,
-                    expires_in=expires_in,
-                    token_type="Bearer",
-                ),
-            )
+        return LogoutResponse(success=True, message="Tokens revoked")
 
     return router
@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
 
-from fastapi import APIRouter, Depends
-from odoo import api
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+from odoo.api import Environment
+
+from odoo.addons.fastapi.dependencies import odoo_env
 
 import logging
 
@@ -11,9 +16,10 @@ from ..schemas.invoice_schemas import (
     ReportInvoicesRequest,
     ReportInvoicesResponse,
 )
-from ..core.constants import SERVICE_INVOICE
+from ..core.constants import SERVICE_INVOICE, HEADER_IDEMPOTENCY_KEY, MEDIA_TYPE_NDJSON
+from ..core.exceptions import ValidationError
 from ..utils.decorators import handle_router_errors
-from ..auth.dependencies import create_jwt_auth_dependency, bearer_scheme
+from ..auth.dependencies import create_jwt_auth_dependency, create_rate_limit_dependency, bearer_scheme
 
 # Define dependencies list for protected routes (enables Swagger UI "Authorize" button)
 jwt_security = [Depends(bearer_scheme)]
@@ -21,20 +27,25 @@ jwt_security = [Depends(bearer_scheme)]
 _logger = logging.getLogger(__name__)
 
 
-def create_invoice_router(registry, uid, context):
+def create_invoice_router():
     """
-    Factory function to create the invoice router with Odoo context.
+    Factory function to create the invoice router.
 
-    Args:
-        registry: Odoo registry
-        uid: User ID
-        context: Odoo context
+    Handlers run on the env and transaction opened by the FastAPI dispatcher
+    (odoo_env dependency), as the technical user of the endpoint. The
+    dispatcher commits on success and rolls back on error.
+
+    Handlers are plain functions: they block on the ORM and on ZATCA, and
+    the Odoo worker serving the request is held for its whole duration
+    anyway, so an extra thread pool would add a hop without freeing it.
 
     Returns:
         APIRouter: FastAPI router with invoice endpoints
     """
     # Create JWT auth dependency
-    jwt_auth = create_jwt_auth_dependency(registry, uid, context)
+    jwt_auth = create_jwt_auth_dependency()
+    # Token buckets per store and per JWT subject on invoice creation
+    rate_limit = [Depends(create_rate_limit_dependency(jwt_auth))]
 
     # Router with JWT security dependency - enables "Authorize" button in Swagger UI
     router = APIRouter(
@@ -46,6 +57,7 @@ def create_invoice_router(registry, uid, context):
     @router.post(
         "/create",
         response_model=CreateInvoiceResponse,
+        dependencies=rate_limit,
         summary="Create invoices from third-party POS",
         description="""
 Create one or more invoices from third-party POS data and submit to ZATCA.
@@ -67,15 +79,31 @@ Create one or more invoices from third-party POS data and submit to ZATCA.
 | store.id | Store identifier (must exist in Odoo journals) |
 | lines | At least one line item |
 
+## Idempotency
+Send an `Idempotency-Key` header (e.g. a UUID per batch) to retry safely after a
+timeout: a replayed key returns the stored response without creating anything.
+While the first request with the key is still running, a retry gets `409` with
+a `Retry-After` header.
+
+## Rate Limits
+Requests are limited per store and per API user (token bucket). A throttled
+request gets `429` with a `Retry-After` header in seconds.
+
 ## Notes
 - `thirdparty_sa_confirmation_datetime` is used for ZATCA compliance
-- Invoice numbers must be unique across the system
+- Invoice numbers must be unique across the system; resending an existing number returns the existing invoice
         """,
     )
     @handle_router_errors
     def create_invoices(
         request: CreateInvoiceRequest,
+        env: Annotated[Environment, Depends(odoo_env)],
         auth: dict = Depends(jwt_auth),
+        idempotency_key: Optional[str] = Header(
+            None,
+            alias=HEADER_IDEMPOTENCY_KEY,
+            description="Unique key per request; a replayed key returns the stored response",
+        ),
     ) -> CreateInvoiceResponse:
         """
         Create invoices from third-party POS system.
@@ -87,23 +115,29 @@ Create one or more invoices from third-party POS data and submit to ZATCA.
         """
         _logger.info(f"create_invoices endpoint called by user: {auth.get('email')}")
 
-        with registry.cursor() as cr:
-            env = api.Environment(cr, 1, context)  # Superuser
-            invoice_service = env[SERVICE_INVOICE]
-            result = invoice_service.create_invoices(request.model_dump())
-            cr.commit()
-            return result
+        invoice_service = env[SERVICE_INVOICE].sudo()
+        with env.cr.savepoint():
+            return invoice_service.create_invoices(
+                request.model_dump(), idempotency_key, "/invoice/create"
+            )
 
     @router.post(
         "/create-return",
         response_model=CreateInvoiceResponse,
+        dependencies=rate_limit,
         summary="Create return/refund invoices",
         description="Create return or refund invoices from third-party POS data",
     )
     @handle_router_errors
     def create_return_invoices(
         request: CreateInvoiceRequest,
+        env: Annotated[Environment, Depends(odoo_env)],
         auth: dict = Depends(jwt_auth),
+        idempotency_key: Optional[str] = Header(
+            None,
+            alias=HEADER_IDEMPOTENCY_KEY,
+            description="Unique key per request; a replayed key returns the stored response",
+        ),
     ) -> CreateInvoiceResponse:
         """
         Create return/refund invoices from third-party POS system.
@@ -116,22 +150,22 @@ Create one or more invoices from third-party POS data and submit to ZATCA.
         """
         _logger.info(f"create_return_invoices endpoint called by user: {auth.get('email')}")
 
-        with registry.cursor() as cr:
-            env = api.Environment(cr, 1, context)  # Superuser
-            invoice_service = env[SERVICE_INVOICE]
-            result = invoice_service.create_invoices(request.model_dump())
-            cr.commit()
-            return result
+        invoice_service = env[SERVICE_INVOICE].sudo()
+        with env.cr.savepoint():
+            return invoice_service.create_invoices(
+                request.model_dump(), idempotency_key, "/invoice/create-return"
+            )
 
     @router.post(
         "/report",
         response_model=ReportInvoicesResponse,
         summary="Query invoice status",
-        description="Query invoices for a specific store and date with ZATCA submission status. Returns response fields: odoo_invoice_id, odoo_invoice_no, thirdparty_invoice_no, gross_amount, net_amount, tax_amount, invoice_odoo_status, invoice_zatka_status, qr_code.",
+        description="Query invoices for a specific store and date (or date_from/date_to range) with ZATCA submission status. Returns response fields: odoo_invoice_id, odoo_invoice_no, thirdparty_invoice_no, gross_amount, net_amount, tax_amount, invoice_odoo_status, invoice_zatka_status, qr_code. Set `limit` to page through large ranges and pass the returned `next_cursor` as `cursor` to get the next page.",
     )
     @handle_router_errors
     def report_invoices(
         request: ReportInvoicesRequest,
+        env: Annotated[Environment, Depends(odoo_env)],
         auth: dict = Depends(jwt_auth),
     ) -> ReportInvoicesResponse:
         """
@@ -143,11 +177,32 @@ Create one or more invoices from third-party POS data and submit to ZATCA.
         """
         _logger.info(f"report_invoices endpoint called for store: {request.store_id} by user: {auth.get('email')}")
 
-        with registry.cursor() as cr:
-            env = api.Environment(cr, 1, context)  # Superuser
-            invoice_service = env[SERVICE_INVOICE]
-            result = invoice_service.report_invoices(request.model_dump())
-            cr.commit()
-            return result
+        invoice_service = env[SERVICE_INVOICE].sudo()
+        return invoice_service.report_invoices(request.model_dump())
+
+    @router.post(
+        "/report/stream",
+        response_class=StreamingResponse,
+        summary="Stream invoice report",
+        description="Same query as `/invoice/report`, streamed as NDJSON (`application/x-ndjson`): one invoice object per line, in (invoice_date, id) order, then a last status line: `{\"done\": true, \"count\": N}`, or `{\"error\": ..., \"count\": N, \"next_cursor\": ...}` when the report was interrupted. A body without that line was truncated. Use it for long date ranges; `limit` is ignored and `cursor` resumes after a given invoice.",
+    )
+    @handle_router_errors
+    def report_invoices_stream(
+        request: ReportInvoicesRequest,
+        env: Annotated[Environment, Depends(odoo_env)],
+        auth: dict = Depends(jwt_auth),
+    ) -> StreamingResponse:
+        """
+        Stream invoices for a specific store and date range.
+
+        Requires JWT Bearer token authentication.
+        """
+        _logger.info(f"report_invoices_stream endpoint called for store: {request.store_id} by user: {auth.get('email')}")
+
+        invoice_service = env[SERVICE_INVOICE].sudo()
+        error, body = invoice_service.stream_report_invoices(request.model_dump())
+        if error:
+            raise ValidationError(error["message"])
+        return StreamingResponse(body, media_type=MEDIA_TYPE_NDJSON)
 
     return router
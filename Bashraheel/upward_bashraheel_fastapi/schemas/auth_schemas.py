@@ -10,6 +10,10 @@ class LoginRequest(BaseModel):
     """Schema for login request"""
     login: str = Field(..., min_length=1, description="User's login (email or username)")
     password: str = Field(..., min_length=1, description="User's password")
+    long_lived: bool = Field(
+        False,
+        description="Issue a long-lived refresh token (POS terminals): refresh it instead of sending the password again",
+    )
 
 
 class UserSchema(BaseModel):
@@ -33,6 +37,7 @@ class TokenData(BaseModel):
     access_token: str = Field(..., description="JWT access token")
     refresh_token: str = Field(..., description="JWT refresh token")
     expires_in: int = Field(..., description="Access token expiry in seconds")
+    refresh_expires_in: Optional[int] = Field(None, description="Refresh token expiry in seconds")
     token_type: str = Field(default="Bearer", description="Token type")
     user: UserSchema = Field(..., description="User information")
 
@@ -56,6 +61,7 @@ class RefreshTokenData(BaseModel):
     access_token: str = Field(..., description="New JWT access token")
     refresh_token: str = Field(..., description="New JWT refresh token")
     expires_in: int = Field(..., description="Access token expiry in seconds")
+    refresh_expires_in: Optional[int] = Field(None, description="Refresh token expiry in seconds")
     token_type: str = Field(default="Bearer", description="Token type")
 
 
@@ -64,3 +70,16 @@ class RefreshTokenResponse(BaseModel):
     success: bool = Field(..., description="Whether refresh was successful")
     data: Optional[RefreshTokenData] = Field(None, description="New token data")
     message: Optional[str] = Field(None, description="Error message if failed")
+
+
+# ============ Logout Schemas ============
+
+class LogoutRequest(BaseModel):
+    """Schema for logout request"""
+    refresh_token: Optional[str] = Field(None, description="JWT refresh token to revoke with the access token")
+
+
+class LogoutResponse(BaseModel):
+    """Schema for logout response"""
+    success: bool = Field(..., description="Whether logout was successful")
+    message: Optional[str] = Field(None, description="Result message")
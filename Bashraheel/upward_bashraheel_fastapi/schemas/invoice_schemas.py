@@ -4,93 +4,14 @@ from typing import List, Optional, Any
 from datetime import date, datetime
 from pydantic import BaseModel, Field, field_serializer
 
-
-# ============ Invoice Line Schemas ============
-
-class InvoiceLineRequest(BaseModel):
-    """Schema for a single invoice line item"""
-    skuCode: str = Field(..., description="Product SKU code")
-    skuid: Optional[str] = Field(None, description="Product SKU ID")
-    qty: float = Field(..., gt=0, description="Quantity (must be > 0)")
-    sellingPrice: float = Field(..., ge=0, description="Selling price per unit")
-    discount: float = Field(default=0, ge=0, le=100, description="Discount percentage (0-100)")
-
-
-# ============ Store Schema ============
-
-class StoreInfo(BaseModel):
-    """Schema for store information"""
-    id: str = Field(..., description="Store identifier")
-
-
-# ============ Invoice Request Schemas ============
-
-class InvoiceRequest(BaseModel):
-    """Schema for a single invoice in the request"""
-    invoiceNo: str = Field(..., description="Third-party invoice number (unique)")
-    move_type: str = Field(..., pattern="^(out_invoice|out_refund)$", description="Invoice type")
-    documentDate: str = Field(..., description="Document date (YYYY-MM-DD)")
-    thirdparty_sa_confirmation_datetime: Optional[str] = Field(
-        None, description="Confirmation datetime from third-party (YYYY-MM-DD HH:MM:SS)"
-    )
-    store: Optional[StoreInfo] = Field(None, description="Store information (required for out_invoice)")
-    lines: List[InvoiceLineRequest] = Field(..., min_length=1, description="Invoice line items")
-    main_invoiceNo: Optional[str] = Field(None, description="Original invoice number (required for refunds)")
-    out_refund_type: Optional[str] = Field(
-        None, pattern="^(full|partial)$", description="Refund type (required for refunds)"
-    )
-
-
-class CreateInvoiceRequest(BaseModel):
-    """Schema for creating invoices (batch)"""
-    invoiceList: List[InvoiceRequest] = Field(..., min_length=1, description="List of invoices to create")
-
-    model_config = {
-        "json_schema_extra": {
-            "examples": [
-                {
-                    "invoiceList": [{
-                        "invoiceNo": "INV-001",
-                        "move_type": "out_invoice",
-                        "documentDate": "2025-02-15",
-                        "thirdparty_sa_confirmation_datetime": "2025-02-15 10:30:00",
-                        "store": {"id": "STORE001"},
-                        "lines": [
-                            {"skuCode": "FURN_0001", "qty": 2, "sellingPrice": 100.0, "discount": 0}
-                        ]
-                    }]
-                },
-                {
-                    "invoiceList": [{
-                        "invoiceNo": "REF-001",
-                        "main_invoiceNo": "INV-001",
-                        "move_type": "out_refund",
-                        "out_refund_type": "partial",
-                        "documentDate": "2025-02-16",
-                        "thirdparty_sa_confirmation_datetime": "2025-02-16 11:00:00",
-                        "store": {"id": "STORE001"},
-                        "lines": [
-                            {"skuCode": "FURN_0001", "qty": 1, "sellingPrice": 100.0, "discount": 0}
-                        ]
-                    }]
-                },
-                {
-                    "invoiceList": [{
-                        "invoiceNo": "REF-002",
-                        "main_invoiceNo": "INV-001",
-                        "move_type": "out_refund",
-                        "out_refund_type": "full",
-                        "documentDate": "2025-02-16",
-                        "thirdparty_sa_confirmation_datetime": "2025-02-16 11:00:00",
-                        "store": {"id": "STORE001"},
-                        "lines": [
-                            {"skuCode": "DUMMY", "qty": 1, "sellingPrice": 0, "discount": 0}
-                        ]
-                    }]
-                }
-            ]
-        }
-    }
+# Request schemas are shared with the JSON-RPC controller
+from odoo.addons.upward_bashraheel_invoice_integration.schemas.invoice_schemas import (  # noqa: F401
+    InvoiceLineRequest,
+    StoreInfo,
+    InvoiceRequest,
+    CreateInvoiceRequest,
+    ReportInvoicesRequest,
+)
 
 
 # ============ Invoice Response Schemas ============
@@ -107,6 +28,7 @@ class SingleInvoiceResponse(BaseModel):
     status: str = Field(..., description="success or error")
     data: Optional[InvoiceCreatedData] = Field(None, description="Invoice data if successful")
     message: Optional[str] = Field(None, description="Error message if failed")
+    retryable: Optional[bool] = Field(None, description="True if the failure is transient and the invoice can be resent")
 
 
 class CreateInvoiceResponse(BaseModel):
@@ -116,21 +38,7 @@ class CreateInvoiceResponse(BaseModel):
     message: Optional[str] = Field(None, description="Error message if overall failure")
 
 
-# ============ Report Request/Response Schemas ============
-
-class ReportInvoicesRequest(BaseModel):
-    """Schema for querying invoices"""
-    store_id: str = Field(..., description="Store identifier")
-    date: str = Field(..., description="Invoice date (YYYY-MM-DD)")
-
-    model_config = {
-        "json_schema_extra": {
-            "examples": [
-                {"store_id": "STORE001", "date": "2025-02-15"}
-            ]
-        }
-    }
-
+# ============ Report Response Schemas ============
 
 class InvoiceReportItem(BaseModel):
     """Schema for a single invoice in the report"""
@@ -172,4 +80,5 @@ class ReportInvoicesResponse(BaseModel):
     """Schema for invoice report response"""
     status: str = Field(..., description="success or error")
     data: Optional[List[InvoiceReportItem]] = Field(None, description="List of invoices")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, null on the last page")
     message: Optional[str] = Field(None, description="Error message if failed")
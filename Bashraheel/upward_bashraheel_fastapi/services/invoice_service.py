@@ -1,9 +1,18 @@
 # -*- coding: utf-8 -*-
 
+from typing import Optional
+
 from odoo import models, api
 import logging
 
-from ..core.constants import SERVICE_INVOICE
+from odoo.addons.upward_bashraheel_invoice_integration.models.bashraheel_idempotency_key import (
+    IDEMPOTENCY_RETRY_AFTER,
+    IdempotencyKeyInProgress,
+)
+from odoo.addons.upward_bashraheel_invoice_integration.utils.payload_logging import log_payload
+
+from ..core.constants import SERVICE_INVOICE, MODEL_IDEMPOTENCY_KEY
+from ..core.exceptions import IdempotencyInProgressError
 
 _logger = logging.getLogger(__name__)
 
@@ -14,7 +23,12 @@ class InvoiceService(models.AbstractModel):
     _name = SERVICE_INVOICE
     _description = "Bashraheel Invoice Service for FastAPI"
 
-    def create_invoices(self, invoice_data: dict) -> dict:
+    def create_invoices(
+        self,
+        invoice_data: dict,
+        idempotency_key: Optional[str] = None,
+        endpoint: str = "/invoice/create",
+    ) -> dict:
         """
         Create invoices from third-party POS data.
 
@@ -23,12 +37,24 @@ class InvoiceService(models.AbstractModel):
 
         Args:
             invoice_data: Dictionary containing 'invoiceList' with invoice details
+            idempotency_key: Idempotency-Key header value; a replayed key returns
+                the stored response without creating anything, a key still in
+                progress raises IdempotencyInProgressError (409)
+            endpoint: Endpoint the idempotency key is scoped to
 
         Returns:
             dict: Response with status and created invoice data
         """
-        _logger.info(f"FastAPI create_invoices called with data: {invoice_data}")
-        return self.env["account.move"]._prepare_zatka_invoice(invoice_data)
+        log_payload(self.env, endpoint, invoice_data)
+        try:
+            return self.env[MODEL_IDEMPOTENCY_KEY]._run_idempotent(
+                idempotency_key,
+                endpoint,
+                invoice_data,
+                lambda: self.env["account.move"]._prepare_zatka_invoice(invoice_data),
+            )
+        except IdempotencyKeyInProgress as e:
+            raise IdempotencyInProgressError(IDEMPOTENCY_RETRY_AFTER, str(e))
 
     def report_invoices(self, report_data: dict) -> dict:
         """
@@ -43,5 +69,25 @@ class InvoiceService(models.AbstractModel):
         Returns:
             dict: Response with status and invoice report data
         """
-        _logger.info(f"FastAPI report_invoices called with data: {report_data}")
+        log_payload(self.env, "/invoice/report", report_data)
         return self.env["account.move"]._report_odoo_invoices(report_data)
+
+    def stream_report_invoices(self, report_data: dict) -> tuple:
+        """
+        Validate a report query and return its NDJSON body generator.
+
+        The generator reads the report on its own cursor, so it can be
+        consumed after the caller's transaction is closed.
+
+        Args:
+            report_data: Dictionary containing 'store_id' and 'date' or 'date_from'/'date_to'
+
+        Returns:
+            tuple: (error, body) where error is an error response dict or None
+        """
+        log_payload(self.env, "/invoice/report/stream", report_data)
+        moves = self.env["account.move"]
+        error, params = moves._parse_report_request(report_data)
+        if error:
+            return error, None
+        return None, moves._stream_report_ndjson(params)
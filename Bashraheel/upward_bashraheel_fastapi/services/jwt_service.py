@@ -1,21 +1,28 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
+import hmac
+import uuid
+
 import jwt
 from datetime import datetime, timedelta
-from odoo import models, api
+from odoo import models, api, tools
 import logging
 
 from ..core.constants import (
     SERVICE_JWT,
+    MODEL_JWT_REVOCATION,
     DEFAULT_JWT_ALGORITHM,
     DEFAULT_ACCESS_TOKEN_EXPIRE_MINUTES,
     DEFAULT_REFRESH_TOKEN_EXPIRE_DAYS,
+    DEFAULT_LONG_LIVED_REFRESH_TOKEN_EXPIRE_DAYS,
     DEFAULT_JWT_SECRET,
     TOKEN_TYPE_ACCESS,
     TOKEN_TYPE_REFRESH,
     PARAM_KEY_JWT_SECRET,
     PARAM_KEY_ACCESS_EXPIRE_MIN,
     PARAM_KEY_REFRESH_EXPIRE_DAYS,
+    PARAM_KEY_LONG_LIVED_REFRESH_EXPIRE_DAYS,
 )
 from ..core.exceptions import InvalidOrExpiredTokenError, InvalidTokenPayloadError
 
@@ -28,11 +35,27 @@ class JWTService(models.AbstractModel):
     _name = SERVICE_JWT
     _description = "Bashraheel JWT Service"
 
+    @api.model
+    @tools.ormcache()
     def _get_jwt_secret(self) -> str:
-        """Get JWT secret from system parameters or use default"""
+        """Get JWT secret from system parameters or use default, cached per worker"""
         param = self.env["ir.config_parameter"].sudo()
         return param.get_param(PARAM_KEY_JWT_SECRET, DEFAULT_JWT_SECRET)
 
+    @api.model
+    @tools.ormcache("user_id")
+    def _is_user_active_cached(self, user_id: int) -> bool:
+        """Get whether a user exists and is active, cached per worker and per user"""
+        # A pending (un)archiving of this transaction must not be cached as the old value
+        self.env["res.users"].flush_model(["active"])
+        self.env.cr.execute("SELECT active FROM res_users WHERE id = %s", [user_id])
+        row = self.env.cr.fetchone()
+        return bool(row and row[0])
+
+    def is_user_active(self, user_id: int) -> bool:
+        """Check a token's user against the cached active flag of that user"""
+        return self._is_user_active_cached(user_id)
+
     def _get_access_token_expire_minutes(self) -> int:
         """Get access token expiry in minutes from system parameters"""
         param = self.env["ir.config_parameter"].sudo()
@@ -55,12 +78,46 @@ class JWTService(models.AbstractModel):
         except (ValueError, TypeError):
             return DEFAULT_REFRESH_TOKEN_EXPIRE_DAYS
 
-    def generate_access_token(self, user_data: dict) -> str:
+    def _get_long_lived_refresh_token_expire_days(self) -> int:
+        """Get long-lived (POS terminal) refresh token expiry in days from system parameters"""
+        param = self.env["ir.config_parameter"].sudo()
+        value = param.get_param(
+            PARAM_KEY_LONG_LIVED_REFRESH_EXPIRE_DAYS, str(DEFAULT_LONG_LIVED_REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return DEFAULT_LONG_LIVED_REFRESH_TOKEN_EXPIRE_DAYS
+
+    def new_token_family(self) -> str:
+        """Get a new token family id, shared by the tokens issued from one login"""
+        return uuid.uuid4().hex
+
+    def _get_credential_fingerprint(self, user_id: int) -> str:
+        """
+        Get a fingerprint of the user's login and password hash.
+
+        Refresh tokens carry it: changing the password (or the login) makes
+        every refresh token issued before invalid.
+        """
+        self.env.cr.execute(
+            "SELECT login, COALESCE(password, '') FROM res_users WHERE id = %s", [user_id]
+        )
+        row = self.env.cr.fetchone()
+        if not row:
+            return None
+        message = "%s:%s:%s" % (user_id, row[0], row[1])
+        return hmac.new(
+            self._get_jwt_secret().encode(), message.encode(), hashlib.sha256
+        ).hexdigest()[:32]
+
+    def generate_access_token(self, user_data: dict, family: str = None) -> str:
         """
         Generate an access token for the user.
 
         Args:
             user_data: Dictionary containing user_id, partner_id, email
+            family: Token family of the login, revoked together
 
         Returns:
             str: JWT access token
@@ -73,23 +130,30 @@ class JWTService(models.AbstractModel):
             "partner_id": user_data.get("partner_id"),
             "email": user_data.get("email"),
             "type": TOKEN_TYPE_ACCESS,
+            "jti": uuid.uuid4().hex,
             "exp": expire,
             "iat": datetime.utcnow(),
         }
+        if family:
+            payload["family"] = family
 
         return jwt.encode(payload, self._get_jwt_secret(), algorithm=DEFAULT_JWT_ALGORITHM)
 
-    def generate_refresh_token(self, user_data: dict) -> str:
+    def generate_refresh_token(self, user_data: dict, long_lived: bool = False, family: str = None) -> str:
         """
         Generate a refresh token for the user.
 
         Args:
             user_data: Dictionary containing user_id, partner_id, email
+            long_lived: Issue a long-lived token (POS terminals), kept long-lived
+                across rotations
+            family: Token family of the login, kept across rotations; a new
+                family is started if not given
 
         Returns:
             str: JWT refresh token
         """
-        expire_days = self._get_refresh_token_expire_days()
+        expire_days = self.get_refresh_token_expiry_days(long_lived)
         expire = datetime.utcnow() + timedelta(days=expire_days)
 
         payload = {
@@ -97,9 +161,14 @@ class JWTService(models.AbstractModel):
             "partner_id": user_data.get("partner_id"),
             "email": user_data.get("email"),
             "type": TOKEN_TYPE_REFRESH,
+            "jti": uuid.uuid4().hex,
+            "family": family or self.new_token_family(),
+            "crd": self._get_credential_fingerprint(user_data.get("user_id")),
             "exp": expire,
             "iat": datetime.utcnow(),
         }
+        if long_lived:
+            payload["long_lived"] = True
 
         return jwt.encode(payload, self._get_jwt_secret(), algorithm=DEFAULT_JWT_ALGORITHM)
 
@@ -130,6 +199,11 @@ class JWTService(models.AbstractModel):
                     f"Invalid token type. Expected {expected_type}, got {token_type}"
                 )
 
+            # Revoked access tokens and token families are checked against the in-process set
+            revoked = self._get_revoked_access_jtis()
+            if (token_type == TOKEN_TYPE_ACCESS and payload.get("jti") in revoked) or payload.get("family") in revoked:
+                raise InvalidOrExpiredTokenError("Token has been revoked")
+
             return payload
 
         except jwt.ExpiredSignatureError:
@@ -139,6 +213,91 @@ class JWTService(models.AbstractModel):
             _logger.warning(f"Invalid token: {e}")
             raise InvalidOrExpiredTokenError("Invalid token")
 
+    def _get_revoked_access_jtis(self) -> frozenset:
+        return self.env[MODEL_JWT_REVOCATION]._get_revoked_access_jtis()
+
+    def rotate_refresh_token(self, token: str) -> dict:
+        """
+        Validate a refresh token and revoke it so it can only be used once.
+
+        The token must have been issued for the user's current credentials.
+        Presenting an already rotated token means it leaked: its whole family
+        (every token issued from the same login) is revoked.
+
+        Args:
+            token: JWT refresh token string
+
+        Returns:
+            dict: Token payload
+
+        Raises:
+            InvalidOrExpiredTokenError: If token is invalid, expired, revoked or already used,
+                or if the user's credentials changed since it was issued
+        """
+        payload = self.validate_token(token, TOKEN_TYPE_REFRESH)
+        user_id = payload.get("user_id")
+        jti, family = payload.get("jti"), payload.get("family")
+        if not jti or not family or not payload.get("crd"):
+            # Issued before families and credential binding: log in again
+            raise InvalidOrExpiredTokenError("Refresh token is outdated, please log in again")
+        if payload["crd"] != self._get_credential_fingerprint(user_id):
+            _logger.warning(f"Refresh token {jti} of user {user_id} predates a credential change")
+            raise InvalidOrExpiredTokenError("Credentials have changed, please log in again")
+
+        revocations = self.env[MODEL_JWT_REVOCATION]
+        if not revocations._revoke(
+            jti, TOKEN_TYPE_REFRESH, user_id, datetime.utcfromtimestamp(payload["exp"]), "Rotated",
+        ):
+            _logger.warning(f"Refresh token {jti} reused for user {user_id}, revoking its family {family}")
+            # The newest token of the family cannot outlive a long-lived refresh token issued now
+            expire_days = max(self._get_refresh_token_expire_days(), self._get_long_lived_refresh_token_expire_days())
+            revocations._revoke_family(
+                family, user_id, datetime.utcnow() + timedelta(days=expire_days), "Refresh token reused",
+            )
+            raise InvalidOrExpiredTokenError("Refresh token has already been used")
+        return payload
+
+    def revoke_token(self, token: str, reason: str = None, user_id: int = None) -> bool:
+        """
+        Revoke a single token by its jti, leaving every other token valid.
+
+        Args:
+            token: JWT access or refresh token string, may be expired
+            reason: Why the token is revoked
+            user_id: If set, the token must belong to this user
+
+        Returns:
+            bool: False if the token was already revoked
+
+        Raises:
+            InvalidOrExpiredTokenError: If the token signature is invalid
+            InvalidTokenPayloadError: If the token has no jti or belongs to another user
+        """
+        try:
+            payload = jwt.decode(
+                token, self._get_jwt_secret(), algorithms=[DEFAULT_JWT_ALGORITHM],
+                options={"verify_exp": False},
+            )
+        except jwt.InvalidTokenError as e:
+            _logger.warning(f"Invalid token: {e}")
+            raise InvalidOrExpiredTokenError("Invalid token")
+
+        if not payload.get("jti") or payload.get("type") not in (TOKEN_TYPE_ACCESS, TOKEN_TYPE_REFRESH):
+            raise InvalidTokenPayloadError("Token cannot be revoked")
+        if user_id and payload.get("user_id") != user_id:
+            raise InvalidTokenPayloadError("Token belongs to another user")
+
+        return self.env[MODEL_JWT_REVOCATION]._revoke(
+            payload["jti"], payload["type"], payload.get("user_id"),
+            datetime.utcfromtimestamp(payload["exp"]), reason,
+        )
+
     def get_token_expiry_seconds(self) -> int:
         """Get access token expiry in seconds"""
         return self._get_access_token_expire_minutes() * 60
+
+    def get_refresh_token_expiry_days(self, long_lived: bool = False) -> int:
+        """Get refresh token expiry in days"""
+        if long_lived:
+            return self._get_long_lived_refresh_token_expire_days()
+        return self._get_refresh_token_expire_days()
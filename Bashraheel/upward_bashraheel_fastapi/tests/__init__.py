@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+from . import test_auth_overhead
+from . import test_jwt_revocation
+from . import test_middlewares
+from . import test_auth_load
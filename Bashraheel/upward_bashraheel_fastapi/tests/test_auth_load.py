@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.base.models.res_users import Users
+
+from ..core.constants import SERVICE_AUTH, SERVICE_JWT
+
+_logger = logging.getLogger(__name__)
+
+LOAD_ITERATIONS = 50
+
+
+@tagged('post_install', '-at_install')
+class TestAuthLoad(TransactionCase):
+    """Compare the CPU cost of re-login against refreshing a long-lived token.
+
+    A POS terminal that logs in again pays for a password hash verification
+    on every call; refreshing only checks a signature and rotates the token.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.password = 'pos-terminal-password'
+        cls.api_user = cls.env['res.users'].create({
+            'name': 'Bashraheel POS Terminal',
+            'login': 'bashraheel_pos_terminal',
+            'password': cls.password,
+        })
+        cls.auth_service = cls.env[SERVICE_AUTH]
+        cls.jwt_service = cls.env[SERVICE_JWT]
+
+    def setUp(self):
+        super().setUp()
+        # authenticate() opens its own cursor, keep it inside the test transaction
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+
+    def _login(self):
+        user_data = self.auth_service.authenticate_user(self.api_user.login, self.password)
+        self.jwt_service.generate_access_token(user_data)
+        return self.jwt_service.generate_refresh_token(user_data, long_lived=True)
+
+    def _refresh(self, refresh_token):
+        # Same steps as POST /auth/refresh
+        payload = self.jwt_service.rotate_refresh_token(refresh_token)
+        self.assertTrue(self.jwt_service.is_user_active(payload['user_id']))
+        self.assertTrue(payload.get('long_lived'))
+        self.jwt_service.generate_access_token(payload)
+        return self.jwt_service.generate_refresh_token(payload, long_lived=True)
+
+    def _cpu_per_request(self, func):
+        start = time.process_time()
+        for _i in range(LOAD_ITERATIONS):
+            func()
+        return (time.process_time() - start) / LOAD_ITERATIONS
+
+    def test_refresh_skips_password_check(self):
+        refresh_token = self._login()
+        with patch.object(Users, '_check_credentials') as check_credentials:
+            self._refresh(refresh_token)
+        check_credentials.assert_not_called()
+
+    def test_refresh_cpu_per_request(self):
+        tokens = [self._login()]
+        login_cpu = self._cpu_per_request(self._login)
+
+        def refresh():
+            tokens.append(self._refresh(tokens[-1]))
+
+        refresh_cpu = self._cpu_per_request(refresh)
+        _logger.info(
+            "Auth CPU per request over %d requests: login %.2f ms, refresh %.2f ms",
+            LOAD_ITERATIONS, login_cpu * 1000, refresh_cpu * 1000,
+        )
+        self.assertLess(refresh_cpu, login_cpu)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from odoo.tests import TransactionCase, tagged
+
+from ..auth.dependencies import create_jwt_auth_dependency
+from ..core.constants import SERVICE_JWT
+from ..core.exceptions import UserInactive
+
+_logger = logging.getLogger(__name__)
+
+BENCHMARK_ITERATIONS = 1000
+
+
+@tagged('post_install', '-at_install')
+class TestAuthOverhead(TransactionCase):
+    """Benchmark the JWT dependency run in front of every invoice call.
+
+    Once the caches are warm a token is verified without touching the
+    database; the average time per request is logged for comparison.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.api_user = cls.env['res.users'].create({
+            'name': 'Bashraheel API User',
+            'login': 'bashraheel_api_user',
+        })
+        cls.token = cls.env[SERVICE_JWT].generate_access_token({
+            'user_id': cls.api_user.id,
+            'partner_id': cls.api_user.partner_id.id,
+            'email': cls.api_user.login,
+        })
+        cls.verify_jwt_token = create_jwt_auth_dependency()
+
+    def _verify(self):
+        credentials = HTTPAuthorizationCredentials(scheme='Bearer', credentials=self.token)
+        return self.verify_jwt_token(env=self.env, credentials=credentials)
+
+    def test_verify_token_without_queries(self):
+        self._verify()
+        with self.assertQueryCount(0):
+            auth = self._verify()
+        self.assertEqual(auth['user_id'], self.api_user.id)
+
+    def test_deactivated_user_is_rejected(self):
+        self._verify()
+        self.api_user.active = False
+        with self.assertRaises(UserInactive):
+            self._verify()
+
+    def test_auth_overhead_per_request(self):
+        self._verify()
+        start = time.perf_counter()
+        for _i in range(BENCHMARK_ITERATIONS):
+            self._verify()
+        elapsed = time.perf_counter() - start
+        _logger.info(
+            "JWT auth overhead: %.1f µs per request over %d requests",
+            elapsed / BENCHMARK_ITERATIONS * 1e6, BENCHMARK_ITERATIONS,
+        )
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase, tagged
+
+from ..core.constants import SERVICE_JWT, TOKEN_TYPE_ACCESS
+from ..core.exceptions import InvalidOrExpiredTokenError
+
+
+@tagged('post_install', '-at_install')
+class TestJwtRevocation(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.jwt_service = cls.env[SERVICE_JWT]
+        cls.api_user = cls.env['res.users'].create({
+            'name': 'Bashraheel API User',
+            'login': 'bashraheel_api_user',
+        })
+        cls.user_data = {
+            'user_id': cls.api_user.id,
+            'partner_id': cls.api_user.partner_id.id,
+            'email': cls.api_user.login,
+        }
+
+    def setUp(self):
+        super().setUp()
+        # A reused refresh token revokes its family on its own cursor
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+
+    def test_revoked_access_token_is_rejected(self):
+        token = self.jwt_service.generate_access_token(self.user_data)
+        other_token = self.jwt_service.generate_access_token(self.user_data)
+        self.jwt_service.validate_token(token, TOKEN_TYPE_ACCESS)
+
+        self.assertTrue(self.jwt_service.revoke_token(token, "Leaked"))
+        with self.assertRaises(InvalidOrExpiredTokenError):
+            self.jwt_service.validate_token(token, TOKEN_TYPE_ACCESS)
+        # Only the revoked token is affected
+        self.jwt_service.validate_token(other_token, TOKEN_TYPE_ACCESS)
+
+    def test_refresh_token_is_single_use(self):
+        token = self.jwt_service.generate_refresh_token(self.user_data)
+        payload = self.jwt_service.rotate_refresh_token(token)
+        self.assertEqual(payload['user_id'], self.api_user.id)
+        with self.assertRaises(InvalidOrExpiredTokenError):
+            self.jwt_service.rotate_refresh_token(token)
+
+    def test_refresh_token_reuse_revokes_family(self):
+        family = self.jwt_service.new_token_family()
+        access_token = self.jwt_service.generate_access_token(self.user_data, family)
+        token = self.jwt_service.generate_refresh_token(self.user_data, family=family)
+        payload = self.jwt_service.rotate_refresh_token(token)
+        new_token = self.jwt_service.generate_refresh_token(payload, family=payload['family'])
+
+        # The old token is replayed, e.g. by whoever stole it
+        with self.assertRaises(InvalidOrExpiredTokenError):
+            self.jwt_service.rotate_refresh_token(token)
+        with self.assertRaises(InvalidOrExpiredTokenError):
+            self.jwt_service.rotate_refresh_token(new_token)
+        with self.assertRaises(InvalidOrExpiredTokenError):
+            self.jwt_service.validate_token(access_token, TOKEN_TYPE_ACCESS)
+        # Other logins of the user are not affected
+        other_token = self.jwt_service.generate_refresh_token(self.user_data)
+        self.jwt_service.rotate_refresh_token(other_token)
+
+    def test_password_change_invalidates_refresh_tokens(self):
+        token = self.jwt_service.generate_refresh_token(self.user_data, long_lived=True)
+        self.api_user.password = 'new-terminal-password'
+        with self.assertRaises(InvalidOrExpiredTokenError):
+            self.jwt_service.rotate_refresh_token(token)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+
+from odoo.tests import BaseCase, tagged
+
+from ..core.constants import GZIP_MINIMUM_SIZE
+from ..utils.middlewares import ServerTimingMiddleware
+
+
+@tagged('post_install', '-at_install')
+class TestMiddlewares(BaseCase):
+
+    def setUp(self):
+        super().setUp()
+        app = FastAPI(middleware=[
+            Middleware(ServerTimingMiddleware),
+            Middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE),
+        ])
+
+        @app.get("/report/{store_id}")
+        def report(store_id: str, size: int = 10):
+            return {"store_id": store_id, "data": "x" * size}
+
+        self.client = TestClient(app)
+
+    def test_server_timing_names_the_route(self):
+        response = self.client.get("/report/STORE001")
+        self.assertRegex(response.headers["Server-Timing"], r'^app;dur=[\d.]+;desc="GET /report/\{store_id\}"$')
+
+    def test_compression_threshold(self):
+        small = self.client.get("/report/STORE001", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", small.headers)
+        large = self.client.get(
+            "/report/STORE001", params={"size": GZIP_MINIMUM_SIZE * 4}, headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(large.headers["Content-Encoding"], "gzip")
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+"""
+ASGI middlewares of the Bashraheel FastAPI app.
+"""
+
+import time
+
+from starlette.datastructures import MutableHeaders
+
+
+class ServerTimingMiddleware:
+    """
+    Add a Server-Timing header with the handling time of each route.
+
+    The duration is measured up to the start of the response, so for
+    streamed responses it covers the time to the first byte. The route
+    template (e.g. /invoice/create) is given as description, so browser
+    dev tools and proxies can group timings per route.
+    """
+
+    def __init__(self, app, metric_name="app"):
+        self.app = app
+        self.metric_name = metric_name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                duration_ms = (time.perf_counter() - start) * 1000
+                # The router stores the matched route in the shared scope
+                route = getattr(scope.get("route"), "path", None) or scope.get("path", "")
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    '%s;dur=%.1f;desc="%s %s"' % (self.metric_name, duration_ms, scope.get("method", ""), route),
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
@@ -18,13 +18,14 @@
         'data/res_partner.xml',
         'data/res_users.xml',
         'data/account_journal_demo.xml',
+        'data/ir_cron.xml',
         'views/invoice.xml',
         'views/account_journal_views.xml',
     ],
     'demo': [
     ],
     'external_dependencies': {
-        'python': []
+        'python': ['pydantic']
     },
     'license': 'LGPL-3',
 }
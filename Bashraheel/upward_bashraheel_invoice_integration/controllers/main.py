@@ -1,33 +1,114 @@
 # -*- coding: utf-8 -*-
-import json
+import functools
+from pydantic import ValidationError
+from werkzeug.exceptions import abort
 from odoo.http import Controller, request, route
 from odoo import SUPERUSER_ID
 
+from ..models.bashraheel_idempotency_key import IDEMPOTENCY_RETRY_AFTER, IdempotencyKeyInProgress
+from ..models.bashraheel_rate_limit_bucket import RATE_LIMIT_MESSAGE
+from ..schemas.invoice_schemas import CreateInvoiceRequest, ReportInvoicesRequest
+from ..utils.payload_logging import log_payload
+
 import logging
 
 _logger = logging.getLogger(__name__)
 
+
+def _get_json_body():
+    """Body of a type='json' route, as already decoded by the JSON-RPC dispatcher."""
+    body = request.dispatcher.jsonrequest
+    return body if isinstance(body, dict) else {}
+
+
+def _validation_error(exc):
+    """Error response listing the fields rejected by the request schema."""
+    message = "; ".join(
+        "%s: %s" % (".".join(str(loc) for loc in error['loc']), error['msg'])
+        for error in exc.errors()
+    )
+    _logger.warning("Invalid request: %s", message)
+    return {"status": "error", "message": "Invalid request - %s" % message}
+
+
+def rate_limited(func):
+    """Throttle a route per store and per API user, answering 429 with Retry-After."""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        body = _get_json_body()
+        buckets = request.env['bashraheel.rate.limit.bucket'].sudo()
+        retry_after = buckets._consume(buckets._get_request_keys(body, request.env.uid))
+        if retry_after:
+            # abort() with a response bypasses the JSON-RPC envelope, keeping the 429 status
+            abort(request.make_json_response(
+                {"status": "error", "message": RATE_LIMIT_MESSAGE},
+                headers=[('Retry-After', str(retry_after))],
+                status=429,
+            ))
+        return func(self, *args, **kwargs)
+    return wrapper
+
 class PureController(Controller):
 
+    def _create_invoices_idempotent(self, endpoint, body):
+        """Create invoices, replaying the stored response when the Idempotency-Key header was seen before."""
+        try:
+            body = CreateInvoiceRequest.model_validate(body).model_dump()
+        except ValidationError as e:
+            return _validation_error(e)
+        env = request.env(su=True)
+        idempotency_key = request.httprequest.headers.get('Idempotency-Key')
+        try:
+            return env['bashraheel.idempotency.key']._run_idempotent(
+                idempotency_key, endpoint, body,
+                lambda: env['account.move']._prepare_zatka_invoice(body),
+            )
+        except IdempotencyKeyInProgress as e:
+            abort(request.make_json_response(
+                {"status": "error", "message": str(e)},
+                headers=[('Retry-After', str(IDEMPOTENCY_RETRY_AFTER))],
+                status=409,
+            ))
+
     @route('/api/create_odoo_invoice', type='json', auth='api_key', methods=['POST'], csrf=False)
+    @rate_limited
     def create_odoo_invoice(self):
-        body = json.loads(request.httprequest.data)
-        _logger.info("create_odoo_invoice : body data %s " % body)
-        env = request.env(su=True)
-        invoice_data = env['account.move']._prepare_zatka_invoice(body)
+        body = _get_json_body()
+        log_payload(request.env, '/api/create_odoo_invoice', body)
+        invoice_data = self._create_invoices_idempotent('/api/create_odoo_invoice', body)
         return invoice_data
 
     @route('/api/create_odoo_invoice_return_store', type='json', auth='api_key', methods=['POST'], csrf=False)
+    @rate_limited
     def create_odoo_invoice_return_store(self):
-        body = json.loads(request.httprequest.data)
-        _logger.info("create_odoo_invoice_return_store : body data %s " % body)
-        env = request.env(su=True)
-        invoice_data = env['account.move']._prepare_zatka_invoice(body)
+        body = _get_json_body()
+        log_payload(request.env, '/api/create_odoo_invoice_return_store', body)
+        invoice_data = self._create_invoices_idempotent('/api/create_odoo_invoice_return_store', body)
         return invoice_data
 
     @route('/api/report_invoices', type='json', auth='api_key', methods=['POST'], csrf=False)
     def report_invoices(self):
-        body = json.loads(request.httprequest.data)
+        try:
+            body = ReportInvoicesRequest.model_validate(_get_json_body()).model_dump()
+        except ValidationError as e:
+            return _validation_error(e)
         env = request.env(su=True)
         invoice_data = env['account.move']._report_odoo_invoices(body)
         return invoice_data
+
+    @route('/api/report_invoices/stream', type='http', auth='api_key', methods=['POST'], csrf=False)
+    def report_invoices_stream(self):
+        """Same report as /api/report_invoices, streamed as NDJSON (one invoice per line, then a status line)."""
+        try:
+            # Decoded and validated in one pass by pydantic-core
+            body = ReportInvoicesRequest.model_validate_json(request.httprequest.get_data()).model_dump()
+        except ValidationError as e:
+            return request.make_json_response(_validation_error(e), status=400)
+        env = request.env(su=True)
+        error, params = env['account.move']._parse_report_request(body)
+        if error:
+            return request.make_json_response(error, status=400)
+        return request.make_response(
+            env['account.move']._stream_report_ndjson(params),
+            headers=[('Content-Type', 'application/x-ndjson')],
+        )
@@ -3,3 +3,5 @@
 from . import account_move_line
 from . import account_move
 from . import account_journal
+from . import bashraheel_idempotency_key
+from . import bashraheel_rate_limit_bucket
@@ -1,9 +1,57 @@
-from odoo import api, fields, models
+from urllib.parse import urljoin
+
+from odoo import api, fields, models, tools
+from odoo.tools import config
+
+# odoo.conf key replacing the ZATCA API base URL, e.g. the load-test stub (Bashraheel/loadtest)
+CONFIG_KEY_ZATCA_API_URL = 'bashraheel_zatca_api_url'
 
 
 class AccountJournal(models.Model):
     _inherit = "account.journal"
 
-    thirdparty_store_id = fields.Char("Third-Party Store ID", copy=False, help="External identifier for the store/branch")
+    thirdparty_store_id = fields.Char("Third-Party Store ID", copy=False, index=True, help="External identifier for the store/branch")
     thirdparty_store_code = fields.Char("Third-Party Store Code", copy=False)
     thirdparty_store_name = fields.Char("Third-Party Store Name", copy=False)
+
+    @api.model
+    @tools.ormcache('store_id')
+    def _get_journal_id_by_thirdparty_store_id(self, store_id):
+        journal = self.sudo().search([('thirdparty_store_id', '=', store_id)], limit=1)
+        return journal.id or False
+
+    @api.model
+    def _get_by_thirdparty_store_id(self, store_id):
+        """Resolve a third-party store id to its journal, cached per worker."""
+        if not store_id:
+            return self.browse()
+        return self.browse(self._get_journal_id_by_thirdparty_store_id(store_id))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        journals = super().create(vals_list)
+        if any(vals.get('thirdparty_store_id') for vals in vals_list):
+            self.env.registry.clear_cache()
+        return journals
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'thirdparty_store_id' in vals or 'active' in vals:
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        has_store = any(self.mapped('thirdparty_store_id'))
+        res = super().unlink()
+        if has_store:
+            self.env.registry.clear_cache()
+        return res
+
+    def _l10n_sa_call_api(self, request_data, request_url, method):
+        # An absolute URL takes precedence over the API mode's base URL in
+        # l10n_sa_edi's urljoin, so onboarding, signing and the invoice chain
+        # all run unchanged against the configured server.
+        api_url = config.get(CONFIG_KEY_ZATCA_API_URL)
+        if api_url:
+            request_url = urljoin(api_url.rstrip('/') + '/', request_url)
+        return super()._l10n_sa_call_api(request_data, request_url, method)
@@ -1,26 +1,62 @@
+import json
 import logging
-import time
 import psycopg2
+from psycopg2 import errorcodes
 
 from odoo import models, fields, _, api
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
 from odoo.exceptions import UserError
+from odoo.tools.sql import create_index, drop_index
 from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY as CONCURRENCY_ERRORS
 
 _logger = logging.getLogger(__name__)
 
+CONCURRENCY_RETRY_MESSAGE = "Concurrency error - please retry"
+
+REPORT_PAGE_SIZE = 500
+REPORT_MAX_PAGE_SIZE = 5000
+# Stored columns read by the reporting fast path
+REPORT_SQL_FIELDS = [
+    'name', 'thirdparty_invoice_no', 'amount_untaxed', 'amount_total', 'amount_tax',
+    'invoice_date', 'l10n_sa_confirmation_datetime', 'state', 'edi_state', 'thirdparty_qr_code_str',
+]
+
+
+def _json_default(value):
+    """Serialise report dates like the API schemas do (ISO 8601)."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
 
 class AccountMove(models.Model):
     _inherit = "account.move"
 
-    thirdparty_invoice_no = fields.Char(string='Third-Party Invoice Number', copy=False, readonly=False, index=True)
+    # No index=True: the unique constraint below already provides the btree index
+    thirdparty_invoice_no = fields.Char(string='Third-Party Invoice Number', copy=False, readonly=False)
     thirdparty_sa_confirmation_datetime = fields.Datetime(string='Third-Party Confirmation Date', readonly=False, copy=False)
     thirdparty_store_id = fields.Char(string='Third-Party Store ID', copy=False, help="Identifier for the source store/branch from the third-party system")
+    thirdparty_qr_code_str = fields.Char(string='Cached ZATCA QR Code', readonly=True, copy=False,
+                                         help="QR code cached by the invoice report once the ZATCA submission is final")
 
     _sql_constraints = [
         ('thirdparty_invoice_no_uniq', 'unique (thirdparty_invoice_no)', 'Third-Party Invoice Number must be unique'),
     ]
 
+    def init(self):
+        super().init()
+        # Matches _get_report_page_query: equality on journal, range + keyset on (invoice_date, id).
+        # Lookups on thirdparty_invoice_no are served by the unique constraint's btree index;
+        # drop the identical index the field used to declare, it only cost writes.
+        drop_index(self.env.cr, 'account_move__thirdparty_invoice_no_index', self._table)
+        create_index(
+            self.env.cr,
+            'account_move_thirdparty_report_idx',
+            self._table,
+            ['journal_id', 'invoice_date', 'id'],
+            where="move_type IN ('out_invoice', 'out_refund')",
+        )
+
     @api.model
     def _prepare_zatka_invoice(self, vals):
         """
@@ -56,15 +92,22 @@ class AccountMove(models.Model):
             _logger.warning("Empty invoice list received")
             return {"status": "error", "message": "Invoice list is empty"}
 
+        # One query for the whole payload instead of a search_count per invoice
+        existing_moves = self._get_existing_thirdparty_moves(
+            [invoice_request.get('invoiceNo') for invoice_request in invoiceList]
+        )
+
         for invoice_request in invoiceList:
             invoice_no = invoice_request.get('invoiceNo', 'Unknown')
             _logger.info("Processing invoice: %s", invoice_no)
-            invoice_return = self._prepare_single_invoice(invoice_request)
+            invoice_return = self._prepare_single_invoice(invoice_request, existing_moves=existing_moves)
             response_list.append(invoice_return)
 
             if invoice_return.get('status') == 'success':
                 _logger.info("Invoice %s created successfully with ID: %s",
                            invoice_no, invoice_return.get('data', {}).get('id'))
+                # Later occurrences of the same number in this payload resolve to this move
+                existing_moves[invoice_no] = self.browse(invoice_return['data']['id'])
             else:
                 _logger.error("Invoice %s creation failed: %s",
                             invoice_no, invoice_return.get('message'))
@@ -75,15 +118,20 @@ class AccountMove(models.Model):
     @api.model
     def _report_odoo_invoices(self, vals):
         """
-        Retrieve invoices for a specific store and date.
+        Retrieve invoices for a specific store and date (or date range).
 
         This method is used by third-party systems to query invoices that were
-        created in Odoo, including their ZATCA submission status.
+        created in Odoo, including their ZATCA submission status. Stored amounts
+        are read straight from SQL in (invoice_date, id) order; pass ``limit`` to
+        page through large ranges with the returned ``next_cursor``.
 
         Args:
             vals (dict): Request data containing:
                 - store_id (str): Third-party store identifier
                 - date (str): Invoice date in YYYY-MM-DD format
+                - date_from / date_to (str): Date range in YYYY-MM-DD format, used instead of date
+                - limit (int): Optional page size (1-5000); all invoices are returned when omitted
+                - cursor (str): Optional next_cursor of the previous page
 
         Returns:
             dict: Response with structure:
@@ -101,50 +149,283 @@ class AccountMove(models.Model):
                     - invoice_zatka_status (str): ZATCA EDI state
                     - qr_code (str): ZATCA QR code
                     - store_id (str): Store identifier
+                - next_cursor (str): Cursor of the next page, None on the last page
                 - message (str): Error message if status is "error"
         """
+        error, params = self._parse_report_request(vals)
+        if error:
+            return error
+
+        store_id, date_from, date_to = params['store_id'], params['date_from'], params['date_to']
+        limit = params['limit']
+        next_cursor = None
+        if limit:
+            rows = self._read_report_page(params['journal_id'], date_from, date_to, limit, params['after'])
+            if len(rows) == limit:
+                next_cursor = self._encode_report_cursor(rows[-1])
+            lst_invoices = self._prepare_report_rows(rows, store_id)
+        else:
+            lst_invoices = []
+            for rows in self._iter_report_pages(params['journal_id'], date_from, date_to, after=params['after']):
+                lst_invoices.extend(self._prepare_report_rows(rows, store_id))
+
+        if lst_invoices:
+            _logger.info("Found %d invoices for store_id: %s, date: %s - %s",
+                         len(lst_invoices), store_id, date_from, date_to)
+        else:
+            _logger.info("No invoices found for store_id: %s, date: %s - %s", store_id, date_from, date_to)
+
+        return {"status": "success", "data": lst_invoices, "next_cursor": next_cursor}
+
+    @api.model
+    def _parse_report_request(self, vals):
+        """
+        Validate a report request and resolve its store journal.
+
+        Args:
+            vals (dict): Request data, see _report_odoo_invoices
+
+        Returns:
+            tuple: (error, params) where error is an error response dict or None, and params
+                holds store_id, journal_id, date_from, date_to, limit and after
+        """
         store_id = vals.get('store_id')
-        date = vals.get('date')
+        date_from = vals.get('date_from') or vals.get('date')
+        date_to = vals.get('date_to') or vals.get('date') or date_from
 
-        _logger.info("Reporting invoices for store_id: %s, date: %s", store_id, date)
+        _logger.info("Reporting invoices for store_id: %s, date: %s - %s", store_id, date_from, date_to)
 
         if not store_id:
             _logger.warning("Report request missing store_id")
-            return {"status": "error", "message": "Store ID is required"}
-        if not date:
+            return {"status": "error", "message": "Store ID is required"}, None
+        if not date_from:
             _logger.warning("Report request missing date")
-            return {"status": "error", "message": "Date is required"}
+            return {"status": "error", "message": "Date is required"}, None
 
-        journal = self.env['account.journal']
-        journal = journal.search([('thirdparty_store_id', '=', store_id)], limit=1)
-        if not journal.exists():
+        journal = self.env['account.journal']._get_by_thirdparty_store_id(store_id)
+        if not journal:
             _logger.error("No journal found for store_id: %s", store_id)
-            return {"status": "error", "message": "No Store Found"}
+            return {"status": "error", "message": "No Store Found"}, None
+
+        try:
+            date_from = fields.Date.to_date(date_from)
+            date_to = fields.Date.to_date(date_to)
+            after = self._decode_report_cursor(vals.get('cursor'))
+            limit = vals.get('limit')
+            if limit is not None:
+                limit = int(limit)
+                if not 0 < limit <= REPORT_MAX_PAGE_SIZE:
+                    raise ValueError(limit)
+        except (ValueError, TypeError):
+            _logger.warning("Report request with invalid date, limit or cursor for store_id: %s", store_id)
+            return {"status": "error", "message": "Invalid date, limit or cursor"}, None
+
+        return None, {
+            'store_id': store_id,
+            'journal_id': journal.id,
+            'date_from': date_from,
+            'date_to': date_to,
+            'limit': limit,
+            'after': after,
+        }
 
-        date = fields.Date.to_date(date)
-        read_fields = ['name', 'thirdparty_invoice_no', 'amount_untaxed',
-                       'amount_total', 'amount_tax', 'invoice_date',
-                       'l10n_sa_confirmation_datetime', 'state', 'edi_state',
-                       'l10n_sa_qr_code_str']
-        lst_invoices = self.search_read([('journal_id', '=', journal.id), ('invoice_date', '=', date)],
-                                        read_fields)
+    @api.model
+    def _stream_report_ndjson(self, params):
+        """
+        Return a generator writing the report as NDJSON, one invoice per line.
 
-        if lst_invoices:
-            lst_invoices = [{'odoo_invoice_id': invoice['id'], 'odoo_invoice_no': invoice['name'] or "",
-                             'thirdparty_invoice_no': invoice['thirdparty_invoice_no'] or "",
-                             'gross_amount': invoice['amount_untaxed'], 'net_amount': invoice['amount_total'],
-                             'tax_amount': invoice['amount_tax'], 'invoice_date': invoice['invoice_date'],
-                             'l10n_sa_confirmation_datetime': invoice['l10n_sa_confirmation_datetime'],
-                             'invoice_odoo_status': invoice['state'], 'invoice_zatka_status': invoice['edi_state'],
-                             'qr_code': invoice['l10n_sa_qr_code_str'], 'store_id': store_id
-                             }
-                            for invoice in lst_invoices]
-            _logger.info("Found %d invoices for store_id: %s, date: %s", len(lst_invoices), store_id, date)
-        else:
-            _logger.info("No invoices found for store_id: %s, date: %s", store_id, date)
-            lst_invoices = []
+        The response body is consumed after the request cursor is closed, so the
+        generator reads its pages on a cursor of its own. Memory stays bounded by
+        one page whatever the date range.
+
+        The HTTP status is sent before the first page is read, so the last line
+        tells a complete report from a truncated one: {"done": true, "count": N}
+        after the last invoice, or {"error": ..., "count": N, "next_cursor": ...}
+        when reading fails midway, the cursor resuming after the last invoice sent.
+
+        Args:
+            params (dict): Parsed request from _parse_report_request
+        """
+        registry, uid, su, context = self.env.registry, self.env.uid, self.env.su, dict(self.env.context)
 
-        return {"status": "success", "data": lst_invoices}
+        def generate():
+            count = 0
+            next_cursor = None
+            try:
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, uid, context, su=su)
+                    moves = env['account.move']
+                    for rows in moves._iter_report_pages(params['journal_id'], params['date_from'],
+                                                         params['date_to'], after=params['after']):
+                        items = moves._prepare_report_rows(rows, params['store_id'])
+                        yield ''.join(json.dumps(item, default=_json_default) + '\n' for item in items).encode()
+                        count += len(items)
+                        next_cursor = moves._encode_report_cursor(rows[-1])
+            except Exception:
+                _logger.exception("Report stream for store_id: %s failed after %d invoices", params['store_id'], count)
+                yield (json.dumps({"error": "Report interrupted, resume with next_cursor", "count": count,
+                                   "next_cursor": next_cursor}) + '\n').encode()
+                return
+            _logger.info("Streamed %d invoices for store_id: %s", count, params['store_id'])
+            yield (json.dumps({"done": True, "count": count}) + '\n').encode()
+
+        return generate()
+
+    @api.model
+    def _iter_report_pages(self, journal_id, date_from, date_to, page_size=REPORT_PAGE_SIZE, after=None):
+        """Yield raw report rows page by page, following the (invoice_date, id) keyset."""
+        while True:
+            rows = self._read_report_page(journal_id, date_from, date_to, page_size, after)
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            after = (rows[-1]['invoice_date'], rows[-1]['id'])
+
+    @api.model
+    def _read_report_page(self, journal_id, date_from, date_to, limit, after=None):
+        """
+        Read one page of report rows with stored values only.
+
+        Args:
+            journal_id (int): Store journal
+            date_from, date_to (date): Inclusive invoice date range
+            limit (int): Page size
+            after (tuple): (invoice_date, id) of the last row of the previous page
+
+        Returns:
+            list: Row dicts ordered by (invoice_date, id)
+        """
+        self.flush_model(REPORT_SQL_FIELDS + ['journal_id', 'move_type'])
+        self.env.cr.execute(*self._get_report_page_query(journal_id, date_from, date_to, limit, after))
+        return self.env.cr.dictfetchall()
+
+    @api.model
+    def _get_report_page_query(self, journal_id, date_from, date_to, limit, after=None):
+        """Return the (query, params) of one report page, kept in line with account_move_thirdparty_report_idx."""
+        query = f"""
+            SELECT {', '.join(REPORT_SQL_FIELDS)}, id
+              FROM account_move
+             WHERE journal_id = %s
+               AND move_type IN ('out_invoice', 'out_refund')
+               AND invoice_date BETWEEN %s AND %s
+        """
+        params = [journal_id, date_from, date_to]
+        if after:
+            query += " AND (invoice_date, id) > (%s, %s)"
+            params += list(after)
+        query += " ORDER BY invoice_date, id LIMIT %s"
+        params.append(limit)
+        return query, params
+
+    def _prepare_report_rows(self, rows, store_id):
+        """Format raw report rows as API items, filling in QR codes."""
+        qr_codes = self._get_report_qr_codes(rows)
+        return [{'odoo_invoice_id': row['id'], 'odoo_invoice_no': row['name'] or "",
+                 'thirdparty_invoice_no': row['thirdparty_invoice_no'] or "",
+                 'gross_amount': row['amount_untaxed'], 'net_amount': row['amount_total'],
+                 'tax_amount': row['amount_tax'], 'invoice_date': row['invoice_date'],
+                 'l10n_sa_confirmation_datetime': row['l10n_sa_confirmation_datetime'],
+                 'invoice_odoo_status': row['state'], 'invoice_zatka_status': row['edi_state'],
+                 'qr_code': qr_codes.get(row['id']), 'store_id': store_id
+                 }
+                for row in rows]
+
+    def _get_report_qr_codes(self, rows):
+        """
+        Return {move_id: QR string} for report rows.
+
+        The QR code is only computed for moves without a cached value. Posted
+        moves whose EDI processing is finished cannot change their QR anymore,
+        so their value is stored in thirdparty_qr_code_str for the next reports.
+        """
+        qr_codes = {row['id']: row['thirdparty_qr_code_str'] for row in rows if row['thirdparty_qr_code_str']}
+        missing = self.browse([row['id'] for row in rows if not row['thirdparty_qr_code_str']])
+        if not missing:
+            return qr_codes
+
+        to_cache = {}
+        for move in missing:
+            qr_codes[move.id] = move.l10n_sa_qr_code_str
+            if move.l10n_sa_qr_code_str and move.state == 'posted' and move.edi_state not in ('to_send', 'to_cancel'):
+                to_cache[move.id] = move.l10n_sa_qr_code_str
+        if to_cache:
+            # Raw UPDATE: a cache column must not go through the posted move write checks
+            self.env.cr.execute(
+                """
+                UPDATE account_move AS move
+                   SET thirdparty_qr_code_str = cache.qr_code
+                  FROM unnest(%s::int[], %s::varchar[]) AS cache(id, qr_code)
+                 WHERE move.id = cache.id
+                """,
+                [list(to_cache), list(to_cache.values())],
+            )
+            self.browse(to_cache).invalidate_recordset(['thirdparty_qr_code_str'])
+        return qr_codes
+
+    @api.model
+    def _encode_report_cursor(self, row):
+        return f"{row['invoice_date'].isoformat()}:{row['id']}"
+
+    @api.model
+    def _decode_report_cursor(self, cursor):
+        """Parse a 'YYYY-MM-DD:id' cursor into an (invoice_date, id) tuple."""
+        if not cursor:
+            return None
+        invoice_date, move_id = cursor.split(':')
+        return fields.Date.to_date(invoice_date), int(move_id)
+
+    @api.model
+    def _get_existing_thirdparty_moves(self, invoice_nos):
+        """
+        Map third-party invoice numbers that are already stored to their moves.
+
+        Args:
+            invoice_nos (list): Third-party invoice numbers, may contain duplicates or empty values
+
+        Returns:
+            dict: {thirdparty_invoice_no: account.move record}
+        """
+        invoice_nos = list({invoice_no for invoice_no in invoice_nos if invoice_no})
+        if not invoice_nos:
+            return {}
+        self.flush_model(['thirdparty_invoice_no'])
+        self.env.cr.execute(
+            "SELECT thirdparty_invoice_no, id FROM account_move WHERE thirdparty_invoice_no = ANY(%s)",
+            [invoice_nos],
+        )
+        return {invoice_no: self.browse(move_id) for invoice_no, move_id in self.env.cr.fetchall()}
+
+    @api.model
+    def _is_thirdparty_replay(self, move, journal_store, move_type):
+        """
+        Tell whether an existing move is a retry of the submission being processed.
+
+        Invoice numbers are unique across all stores, so a move of another store
+        or of another type is a collision, not a retry.
+
+        Args:
+            move: account.move record holding the submitted invoice number
+            journal_store: Journal of the submitting store (can be False for refunds)
+            move_type (str): 'out_invoice' or 'out_refund'
+
+        Returns:
+            bool: True if the existing move can be returned as the result
+        """
+        if move.move_type != move_type:
+            return False
+        return not journal_store or move.journal_id == journal_store
+
+    def _prepare_invoice_success_response(self, invoice):
+        """Build the per-invoice success payload returned to the third-party system."""
+        return {
+            "status": "success",
+            "data": {
+                'id': invoice.id,
+                'qr_code': invoice.l10n_sa_qr_code_str,
+                "odoo_invoice_no": invoice.name or ""
+            },
+        }
 
     def _get_default_partner(self):
         """Get or create the default Bashraheel partner for all invoices."""
@@ -206,12 +487,15 @@ class AccountMove(models.Model):
 
         return None
 
-    def _prepare_single_invoice(self, dct_invoice):
+    def _prepare_single_invoice(self, dct_invoice, existing_moves=None):
         """
         Process and create a single invoice from third-party data.
 
         This method validates invoice data, creates the invoice in Odoo,
         posts it, and submits it to ZATCA for e-invoicing compliance.
+        Submitting an invoice number that already exists for the same store and
+        type returns the existing invoice instead of creating a new one, so client
+        retries are safe; any other store or type gets an error.
 
         Args:
             dct_invoice (dict): Invoice data containing:
@@ -229,6 +513,8 @@ class AccountMove(models.Model):
                     - discount (float): Discount percentage (0-100)
                 - main_invoiceNo (str): Original invoice number (required for refunds)
                 - out_refund_type (str): 'full' or 'partial' (required for refunds)
+            existing_moves (dict): Optional {thirdparty_invoice_no: account.move} map
+                prefetched for the whole batch by _get_existing_thirdparty_moves
 
         Returns:
             dict: Response with structure:
@@ -295,10 +581,16 @@ class AccountMove(models.Model):
             return {"status": "error", "message": "InvoiceNo is required"}
 
         else:
-            invoice_count = invoice_created.search_count([('thirdparty_invoice_no', '=', invoiceNo)])
-            if invoice_count:
-                _logger.warning("Invoice %s: Duplicate invoice number detected", invoiceNo)
-                return {"status": "error", "message": f"InvoiceNo ({invoiceNo}) already exists"}
+            if existing_moves is None:
+                existing_moves = self._get_existing_thirdparty_moves([invoiceNo])
+            existing_invoice = existing_moves.get(invoiceNo)
+            if existing_invoice:
+                if not self._is_thirdparty_replay(existing_invoice, journal_store, move_type):
+                    _logger.warning("Invoice %s: Duplicate invoice number detected", invoiceNo)
+                    return {"status": "error", "message": f"InvoiceNo ({invoiceNo}) already exists"}
+                _logger.info("Invoice %s: Already exists with ID %s, returning existing invoice",
+                             invoiceNo, existing_invoice.id)
+                return self._prepare_invoice_success_response(existing_invoice)
 
         if not thirdparty_sa_confirmation_datetime:
             _logger.error("Invoice %s: Missing confirmation datetime", invoiceNo)
@@ -393,35 +685,38 @@ class AccountMove(models.Model):
                 else:
                     _logger.warning("Invoice %s: ZATCA submission may have issues (state: %s)", invoiceNo, invoice_created.edi_state)
         except Exception as error:
-            if isinstance(error, psycopg2.OperationalError) \
+            if isinstance(error, psycopg2.IntegrityError) \
+                    and error.pgcode == errorcodes.UNIQUE_VIOLATION \
+                    and error.diag.constraint_name == 'account_move_thirdparty_invoice_no_uniq':
+                # A concurrent submission inserted the same number first; the savepoint
+                # has been rolled back, so hand back the winner when it is visible to us.
+                existing_invoice = self._get_existing_thirdparty_moves([invoiceNo]).get(invoiceNo)
+                if existing_invoice and self._is_thirdparty_replay(existing_invoice, journal_store, move_type):
+                    _logger.info("Invoice %s: Created concurrently with ID %s, returning existing invoice",
+                                 invoiceNo, existing_invoice.id)
+                    return self._prepare_invoice_success_response(existing_invoice)
+                _logger.warning("Invoice %s: Created by a concurrent request", invoiceNo)
+                return {"status": "error", "message": f"InvoiceNo ({invoiceNo}) already exists"}
+            elif isinstance(error, psycopg2.OperationalError) \
                     and error.pgcode in CONCURRENCY_ERRORS:
                 _logger.warning(
                     "Invoice %s: Concurrency error occurred during processing",
                     invoiceNo
                 )
-                self.env.cr.rollback()
-                time.sleep(.1)
-                return {"status": "error", "message": "Concurrency error - please retry"}
+                return {"status": "error", "message": CONCURRENCY_RETRY_MESSAGE, "retryable": True}
             else:
+                # Posting or the ZATCA submission failed; the savepoint is rolled back so a retry starts over
                 _logger.exception("Invoice %s: Unexpected error during processing", invoiceNo)
                 msg = f'Invoice with ref {invoiceNo} failed during processing. Error details: {error}'
-                return {"status": "error", "message": msg}
+                return {"status": "error", "message": msg, "retryable": True}
 
-        return {
-            "status": "success",
-            "data": {
-                'id': invoice_created.id,
-                'qr_code': invoice_created.l10n_sa_qr_code_str,
-                "odoo_invoice_no": invoice_created.name or ""
-            },
-        }
+        return self._prepare_invoice_success_response(invoice_created)
 
     def _prepare_journal_store(self, store_dct):
         if not store_dct:
             return False
-        store_journal = self.env['account.journal']
         external_pos_store_id = store_dct.get('id')
-        store_journal = store_journal.search([('thirdparty_store_id', '=', external_pos_store_id)], limit=1)
+        store_journal = self.env['account.journal']._get_by_thirdparty_store_id(external_pos_store_id)
         if not store_journal:
             return False
         return store_journal
@@ -522,6 +817,11 @@ class AccountMove(models.Model):
         invoice_created = self.env["account.move"].create(invoice_return)
         return invoice_created
 
+    def button_draft(self):
+        # The cached QR code is only valid for the posted version of the move
+        self.filtered('thirdparty_qr_code_str').thirdparty_qr_code_str = False
+        return super().button_draft()
+
     def _post(self, soft=True):
         res = super()._post(soft)
         for move in self:
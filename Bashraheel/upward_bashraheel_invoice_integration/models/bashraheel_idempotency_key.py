@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, _, api
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_IDEMPOTENCY_TTL_HOURS = 24
+PARAM_KEY_IDEMPOTENCY_TTL_HOURS = "upward_bashraheel_invoice_integration.idempotency_ttl_hours"
+
+IDEMPOTENCY_IN_PROGRESS_MESSAGE = "A request with this Idempotency-Key is still in progress - please retry later"
+# Seconds advertised in Retry-After while the first request is still running
+IDEMPOTENCY_RETRY_AFTER = 5
+
+
+class IdempotencyKeyInProgress(UserError):
+    """Raised when another request holding the same Idempotency-Key has not finished yet."""
+
+    def __init__(self, message=IDEMPOTENCY_IN_PROGRESS_MESSAGE):
+        super().__init__(message)
+
+
+class BashraheelIdempotencyKey(models.Model):
+    _name = "bashraheel.idempotency.key"
+    _description = "Invoice API Idempotency Key"
+    _order = "id desc"
+
+    name = fields.Char(string='Idempotency Key', required=True, readonly=True)
+    endpoint = fields.Char(string='Endpoint', required=True, readonly=True)
+    request_hash = fields.Char(string='Request Hash', readonly=True)
+    response = fields.Text(string='Stored Response', readonly=True, help="JSON response returned to the first request")
+    expiration_date = fields.Datetime(string='Expires On', required=True, readonly=True, index=True)
+
+    _sql_constraints = [
+        ('name_endpoint_uniq', 'unique (name, endpoint)', 'Idempotency Key must be unique per endpoint'),
+    ]
+
+    @api.model
+    def _get_ttl_hours(self):
+        """Get how long stored responses are replayed, from system parameters."""
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            PARAM_KEY_IDEMPOTENCY_TTL_HOURS, str(DEFAULT_IDEMPOTENCY_TTL_HOURS)
+        )
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return DEFAULT_IDEMPOTENCY_TTL_HOURS
+
+    @api.model
+    def _hash_request(self, payload):
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    @api.model
+    def _run_idempotent(self, key, endpoint, payload, callback):
+        """
+        Run callback once per (key, endpoint) and replay its response afterwards.
+
+        The key is claimed before callback runs: a transaction-level advisory
+        lock makes a concurrent request with the same key fail fast instead of
+        creating the invoices a second time, and the key row is inserted right
+        away, so a request that committed the key after our snapshot makes the
+        insert fail with a serialization error and Odoo retries on a fresh one.
+
+        Args:
+            key (str): Value of the Idempotency-Key request header, may be empty
+            endpoint (str): Endpoint the key is scoped to
+            payload (dict): Request body, used to reject key reuse with another body
+            callback (callable): Produces the response when the key is unknown
+
+        Returns:
+            dict: The stored response on replay, otherwise the callback result
+
+        Raises:
+            UserError: If the key was already used with a different request body
+            IdempotencyKeyInProgress: If a request with the same key is still running
+        """
+        if not key:
+            return callback()
+
+        if not self._lock_key(key, endpoint):
+            _logger.info("Idempotency-Key %s: still in progress on %s", key, endpoint)
+            raise IdempotencyKeyInProgress()
+
+        request_hash = self._hash_request(payload)
+        record = self.sudo().search([('name', '=', key), ('endpoint', '=', endpoint)], limit=1)
+        if record and record.expiration_date > fields.Datetime.now():
+            if record.request_hash != request_hash:
+                _logger.warning("Idempotency-Key %s reused with a different request on %s", key, endpoint)
+                raise UserError(_("Idempotency-Key %s was already used with a different request", key))
+            if not record.response:
+                raise IdempotencyKeyInProgress()
+            _logger.info("Idempotency-Key %s: replaying stored response for %s", key, endpoint)
+            return json.loads(record.response)
+        if record:
+            # Expired entry for the same key, claimed again below
+            record.sudo().unlink()
+
+        record = self._claim_key(key, endpoint, request_hash)
+        response = callback()
+        if self._is_response_storable(response):
+            record.write({
+                'response': json.dumps(response, default=str),
+                'expiration_date': fields.Datetime.now() + timedelta(hours=self._get_ttl_hours()),
+            })
+        else:
+            # Retries must process the batch again
+            record.unlink()
+        return response
+
+    @api.model
+    def _lock_key(self, key, endpoint):
+        """Hold the key until the request's transaction ends; False if another request holds it."""
+        digest = hashlib.sha256(f"{endpoint}:{key}".encode()).digest()
+        lock_id = int.from_bytes(digest[:8], 'big', signed=True)
+        self.env.cr.execute("SELECT pg_try_advisory_xact_lock(%s)", [lock_id])
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _claim_key(self, key, endpoint, request_hash):
+        """
+        Insert the row of a key about to be processed, without its response yet.
+
+        Under REPEATABLE READ, ON CONFLICT raises a serialization failure when
+        the conflicting row was committed after our snapshot, which Odoo
+        retries; a plain insert would fail on the unique constraint instead.
+
+        Raises:
+            IdempotencyKeyInProgress: If the row exists but was not seen by the caller
+        """
+        self.flush_model()
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            INSERT INTO bashraheel_idempotency_key
+                (name, endpoint, request_hash, expiration_date, create_uid, create_date, write_uid, write_date)
+            VALUES (%(name)s, %(endpoint)s, %(request_hash)s, %(expiration_date)s, %(uid)s, %(now)s, %(uid)s, %(now)s)
+            ON CONFLICT (name, endpoint) DO NOTHING
+            RETURNING id
+        """, {
+            'name': key,
+            'endpoint': endpoint,
+            'request_hash': request_hash,
+            'expiration_date': now + timedelta(hours=self._get_ttl_hours()),
+            'uid': self.env.uid,
+            'now': now,
+        })
+        row = self.env.cr.fetchone()
+        if not row:
+            raise IdempotencyKeyInProgress()
+        return self.sudo().browse(row[0])
+
+    @api.model
+    def _is_response_storable(self, response):
+        """Only replay final outcomes: every invoice created or rejected by validation.
+
+        Items that failed on a concurrency error, while posting or in the ZATCA
+        submission are flagged `retryable`; their batch must be processed again
+        on retry instead of replaying the failure for the whole TTL.
+        """
+        if not isinstance(response, dict) or response.get('status') != 'success':
+            return False
+        return all(
+            isinstance(item, dict) and not item.get('retryable')
+            for item in response.get('data') or []
+        )
+
+    @api.model
+    def _gc_expired_keys(self):
+        """Cron: delete stored responses whose TTL has passed."""
+        expired = self.sudo().search([('expiration_date', '<=', fields.Datetime.now())])
+        _logger.info("Removing %d expired idempotency keys", len(expired))
+        expired.unlink()
@@ -0,0 +1,166 @@
+import logging
+import math
+import zlib
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+RATE_LIMIT_MESSAGE = "Too many requests - please retry later"
+
+# scope: (rate parameter, burst parameter, default requests per minute, default burst)
+RATE_LIMIT_SCOPES = {
+    'store': (
+        'upward_bashraheel_invoice_integration.rate_limit_store_per_minute',
+        'upward_bashraheel_invoice_integration.rate_limit_store_burst',
+        60, 20,
+    ),
+    'user': (
+        'upward_bashraheel_invoice_integration.rate_limit_user_per_minute',
+        'upward_bashraheel_invoice_integration.rate_limit_user_burst',
+        300, 50,
+    ),
+}
+
+
+# Invoice creation requests a store may have running at once; 0 disables the cap
+PARAM_KEY_STORE_CONCURRENCY = 'upward_bashraheel_invoice_integration.rate_limit_store_concurrency'
+DEFAULT_STORE_CONCURRENCY = 4
+# Retry-After (seconds) when every in-flight slot of a store is taken
+CONCURRENCY_RETRY_AFTER = 2
+
+
+class BashraheelRateLimitBucket(models.Model):
+    """
+    Token buckets shared by all workers, one row per store or API user.
+
+    A bucket holds up to `burst` tokens and refills at `per_minute` tokens
+    per minute; each invoice creation request takes one. The refill and the
+    take happen in a single upsert on a short-lived cursor, so the row lock
+    is not held for the duration of the invoice request.
+
+    Tokens bound the request rate, not the requests in flight: they refill
+    during slow ZATCA submissions. Each store also has a fixed number of
+    in-flight slots, taken as transaction-level advisory locks on the
+    request's cursor, so they are released when the request's transaction
+    ends, whatever the outcome.
+    """
+    _name = "bashraheel.rate.limit.bucket"
+    _description = "Invoice API Rate Limit Bucket"
+    _log_access = False
+
+    name = fields.Char(string='Key', required=True, readonly=True)
+    tokens = fields.Float(string='Tokens', readonly=True)
+    updated_at = fields.Datetime(string='Updated On', readonly=True, index=True)
+
+    _sql_constraints = [
+        ('name_uniq', 'unique (name)', 'Rate limit key must be unique'),
+    ]
+
+    @api.model
+    def _get_limit(self, scope):
+        """Get (requests per minute, burst) of a scope; 0 requests per minute disables it."""
+        rate_param, burst_param, default_rate, default_burst = RATE_LIMIT_SCOPES[scope]
+        params = self.env['ir.config_parameter'].sudo()
+        try:
+            rate = float(params.get_param(rate_param, default_rate))
+            burst = max(float(params.get_param(burst_param, default_burst)), 1.0)
+        except (ValueError, TypeError):
+            rate, burst = default_rate, default_burst
+        return rate, burst
+
+    @api.model
+    def _get_store_concurrency(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            PARAM_KEY_STORE_CONCURRENCY, str(DEFAULT_STORE_CONCURRENCY)
+        )
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return DEFAULT_STORE_CONCURRENCY
+
+    @api.model
+    def _get_request_keys(self, body, user_id):
+        """Get the (scope, key) buckets an invoice creation request draws from."""
+        keys = [('user', 'user:%s' % user_id)] if user_id else []
+        store_ids = {
+            (invoice.get('store') or {}).get('id')
+            for invoice in (body or {}).get('invoiceList') or []
+            if isinstance(invoice, dict) and isinstance(invoice.get('store'), dict)
+        }
+        keys.extend(('store', 'store:%s' % store_id) for store_id in sorted(store_ids, key=str) if store_id)
+        return keys
+
+    @api.model
+    def _acquire_slot(self, key, slots):
+        """Take one of the `slots` in-flight slots of key until the request's transaction ends."""
+        lock_id = zlib.crc32(key.encode())
+        lock_id -= (lock_id & 0x80000000) << 1  # signed int4
+        for slot in range(slots):
+            self.env.cr.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", [lock_id, slot])
+            if self.env.cr.fetchone()[0]:
+                return True
+        return False
+
+    @api.model
+    def _consume(self, keys):
+        """
+        Take one token from each bucket and an in-flight slot of each store.
+
+        Either every bucket gives a token or none does: a request throttled
+        by one bucket does not spend the tokens of the others.
+
+        Args:
+            keys (list): (scope, key) pairs, see _get_request_keys
+
+        Returns:
+            int: 0 if the request may proceed, otherwise the seconds to wait
+                before retrying (for the Retry-After header)
+        """
+        limits = [(key, *self._get_limit(scope)) for scope, key in keys]
+        limits = [(key, rate / 60.0, burst) for key, rate, burst in limits if rate > 0]
+        concurrency = self._get_store_concurrency()
+        store_keys = [key for scope, key in keys if scope == 'store'] if concurrency > 0 else []
+        if not limits and not store_keys:
+            return 0
+
+        with self.env.registry.cursor() as cr:
+            for key, rate, burst in limits:
+                cr.execute("""
+                    INSERT INTO bashraheel_rate_limit_bucket AS b (name, tokens, updated_at)
+                    VALUES (%(key)s, %(burst)s - 1, clock_timestamp() AT TIME ZONE 'UTC')
+                    ON CONFLICT (name) DO UPDATE SET
+                        tokens = LEAST(%(burst)s, b.tokens + EXTRACT(EPOCH FROM (clock_timestamp() AT TIME ZONE 'UTC') - b.updated_at) * %(rate)s) - 1,
+                        updated_at = clock_timestamp() AT TIME ZONE 'UTC'
+                    WHERE LEAST(%(burst)s, b.tokens + EXTRACT(EPOCH FROM (clock_timestamp() AT TIME ZONE 'UTC') - b.updated_at) * %(rate)s) >= 1
+                    RETURNING b.tokens
+                """, {'key': key, 'rate': rate, 'burst': burst})
+                if cr.rowcount:
+                    continue
+
+                cr.execute("""
+                    SELECT LEAST(%(burst)s, tokens + EXTRACT(EPOCH FROM (clock_timestamp() AT TIME ZONE 'UTC') - updated_at) * %(rate)s)
+                    FROM bashraheel_rate_limit_bucket WHERE name = %(key)s
+                """, {'key': key, 'rate': rate, 'burst': burst})
+                row = cr.fetchone()
+                available = row[0] if row else 0.0
+                retry_after = max(1, math.ceil((1 - available) / rate))
+                _logger.warning("Rate limit reached for %s, retry after %ss", key, retry_after)
+                # Give back the tokens already taken from the other buckets
+                cr.rollback()
+                return retry_after
+
+            for key in store_keys:
+                if not self._acquire_slot(key, concurrency):
+                    _logger.warning("%s already has %d invoice requests in flight", key, concurrency)
+                    cr.rollback()
+                    return CONCURRENCY_RETRY_AFTER
+        return 0
+
+    @api.model
+    def _gc_idle_buckets(self):
+        """Cron: delete buckets idle for a day, they would be full anyway."""
+        self.env.cr.execute(
+            "DELETE FROM bashraheel_rate_limit_bucket WHERE updated_at < (NOW() AT TIME ZONE 'UTC') - INTERVAL '1 day'"
+        )
+        _logger.info("Removed %d idle rate limit buckets", self.env.cr.rowcount)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+Request schemas of the invoice API, shared by the JSON-RPC controller and
+the FastAPI routers (upward_bashraheel_fastapi).
+"""
+
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class RequestModel(BaseModel):
+    """Base of the request schemas: POS systems may send numeric ids and codes"""
+    model_config = {"coerce_numbers_to_str": True}
+
+
+# ============ Invoice Line Schemas ============
+
+class InvoiceLineRequest(RequestModel):
+    """Schema for a single invoice line item"""
+    skuCode: str = Field(..., description="Product SKU code")
+    skuid: Optional[str] = Field(None, description="Product SKU ID")
+    qty: float = Field(..., gt=0, description="Quantity (must be > 0)")
+    sellingPrice: float = Field(..., ge=0, description="Selling price per unit")
+    discount: float = Field(default=0, ge=0, le=100, description="Discount percentage (0-100)")
+
+
+# ============ Store Schema ============
+
+class StoreInfo(RequestModel):
+    """Schema for store information"""
+    id: str = Field(..., description="Store identifier")
+
+
+# ============ Invoice Request Schemas ============
+
+class InvoiceRequest(RequestModel):
+    """Schema for a single invoice in the request"""
+    invoiceNo: str = Field(..., description="Third-party invoice number (unique)")
+    move_type: str = Field(..., pattern="^(out_invoice|out_refund)$", description="Invoice type")
+    documentDate: str = Field(..., description="Document date (YYYY-MM-DD)")
+    thirdparty_sa_confirmation_datetime: Optional[str] = Field(
+        None, description="Confirmation datetime from third-party (YYYY-MM-DD HH:MM:SS)"
+    )
+    store: Optional[StoreInfo] = Field(None, description="Store information (required for out_invoice)")
+    lines: List[InvoiceLineRequest] = Field(..., min_length=1, description="Invoice line items")
+    main_invoiceNo: Optional[str] = Field(None, description="Original invoice number (required for refunds)")
+    out_refund_type: Optional[str] = Field(
+        None, pattern="^(full|partial)$", description="Refund type (required for refunds)"
+    )
+
+
+class CreateInvoiceRequest(RequestModel):
+    """Schema for creating invoices (batch)"""
+    invoiceList: List[InvoiceRequest] = Field(..., min_length=1, description="List of invoices to create")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "invoiceList": [{
+                        "invoiceNo": "INV-001",
+                        "move_type": "out_invoice",
+                        "documentDate": "2025-02-15",
+                        "thirdparty_sa_confirmation_datetime": "2025-02-15 10:30:00",
+                        "store": {"id": "STORE001"},
+                        "lines": [
+                            {"skuCode": "FURN_0001", "qty": 2, "sellingPrice": 100.0, "discount": 0}
+                        ]
+                    }]
+                },
+                {
+                    "invoiceList": [{
+                        "invoiceNo": "REF-001",
+                        "main_invoiceNo": "INV-001",
+                        "move_type": "out_refund",
+                        "out_refund_type": "partial",
+                        "documentDate": "2025-02-16",
+                        "thirdparty_sa_confirmation_datetime": "2025-02-16 11:00:00",
+                        "store": {"id": "STORE001"},
+                        "lines": [
+                            {"skuCode": "FURN_0001", "qty": 1, "sellingPrice": 100.0, "discount": 0}
+                        ]
+                    }]
+                },
+                {
+                    "invoiceList": [{
+                        "invoiceNo": "REF-002",
+                        "main_invoiceNo": "INV-001",
+                        "move_type": "out_refund",
+                        "out_refund_type": "full",
+                        "documentDate": "2025-02-16",
+                        "thirdparty_sa_confirmation_datetime": "2025-02-16 11:00:00",
+                        "store": {"id": "STORE001"},
+                        "lines": [
+                            {"skuCode": "DUMMY", "qty": 1, "sellingPrice": 0, "discount": 0}
+                        ]
+                    }]
+                }
+            ]
+        }
+    }
+
+
+# ============ Report Request Schemas ============
+
+class ReportInvoicesRequest(RequestModel):
+    """Schema for querying invoices"""
+    store_id: str = Field(..., description="Store identifier")
+    date: Optional[str] = Field(None, description="Invoice date (YYYY-MM-DD)")
+    date_from: Optional[str] = Field(None, description="Range start (YYYY-MM-DD), used instead of date")
+    date_to: Optional[str] = Field(None, description="Range end (YYYY-MM-DD), defaults to date_from")
+    limit: Optional[int] = Field(None, gt=0, le=5000, description="Page size; all invoices are returned when omitted")
+    cursor: Optional[str] = Field(None, description="next_cursor returned by the previous page")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {"store_id": "STORE001", "date": "2025-02-15"},
+                {"store_id": "STORE001", "date_from": "2025-02-01", "date_to": "2025-02-28", "limit": 500},
+            ]
+        }
+    }
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+from . import test_idempotency
+from . import test_invoice_duplicates
+from . import test_query_plans
+from . import test_rate_limit
+from . import test_report_pagination
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.sql_db import db_connect
+from odoo.tests import TransactionCase, tagged
+
+from ..models.bashraheel_idempotency_key import IdempotencyKeyInProgress
+
+ENDPOINT = '/invoice/create'
+
+
+@tagged('post_install', '-at_install')
+class TestIdempotency(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.keys = self.env['bashraheel.idempotency.key']
+        self.calls = 0
+
+    def _callback(self, response=None):
+        def callback():
+            self.calls += 1
+            return response or {'status': 'success', 'data': [{'status': 'success', 'data': {'id': self.calls}}]}
+        return callback
+
+    def test_replay_returns_stored_response(self):
+        payload = {'invoiceList': [{'invoiceNo': 'IDEM-001'}]}
+        first = self.keys._run_idempotent('KEY-1', ENDPOINT, payload, self._callback())
+        second = self.keys._run_idempotent('KEY-1', ENDPOINT, payload, self._callback())
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(first, second)
+        # Keys are scoped to their endpoint
+        self.keys._run_idempotent('KEY-1', '/invoice/create-return', payload, self._callback())
+        self.assertEqual(self.calls, 2)
+
+    def test_key_reuse_with_other_body_is_rejected(self):
+        self.keys._run_idempotent('KEY-2', ENDPOINT, {'invoiceList': [{'invoiceNo': 'A'}]}, self._callback())
+        with self.assertRaises(UserError):
+            self.keys._run_idempotent('KEY-2', ENDPOINT, {'invoiceList': [{'invoiceNo': 'B'}]}, self._callback())
+        self.assertEqual(self.calls, 1)
+
+    def test_expired_key_runs_again(self):
+        payload = {'invoiceList': [{'invoiceNo': 'IDEM-003'}]}
+        self.keys._run_idempotent('KEY-3', ENDPOINT, payload, self._callback())
+        record = self.keys.search([('name', '=', 'KEY-3')])
+        record.expiration_date = fields.Datetime.now() - timedelta(seconds=1)
+        response = self.keys._run_idempotent('KEY-3', ENDPOINT, payload, self._callback())
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(response['data'][0]['data']['id'], 2)
+        self.assertEqual(self.keys.search_count([('name', '=', 'KEY-3')]), 1)
+
+    def test_retryable_response_is_not_stored(self):
+        payload = {'invoiceList': [{'invoiceNo': 'IDEM-004'}]}
+        retryable = {'status': 'success', 'data': [{'status': 'error', 'retryable': True}]}
+        self.keys._run_idempotent('KEY-4', ENDPOINT, payload, self._callback(retryable))
+        self.assertFalse(self.keys.search([('name', '=', 'KEY-4')]))
+        self.keys._run_idempotent('KEY-4', ENDPOINT, payload, self._callback(retryable))
+        self.assertEqual(self.calls, 2)
+
+    def test_key_in_progress_is_not_run_twice(self):
+        payload = {'invoiceList': [{'invoiceNo': 'IDEM-005'}]}
+        # Another connection holds the key, as the first request would while waiting on ZATCA
+        with db_connect(self.env.cr.dbname).cursor() as other_cr:
+            other = self.keys.with_env(self.env(cr=other_cr))
+            self.assertTrue(other._lock_key('KEY-5', ENDPOINT))
+            with self.assertRaises(IdempotencyKeyInProgress):
+                self.keys._run_idempotent('KEY-5', ENDPOINT, payload, self._callback())
+            other_cr.rollback()
+        self.assertEqual(self.calls, 0)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestInvoiceDuplicates(AccountTestInvoicingCommon):
+    """An invoice number already stored is a retry only for the same store and type."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.journal_a = cls.env['account.journal'].create({
+            'name': 'Store A', 'code': 'TSTA', 'type': 'sale', 'thirdparty_store_id': 'DUP-STORE-A',
+        })
+        cls.journal_b = cls.env['account.journal'].create({
+            'name': 'Store B', 'code': 'TSTB', 'type': 'sale', 'thirdparty_store_id': 'DUP-STORE-B',
+        })
+        cls.existing = cls.env['account.move'].create({
+            'move_type': 'out_invoice',
+            'partner_id': cls.partner_a.id,
+            'journal_id': cls.journal_a.id,
+            'thirdparty_invoice_no': 'DUP-001',
+            'invoice_line_ids': [(0, 0, {'name': 'DUP-SKU', 'quantity': 1, 'price_unit': 100.0})],
+        })
+
+    def _submit(self, store_id, move_type='out_invoice'):
+        return self.env['account.move']._prepare_single_invoice({
+            'invoiceNo': 'DUP-001',
+            'move_type': move_type,
+            'documentDate': '2025-02-15',
+            'thirdparty_sa_confirmation_datetime': '2025-02-15 10:30:00',
+            'store': {'id': store_id},
+            'lines': [{'skuCode': 'DUP-SKU', 'qty': 1, 'sellingPrice': 100.0, 'discount': 0}],
+        })
+
+    def test_same_store_retry_returns_existing_invoice(self):
+        result = self._submit('DUP-STORE-A')
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['data']['id'], self.existing.id)
+
+    def test_other_store_collision_is_rejected(self):
+        result = self._submit('DUP-STORE-B')
+        self.assertEqual(result, {"status": "error", "message": "InvoiceNo (DUP-001) already exists"})
+        self.assertEqual(self.env['account.move'].search_count([('thirdparty_invoice_no', '=', 'DUP-001')]), 1)
+
+    def test_other_move_type_collision_is_rejected(self):
+        result = self._submit('DUP-STORE-A', move_type='out_refund')
+        self.assertEqual(result['status'], 'error')
+
+    def test_replay_check(self):
+        Move = self.env['account.move']
+        self.assertTrue(Move._is_thirdparty_replay(self.existing, self.journal_a, 'out_invoice'))
+        self.assertFalse(Move._is_thirdparty_replay(self.existing, self.journal_b, 'out_invoice'))
+        self.assertFalse(Move._is_thirdparty_replay(self.existing, self.journal_a, 'out_refund'))
+        # Refunds may come without a store, the type must still match
+        self.assertTrue(Move._is_thirdparty_replay(self.existing, False, 'out_invoice'))
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+import json
+from datetime import date
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestInvoiceQueryPlans(TransactionCase):
+    """Guard the indexes used by the third-party report and duplicate checks.
+
+    The test tables are tiny, so sequential scans are disabled to see which
+    index the planner would pick on a production-sized table.
+    """
+
+    def _explain(self, query, params):
+        self.env.cr.execute("SET LOCAL enable_seqscan = off")
+        self.env.cr.execute("EXPLAIN (FORMAT JSON) " + query, params)
+        return json.dumps(self.env.cr.fetchone()[0])
+
+    def test_report_page_uses_report_index(self):
+        query, params = self.env['account.move']._get_report_page_query(
+            1, date(2025, 1, 1), date(2025, 12, 31), 500, after=(date(2025, 2, 1), 10)
+        )
+        plan = self._explain(query, params)
+        self.assertIn('account_move_thirdparty_report_idx', plan)
+
+    def test_duplicate_check_uses_unique_index(self):
+        plan = self._explain(
+            "SELECT thirdparty_invoice_no, id FROM account_move WHERE thirdparty_invoice_no = ANY(%s)",
+            [['INV-001', 'INV-002']],
+        )
+        self.assertIn('account_move_thirdparty_invoice_no_uniq', plan)
+
+    def test_store_journal_lookup_uses_index(self):
+        plan = self._explain(
+            "SELECT id FROM account_journal WHERE thirdparty_store_id = %s",
+            ['STORE001'],
+        )
+        self.assertIn('account_journal__thirdparty_store_id_index', plan)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+from odoo.sql_db import db_connect
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestRateLimit(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        # Buckets are consumed on their own cursor, keep it inside the test transaction
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        self.env['ir.config_parameter'].sudo().set_param(
+            'upward_bashraheel_invoice_integration.rate_limit_store_per_minute', 6)
+        self.env['ir.config_parameter'].sudo().set_param(
+            'upward_bashraheel_invoice_integration.rate_limit_store_burst', 2)
+        self.buckets = self.env['bashraheel.rate.limit.bucket']
+
+    def test_request_keys(self):
+        body = {'invoiceList': [
+            {'invoiceNo': 'INV-1', 'store': {'id': 'STORE001'}},
+            {'invoiceNo': 'INV-2', 'store': {'id': 'STORE001'}},
+            {'invoiceNo': 'INV-3', 'store': {'id': 'STORE002'}},
+        ]}
+        self.assertEqual(self.buckets._get_request_keys(body, 7), [
+            ('user', 'user:7'), ('store', 'store:STORE001'), ('store', 'store:STORE002'),
+        ])
+
+    def test_store_is_throttled_after_burst(self):
+        keys = [('store', 'store:RATE-LIMIT-TEST')]
+        self.assertEqual(self.buckets._consume(keys), 0)
+        self.assertEqual(self.buckets._consume(keys), 0)
+        # 6 requests per minute: the next token is about 10 seconds away
+        retry_after = self.buckets._consume(keys)
+        self.assertGreaterEqual(retry_after, 1)
+        self.assertLessEqual(retry_after, 10)
+        # Other stores keep their own budget
+        self.assertEqual(self.buckets._consume([('store', 'store:RATE-LIMIT-OTHER')]), 0)
+
+    def test_throttled_request_spends_no_token(self):
+        self.env['ir.config_parameter'].sudo().set_param(
+            'upward_bashraheel_invoice_integration.rate_limit_user_per_minute', 6)
+        self.env['ir.config_parameter'].sudo().set_param(
+            'upward_bashraheel_invoice_integration.rate_limit_user_burst', 3)
+        keys = [('user', 'user:RATE-LIMIT-TEST'), ('store', 'store:RATE-LIMIT-TEST')]
+        self.assertEqual(self.buckets._consume(keys), 0)
+        self.assertEqual(self.buckets._consume(keys), 0)
+        # The store is out of tokens: the user's last token must be kept
+        self.assertGreaterEqual(self.buckets._consume(keys), 1)
+        self.assertEqual(self.buckets._consume([('user', 'user:RATE-LIMIT-TEST')]), 0)
+
+    def test_store_in_flight_cap(self):
+        self.env['ir.config_parameter'].sudo().set_param(
+            'upward_bashraheel_invoice_integration.rate_limit_store_concurrency', 1)
+        keys = [('store', 'store:RATE-LIMIT-TEST')]
+        # Another connection holds the only slot of the store, as a request in flight would
+        with db_connect(self.env.cr.dbname).cursor() as other_cr:
+            other = self.buckets.with_env(self.env(cr=other_cr))
+            self.assertTrue(other._acquire_slot('store:RATE-LIMIT-TEST', 1))
+            self.assertGreaterEqual(self.buckets._consume(keys), 1)
+        # Released with the other transaction
+        self.assertEqual(self.buckets._consume(keys), 0)
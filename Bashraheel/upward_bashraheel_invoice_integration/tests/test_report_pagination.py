@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import json
+from datetime import date
+from unittest.mock import patch
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestReportPagination(AccountTestInvoicingCommon):
+    """Keyset pagination of the third-party report, on (invoice_date, id)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.journal = cls.env['account.journal'].create({
+            'name': 'Report Store', 'code': 'TSTR', 'type': 'sale', 'thirdparty_store_id': 'REPORT-STORE',
+        })
+        # Most invoices share a date, so page boundaries fall inside the same invoice_date
+        dates = [date(2025, 2, 15)] * 7 + [date(2025, 2, 16)] * 2
+        cls.moves = cls.env['account.move'].create([{
+            'move_type': 'out_invoice',
+            'partner_id': cls.partner_a.id,
+            'journal_id': cls.journal.id,
+            'invoice_date': invoice_date,
+            'thirdparty_invoice_no': 'REPORT-%03d' % index,
+            'invoice_line_ids': [(0, 0, {'name': 'REPORT-SKU', 'quantity': 1, 'price_unit': 100.0})],
+        } for index, invoice_date in enumerate(dates)])
+
+    def _report(self, **vals):
+        return self.env['account.move']._report_odoo_invoices(dict({
+            'store_id': 'REPORT-STORE', 'date_from': '2025-02-01', 'date_to': '2025-02-28',
+        }, **vals))
+
+    def test_pages_cover_every_invoice_once(self):
+        ids, cursor, pages = [], None, 0
+        while True:
+            result = self._report(limit=3, cursor=cursor)
+            self.assertEqual(result['status'], 'success')
+            ids += [item['odoo_invoice_id'] for item in result['data']]
+            pages += 1
+            cursor = result['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(ids, self.moves.sorted(lambda move: (move.invoice_date, move.id)).ids)
+        # 9 invoices by 3: the third page is full, so a fourth (empty) one ends the report
+        self.assertEqual(pages, 4)
+
+    def test_unpaged_report_and_iterator_match(self):
+        expected = self.moves.sorted(lambda move: (move.invoice_date, move.id)).ids
+        self.assertEqual([item['odoo_invoice_id'] for item in self._report()['data']], expected)
+        pages = list(self.env['account.move']._iter_report_pages(
+            self.journal.id, date(2025, 2, 1), date(2025, 2, 28), page_size=2))
+        self.assertEqual([len(rows) for rows in pages], [2, 2, 2, 2, 1])
+        self.assertEqual([row['id'] for rows in pages for row in rows], expected)
+
+    def _stream(self):
+        # The stream reads on its own cursor, keep it inside the test transaction
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        error, params = self.env['account.move']._parse_report_request({
+            'store_id': 'REPORT-STORE', 'date_from': '2025-02-01', 'date_to': '2025-02-28',
+        })
+        self.assertIsNone(error)
+        body = b''.join(self.env['account.move']._stream_report_ndjson(params))
+        return [json.loads(line) for line in body.decode().splitlines()]
+
+    def test_stream_ends_with_status_line(self):
+        lines = self._stream()
+        self.assertEqual(lines[-1], {'done': True, 'count': 9})
+        self.assertEqual(len(lines), 10)
+
+    def test_interrupted_stream_ends_with_error_line(self):
+        Move = type(self.env['account.move'])
+        iter_pages = Move._iter_report_pages
+
+        def failing_pages(moves, journal_id, date_from, date_to, page_size=None, after=None):
+            # The database goes away while the second page is read
+            pages = iter_pages(moves, journal_id, date_from, date_to, page_size=4, after=after)
+            yield next(pages)
+            raise RuntimeError('connection lost')
+
+        with patch.object(Move, '_iter_report_pages', failing_pages):
+            lines = self._stream()
+        status = lines[-1]
+        self.assertIn('error', status)
+        self.assertEqual(status['count'], 4)
+        # Resuming from the cursor returns the invoices after the last one sent
+        resumed = self._report(cursor=status['next_cursor'])['data']
+        self.assertEqual([item['odoo_invoice_id'] for item in lines[:-1] + resumed],
+                         self.moves.sorted(lambda move: (move.invoice_date, move.id)).ids)
+
+    def test_cursor(self):
+        Move = self.env['account.move']
+        move = self.moves[3]
+        cursor = Move._encode_report_cursor({'invoice_date': move.invoice_date, 'id': move.id})
+        self.assertEqual(cursor, '2025-02-15:%d' % move.id)
+        self.assertEqual(Move._decode_report_cursor(cursor), (date(2025, 2, 15), move.id))
+        self.assertIsNone(Move._decode_report_cursor(None))
+        for invalid in ('2025-02-15', '2025-02-15:abc', 'tomorrow:1'):
+            self.assertEqual(self._report(cursor=invalid)['status'], 'error')
+
+    def test_cached_qr_code_is_served_and_reset_on_draft(self):
+        move = self.moves[0]
+        move.action_post()
+        # Cache column, written in SQL as the report does
+        self.env.cr.execute(
+            "UPDATE account_move SET thirdparty_qr_code_str = %s WHERE id = %s", ['CACHED-QR', move.id])
+        move.invalidate_recordset(['thirdparty_qr_code_str'])
+        items = {item['odoo_invoice_id']: item for item in self._report()['data']}
+        self.assertEqual(items[move.id]['qr_code'], 'CACHED-QR')
+
+        move.button_draft()
+        self.assertFalse(move.thirdparty_qr_code_str)
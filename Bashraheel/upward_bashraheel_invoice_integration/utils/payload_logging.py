@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""
+Size-bounded, sampled logging of invoice API payloads.
+
+Instead of the full body, each request logs one line with a digest, the
+payload size and invoice/store counts. A body excerpt, truncated, is only
+added for a sampled share of the requests. Records go through a
+QueueHandler: formatting and writing to Odoo's log handlers happen on a
+listener thread, not on the request thread.
+"""
+
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+
+PAYLOAD_LOGGER_NAME = "odoo.addons.upward_bashraheel_invoice_integration.payload"
+
+PARAM_KEY_SAMPLE_RATE = "upward_bashraheel_invoice_integration.payload_log_sample_rate"
+PARAM_KEY_MAX_CHARS = "upward_bashraheel_invoice_integration.payload_log_max_chars"
+DEFAULT_SAMPLE_RATE = 0.0
+DEFAULT_MAX_CHARS = 2000
+
+_payload_logger = logging.getLogger(PAYLOAD_LOGGER_NAME)
+_listener_lock = threading.Lock()
+_listener_pid = None
+
+
+def _ensure_listener():
+    """Start the queue listener once per process (again after a prefork fork)."""
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(
+            log_queue, *logging.getLogger().handlers, respect_handler_level=True
+        )
+        listener.start()
+        _payload_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+        _payload_logger.propagate = False
+        _listener_pid = os.getpid()
+
+
+def _get_settings(env):
+    params = env['ir.config_parameter'].sudo()
+    try:
+        sample_rate = float(params.get_param(PARAM_KEY_SAMPLE_RATE, DEFAULT_SAMPLE_RATE))
+        max_chars = int(params.get_param(PARAM_KEY_MAX_CHARS, DEFAULT_MAX_CHARS))
+    except (ValueError, TypeError):
+        sample_rate, max_chars = DEFAULT_SAMPLE_RATE, DEFAULT_MAX_CHARS
+    return sample_rate, max_chars
+
+
+def log_payload(env, label, payload):
+    """
+    Log a request payload as a digest plus counts, with a sampled excerpt.
+
+    Args:
+        env: Odoo environment, to read the logging settings
+        label (str): Endpoint or operation the payload was received on
+        payload (dict): Decoded request body
+    """
+    if not _payload_logger.isEnabledFor(logging.INFO):
+        return
+    _ensure_listener()
+
+    raw = json.dumps(payload, sort_keys=True, default=str)
+    invoices = payload.get('invoiceList') if isinstance(payload, dict) else None
+    invoices = invoices if isinstance(invoices, list) else []
+    stores = sorted({
+        str(invoice['store'].get('id'))
+        for invoice in invoices
+        if isinstance(invoice, dict) and isinstance(invoice.get('store'), dict)
+    })
+    if not stores and isinstance(payload, dict) and payload.get('store_id'):
+        stores = [str(payload['store_id'])]
+
+    summary = {
+        # The log formatter runs on the listener thread, which knows no database
+        'db': env.cr.dbname,
+        'label': label,
+        'digest': hashlib.sha256(raw.encode()).hexdigest()[:16],
+        'bytes': len(raw),
+        'invoices': len(invoices),
+        'stores': stores,
+    }
+    sample_rate, max_chars = _get_settings(env)
+    if sample_rate and random.random() < sample_rate:
+        summary['sample'] = raw[:max_chars] + ('...' if len(raw) > max_chars else '')
+
+    _payload_logger.info(
+        "%(db)s %(label)s payload digest=%(digest)s bytes=%(bytes)d invoices=%(invoices)d stores=%(stores)s", summary,
+        extra={'payload_summary': summary},
+    )
+    if 'sample' in summary:
+        _payload_logger.info("%s %s payload sample %s: %s", summary['db'], label, summary['digest'], summary['sample'])
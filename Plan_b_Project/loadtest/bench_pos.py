@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the POS Tamara payment flow against tamara_mock.py.
+
+Every simulated terminal does what payment_tamara.js does: one
+proxy_tamara_checkout RPC per payment, then waits for the status. The status
+comes from the webhook (push) and proxy_tamara_poll runs every
+--poll-interval seconds as the fallback. Run it with --poll-interval 5
+--poll-only to reproduce the former polling-only behaviour.
+
+Reports RPC counts, Tamara API calls (from the mock's /stats), time from
+checkout to confirmation and, with --dsn, the database writes of the run.
+
+    python bench_pos.py --login admin --password admin --db tamara --terminals 20 --payments 10 \\
+        --dsn "dbname=tamara" --mock-url http://127.0.0.1:8098
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+FINAL_STATUSES = ("approved", "declined", "expired", "failed", "canceled")
+
+DB_STATS_QUERY = """
+    SELECT xact_commit, tup_inserted, tup_updated, tup_deleted
+    FROM pg_stat_database WHERE datname = current_database()
+"""
+TABLE_STATS_QUERY = """
+    SELECT relname, n_tup_ins, n_tup_upd
+    FROM pg_stat_user_tables
+    WHERE relname IN ('pos_payment_method', 'pos_tamara_transaction', 'pos_tamara_notification', 'bus_bus')
+"""
+CONFIRMATION_QUERY = """
+    SELECT tamara_order_id, status, EXTRACT(EPOCH FROM write_date - create_date)
+    FROM pos_tamara_transaction WHERE tamara_order_id = ANY(%s)
+"""
+
+
+class OdooClient:
+    """Minimal JSON-RPC client on /jsonrpc (execute_kw)."""
+
+    def __init__(self, client, db, login, password):
+        self.client = client
+        self.db = db
+        self.login = login
+        self.password = password
+        self.uid = None
+        self.calls = {}
+
+    async def _call(self, service, method, *args):
+        response = await self.client.post("/jsonrpc", json={
+            "jsonrpc": "2.0", "method": "call", "id": uuid.uuid4().hex,
+            "params": {"service": service, "method": method, "args": args},
+        })
+        response.raise_for_status()
+        body = response.json()
+        if body.get("error"):
+            raise RuntimeError(body["error"].get("data", {}).get("message") or body["error"])
+        return body["result"]
+
+    async def authenticate(self):
+        self.uid = await self._call("common", "authenticate", self.db, self.login, self.password, {})
+        if not self.uid:
+            raise RuntimeError("Authentication failed for %s" % self.login)
+
+    async def execute(self, model, method, *args, **kwargs):
+        key = "%s.%s" % (model, method)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        return await self._call("object", "execute_kw", self.db, self.uid, self.password, model, method, list(args), kwargs)
+
+
+async def setup_sessions(odoo, options):
+    """Find or create the Tamara payment method, POS configs and open sessions."""
+    method_name = "LOADTEST Tamara"
+    method_ids = await odoo.execute("pos.payment.method", "search", [("name", "=", method_name)], limit=1)
+    vals = {
+        "name": method_name,
+        "use_payment_terminal": "tamara",
+        "tamara_api_token": "loadtest",
+        "tamara_test_mode": True,
+        "tamara_demo_mode": False,
+        "tamara_notification_token": options.notification_token,
+    }
+    if method_ids:
+        method_id = method_ids[0]
+        [current] = await odoo.execute("pos.payment.method", "read", method_ids, list(vals))
+        changes = {field: value for field, value in vals.items() if current[field] != value}
+        # Odoo refuses to write a payment method used by open sessions
+        if changes and await odoo.execute("pos.session", "search_count", [
+            ("config_id.payment_method_ids", "in", method_ids), ("state", "!=", "closed"),
+        ]):
+            raise SystemExit(
+                "%s must change (%s) but LOADTEST sessions are still open: close them, "
+                "or rerun with the previous options" % (method_name, ", ".join(sorted(changes))))
+        if changes:
+            await odoo.execute("pos.payment.method", "write", method_ids, changes)
+    else:
+        method_id = await odoo.execute("pos.payment.method", "create", vals)
+
+    sessions = []
+    for index in range(options.terminals):
+        name = "LOADTEST-POS-%03d" % (index + 1)
+        config_ids = await odoo.execute("pos.config", "search", [("name", "=", name)], limit=1)
+        if config_ids:
+            config_id = config_ids[0]
+            await odoo.execute("pos.config", "write", [config_id], {"payment_method_ids": [(4, method_id)]})
+        else:
+            config_id = await odoo.execute("pos.config", "create", {
+                "name": name, "payment_method_ids": [(4, method_id)],
+            })
+        session_ids = await odoo.execute("pos.session", "search", [
+            ("config_id", "=", config_id), ("state", "!=", "closed"),
+        ], limit=1)
+        session_id = session_ids[0] if session_ids else await odoo.execute("pos.session", "create", {
+            "config_id": config_id,
+        })
+        sessions.append(session_id)
+    return method_id, sessions
+
+
+class Benchmark:
+
+    def __init__(self, options, odoo, method_id):
+        self.options = options
+        self.odoo = odoo
+        self.method_id = method_id
+        self.confirmations = {}
+        self.pending = {}
+        self.errors = 0
+        self.timeouts = 0
+
+    async def _wait_for_status(self, order_id, started):
+        """Fallback polling; with --dsn the push is seen in the database first."""
+        deadline = started + self.options.payment_timeout
+        next_poll = time.monotonic() + self.options.poll_interval
+        while time.monotonic() < deadline:
+            if order_id in self.confirmations:
+                return
+            if time.monotonic() >= next_poll:
+                next_poll += self.options.poll_interval
+                try:
+                    response = await self.odoo.execute(
+                        "pos.payment.method", "proxy_tamara_poll", [self.method_id], {"order_id": order_id})
+                except (httpx.HTTPError, RuntimeError):
+                    response = None
+                if response and response.get("status") in FINAL_STATUSES:
+                    self.confirmations.setdefault(order_id, time.monotonic() - started)
+                    return
+            await asyncio.sleep(0.05)
+        self.timeouts += 1
+
+    async def _terminal(self, session_id):
+        for _i in range(self.options.payments):
+            reference = "%s--%s" % (uuid.uuid4(), session_id)
+            started = time.monotonic()
+            try:
+                response = await self.odoo.execute("pos.payment.method", "proxy_tamara_checkout", [self.method_id], {
+                    "phone_number": "+966500000000", "amount": 100.0, "currency": "SAR",
+                    "order_reference": reference,
+                })
+            except (httpx.HTTPError, RuntimeError):
+                self.errors += 1
+                continue
+            if response.get("error") or not response.get("order_id"):
+                self.errors += 1
+                continue
+            self.pending[response["order_id"]] = started
+            await self._wait_for_status(response["order_id"], started)
+            self.pending.pop(response["order_id"], None)
+
+    async def _watch_database(self, stop):
+        """Mark payments confirmed as soon as their transaction row is final (the push)."""
+        connection = psycopg2.connect(self.options.dsn)
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cr:
+
+                def fetch(order_ids):
+                    cr.execute(CONFIRMATION_QUERY, (order_ids,))
+                    return cr.fetchall()
+
+                while not stop.is_set():
+                    order_ids = list(self.pending)
+                    if order_ids:
+                        for order_id, status, _seconds in await asyncio.to_thread(fetch, order_ids):
+                            if status in FINAL_STATUSES and order_id in self.pending:
+                                self.confirmations.setdefault(order_id, time.monotonic() - self.pending[order_id])
+                    await asyncio.sleep(0.1)
+        finally:
+            connection.close()
+
+    async def run(self, sessions):
+        stop = asyncio.Event()
+        watcher = None
+        if self.options.dsn and not self.options.poll_only:
+            watcher = asyncio.create_task(self._watch_database(stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(self._terminal(session_id) for session_id in sessions))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        if watcher:
+            await watcher
+        return elapsed
+
+
+def read_db_stats(dsn):
+    connection = psycopg2.connect(dsn)
+    try:
+        with connection.cursor() as cr:
+            cr.execute(DB_STATS_QUERY)
+            database = cr.fetchone()
+            cr.execute(TABLE_STATS_QUERY)
+            tables = {name: (inserted, updated) for name, inserted, updated in cr.fetchall()}
+    finally:
+        connection.close()
+    return database, tables
+
+
+def db_stats_delta(before, after):
+    (db_before, tables_before), (db_after, tables_after) = before, after
+    result = {
+        "db_commits": db_after[0] - db_before[0],
+        "db_rows_inserted": db_after[1] - db_before[1],
+        "db_rows_updated": db_after[2] - db_before[2],
+        "db_rows_deleted": db_after[3] - db_before[3],
+    }
+    for name, (inserted, updated) in tables_after.items():
+        old_inserted, old_updated = tables_before.get(name, (0, 0))
+        result["%s_inserted" % name] = inserted - old_inserted
+        result["%s_updated" % name] = updated - old_updated
+    return result
+
+
+def percentiles(values):
+    if len(values) < 2:
+        return {}
+    cuts = statistics.quantiles(values, n=100)
+    return {
+        "confirmation_p50_s": round(cuts[49], 2),
+        "confirmation_p95_s": round(cuts[94], 2),
+        "confirmation_p99_s": round(cuts[98], 2),
+        "confirmation_max_s": round(max(values), 2),
+    }
+
+
+async def main_async(options):
+    async with httpx.AsyncClient(base_url=options.url, timeout=options.timeout,
+                                 limits=httpx.Limits(max_connections=options.terminals + 2)) as client:
+        odoo = OdooClient(client, options.db, options.login, options.password)
+        await odoo.authenticate()
+        method_id, sessions = await setup_sessions(odoo, options)
+        odoo.calls.clear()
+
+        mock_before = (await client.get(options.mock_url + "/stats")).json() if options.mock_url else {}
+        db_before = read_db_stats(options.dsn) if options.dsn else None
+        benchmark = Benchmark(options, odoo, method_id)
+        elapsed = await benchmark.run(sessions)
+        # Let the last webhooks land before reading the counters
+        await asyncio.sleep(options.settle)
+        db_after = read_db_stats(options.dsn) if options.dsn else None
+        mock_after = (await client.get(options.mock_url + "/stats")).json() if options.mock_url else {}
+
+    payments = options.terminals * options.payments
+    summary = {
+        "terminals": options.terminals,
+        "payments": payments,
+        "poll_interval_s": options.poll_interval,
+        "elapsed_s": round(elapsed, 2),
+        "confirmed": len(benchmark.confirmations),
+        "timeouts": benchmark.timeouts,
+        "checkout_errors": benchmark.errors,
+        "rpc_calls": dict(odoo.calls),
+        "rpc_calls_per_payment": round(sum(odoo.calls.values()) / payments, 2) if payments else 0,
+    }
+    summary.update(percentiles(list(benchmark.confirmations.values())))
+    if options.mock_url:
+        summary["tamara_api_calls"] = {
+            key: value - mock_before.get(key, 0) for key, value in mock_after.items()
+            if key not in ("orders", "webhook_ms_total") and value - mock_before.get(key, 0)
+        }
+    if options.dsn:
+        summary.update(db_stats_delta(db_before, db_after))
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8069", help="Odoo base URL")
+    parser.add_argument("--db", required=True, help="Odoo database")
+    parser.add_argument("--login", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--terminals", type=int, default=10, help="Simulated POS terminals, one session each")
+    parser.add_argument("--payments", type=int, default=5, help="Payments per terminal, one after the other")
+    parser.add_argument("--poll-interval", type=float, default=45, help="Fallback polling interval in seconds")
+    parser.add_argument("--poll-only", action="store_true", help="Ignore the push, confirm by polling only")
+    parser.add_argument("--payment-timeout", type=float, default=300, help="Give up on a payment after this")
+    parser.add_argument("--notification-token", default="loadtest-token",
+                        help="Same as tamara_mock.py --notification-token")
+    parser.add_argument("--mock-url", default="http://127.0.0.1:8098", help="tamara_mock.py URL, for its /stats")
+    parser.add_argument("--dsn", help="PostgreSQL DSN of the Odoo database: push detection and DB writes")
+    parser.add_argument("--settle", type=float, default=2, help="Seconds to wait for late webhooks")
+    parser.add_argument("--timeout", type=float, default=60, help="RPC timeout in seconds")
+    parser.add_argument("--json", dest="json_path", help="Also write the summary to this file")
+    options = parser.parse_args(argv)
+    if options.dsn and psycopg2 is None:
+        parser.error("--dsn requires psycopg2")
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    summary = asyncio.run(main_async(options))
+    print(json.dumps(summary, indent=2))
+    if options.json_path:
+        with open(options.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if not summary["timeouts"] and not summary["checkout_errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
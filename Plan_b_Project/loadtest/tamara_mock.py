@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+
+"""
+Local mock of the Tamara API with configurable latency, error rate and webhooks.
+
+Supports checkout, order status, authorise, capture, cancel and refund. After
+a checkout the simulated customer pays (or declines) after --pay-after-ms,
+and the mock posts the order status to the checkout's notification URL,
+signed with --notification-token like Tamara does.
+
+Point Odoo at it with `pos_tamara_api_url = http://127.0.0.1:8098` in
+odoo.conf. GET /stats returns the number of requests served per endpoint.
+
+    python tamara_mock.py --port 8098 --latency-ms 150 --jitter-ms 100 --error-rate 0.01 \\
+        --pay-after-ms 3000 --notification-token loadtest-token
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROUTES = [
+    ("POST", re.compile(r"^/checkout$"), "checkout"),
+    ("GET", re.compile(r"^/orders/(?P<order_id>[^/]+)$"), "get_order"),
+    ("POST", re.compile(r"^/orders/(?P<order_id>[^/]+)/authorise$"), "authorise"),
+    ("POST", re.compile(r"^/orders/(?P<order_id>[^/]+)/cancel$"), "cancel"),
+    ("POST", re.compile(r"^/payments/capture$"), "capture"),
+    ("POST", re.compile(r"^/merchants/orders/(?P<order_id>[^/]+)/refund$"), "refund"),
+]
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def make_notification_token(secret, ttl=300):
+    """HS256 JWT as Tamara signs its notifications with."""
+    header = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    payload = _b64encode(json.dumps({"iss": "Tamara", "exp": int(time.time()) + ttl}).encode())
+    signature = hmac.new(secret.encode(), ("%s.%s" % (header, payload)).encode(), hashlib.sha256).digest()
+    return "%s.%s.%s" % (header, payload, _b64encode(signature))
+
+
+class TamaraMockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, options):
+        super().__init__(address, TamaraMockHandler)
+        self.options = options
+        self.lock = threading.Lock()
+        self.orders = {}
+        self.stats = Counter()
+        self.webhooks = ThreadPoolExecutor(max_workers=options.webhook_workers)
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def schedule_payment(self, order_id):
+        options = self.options
+        if random.random() < options.timeout_rate:
+            return
+        delay = (options.pay_after_ms + random.uniform(0, options.pay_jitter_ms)) / 1000.0
+        timer = threading.Timer(delay, self.webhooks.submit, args=(self.complete_payment, order_id))
+        timer.daemon = True
+        timer.start()
+
+    def complete_payment(self, order_id):
+        with self.lock:
+            order = self.orders[order_id]
+            if order["status"] != "new":
+                return
+            order["status"] = "declined" if random.random() < self.options.decline_rate else "approved"
+            order = dict(order)
+        for _attempt in range(1 + self.options.webhook_duplicates):
+            self.send_webhook(order)
+
+    def send_webhook(self, order):
+        url = self.options.webhook_url or order["notification_url"]
+        if not url:
+            return
+        if self.options.notification_token:
+            separator = "&" if "?" in url else "?"
+            url += separator + urllib.parse.urlencode({
+                "tamaraToken": make_notification_token(self.options.notification_token),
+            })
+        body = json.dumps({
+            "order_id": order["order_id"],
+            "order_reference_id": order["order_reference_id"],
+            "order_status": order["status"],
+            "event_type": "order_%s" % order["status"],
+            "transaction_id": "TXN-%s" % order["order_id"][:12],
+            "payment_type": "PAY_BY_INSTALMENTS",
+            "total_amount": order["total_amount"],
+        }).encode()
+        request = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": "application/json"})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+            self.count("webhook_sent")
+        except (urllib.error.URLError, OSError):
+            self.count("webhook_failed")
+        with self.lock:
+            self.stats["webhook_ms_total"] += int((time.perf_counter() - start) * 1000)
+
+
+class TamaraMockHandler(BaseHTTPRequestHandler):
+    server_version = "TamaraMock/1.0"
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _dispatch(self, method):
+        path = urllib.parse.urlparse(self.path).path.rstrip("/") or "/"
+        if method == "GET" and path == "/stats":
+            with self.server.lock:
+                stats = dict(self.server.stats)
+                stats["orders"] = len(self.server.orders)
+            return self._send_json(200, stats)
+        body = self._read_json() if method == "POST" else {}
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                break
+        else:
+            return self._send_json(404, {"message": "Not found"})
+
+        options = self.server.options
+        self.server.count(name)
+        time.sleep((options.latency_ms + random.uniform(0, options.jitter_ms)) / 1000.0)
+        if random.random() < options.error_rate:
+            self.server.count("errors")
+            return self._send_json(503, {"message": "Simulated Tamara outage"})
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            return self._send_json(401, {"message": "Unauthorized"})
+        getattr(self, "_handle_%s" % name)(body, **match.groupdict())
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _get_order(self, order_id):
+        with self.server.lock:
+            order = self.server.orders.get(order_id)
+            return dict(order) if order else None
+
+    def _set_status(self, order_id, status, allowed):
+        with self.server.lock:
+            order = self.server.orders.get(order_id)
+            if not order or order["status"] not in allowed:
+                return None
+            order["status"] = status
+            return dict(order)
+
+    def _handle_checkout(self, body):
+        order_id = str(uuid.uuid4())
+        order = {
+            "order_id": order_id,
+            "order_reference_id": body.get("order_reference_id"),
+            "total_amount": body.get("total_amount") or {},
+            "notification_url": (body.get("merchant_url") or {}).get("notification"),
+            "status": "new",
+        }
+        with self.server.lock:
+            self.server.orders[order_id] = order
+        self.server.schedule_payment(order_id)
+        self._send_json(200, {
+            "order_id": order_id,
+            "checkout_id": str(uuid.uuid4()),
+            "checkout_url": "http://%s:%s/checkout/%s" % (self.server.server_address + (order_id,)),
+            "status": "new",
+        })
+
+    def _handle_get_order(self, body, order_id):
+        order = self._get_order(order_id)
+        if not order:
+            return self._send_json(404, {"message": "Order not found"})
+        self._send_json(200, {
+            "order_id": order_id,
+            "order_reference_id": order["order_reference_id"],
+            "status": order["status"],
+            "total_amount": order["total_amount"],
+        })
+
+    def _handle_authorise(self, body, order_id):
+        order = self._set_status(order_id, "authorised", ("approved",))
+        if not order:
+            return self._send_json(409, {"message": "Order is not approved"})
+        self._send_json(200, {"order_id": order_id, "status": "authorised"})
+
+    def _handle_capture(self, body):
+        order_id = body.get("order_id")
+        order = self._set_status(order_id, "fully_captured", ("authorised",))
+        if not order:
+            return self._send_json(409, {"message": "Order is not authorised"})
+        self._send_json(200, {"order_id": order_id, "capture_id": str(uuid.uuid4()), "status": "fully_captured"})
+
+    def _handle_cancel(self, body, order_id):
+        order = self._set_status(order_id, "canceled", ("new", "approved", "authorised"))
+        if not order:
+            return self._send_json(409, {"message": "Order cannot be cancelled"})
+        self._send_json(200, {"order_id": order_id, "cancel_id": str(uuid.uuid4()), "status": "canceled"})
+
+    def _handle_refund(self, body, order_id):
+        if not self._get_order(order_id):
+            return self._send_json(404, {"message": "Order not found"})
+        self._send_json(200, {"order_id": order_id, "refund_id": str(uuid.uuid4()), "status": "approved"})
+
+    def log_message(self, format, *args):
+        if not self.server.options.quiet:
+            super().log_message(format, *args)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--latency-ms", type=float, default=150, help="Base latency of every API call")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Random extra latency, up to this")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of API calls answered with 503")
+    parser.add_argument("--pay-after-ms", type=float, default=3000, help="Time the customer takes to pay")
+    parser.add_argument("--pay-jitter-ms", type=float, default=2000)
+    parser.add_argument("--decline-rate", type=float, default=0.05, help="Share of payments declined")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Share of customers who never pay")
+    parser.add_argument("--webhook-url", help="Send webhooks here instead of the checkout's notification URL")
+    parser.add_argument("--webhook-duplicates", type=int, default=0, help="Resend every webhook this many times")
+    parser.add_argument("--webhook-workers", type=int, default=8, help="Concurrent webhook deliveries")
+    parser.add_argument("--notification-token", default="loadtest-token",
+                        help="Sign webhooks with this notification token, Odoo rejects unsigned ones")
+    parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    server = TamaraMockServer((options.host, options.port), options)
+    print("Tamara mock listening on http://%s:%s" % (options.host, options.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.webhooks.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,8 @@ Configuration:
     'website': 'https://www.yourcompany.com',
     'depends': ['point_of_sale'],
     'data': [
+        'security/ir.model.access.csv',
+        'data/ir_cron.xml',
         'views/pos_payment_method_views.xml',
     ],
     'assets': {
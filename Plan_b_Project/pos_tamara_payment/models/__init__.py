@@ -1,2 +1,4 @@
 # -*- coding: utf-8 -*-
 from . import pos_payment_method
+from . import pos_tamara_transaction
+from . import pos_tamara_notification
@@ -7,9 +7,16 @@ from datetime import timedelta
 
 from odoo import fields, models, api, _
 from odoo.exceptions import ValidationError, UserError, AccessDenied
+from odoo.tools import config
+
+from .pos_tamara_transaction import TAMARA_FINAL_STATUSES
+from ..tools.tamara_http import CircuitOpenError, tamara_request
 
 _logger = logging.getLogger(__name__)
 
+# odoo.conf key to send Tamara API calls to a local mock server (load tests only)
+CONFIG_KEY_TAMARA_API_URL = 'pos_tamara_api_url'
+
 
 class PosPaymentMethod(models.Model):
     _inherit = 'pos.payment.method'
@@ -25,6 +32,12 @@ class PosPaymentMethod(models.Model):
         copy=False,
         groups='base.group_erp_manager'
     )
+    tamara_notification_token = fields.Char(
+        string="Notification Token",
+        help="Token from the Tamara merchant dashboard used to verify webhook notifications",
+        copy=False,
+        groups='base.group_erp_manager'
+    )
     tamara_test_mode = fields.Boolean(
         string="Test Mode",
         help="Use Tamara sandbox environment for testing",
@@ -38,12 +51,6 @@ class PosPaymentMethod(models.Model):
         readonly=True,
         store=False
     )
-    tamara_latest_response = fields.Char(
-        string="Latest Response",
-        help="Buffer for latest webhook notification from Tamara",
-        copy=False,
-        groups='base.group_erp_manager'
-    )
     tamara_demo_mode = fields.Boolean(
         string="Demo Mode",
         help="Enable demo/simulation mode for testing without real Tamara credentials. "
@@ -76,12 +83,17 @@ class PosPaymentMethod(models.Model):
             else:
                 record.tamara_webhook_url = False
 
-    @api.constrains('use_payment_terminal', 'tamara_api_token', 'tamara_demo_mode')
+    @api.constrains('use_payment_terminal', 'tamara_api_token', 'tamara_notification_token', 'tamara_demo_mode')
     def _check_tamara_credentials(self):
-        """Validate that API token is provided when Tamara is selected (unless demo mode)"""
+        """Validate that API and notification tokens are provided when Tamara is selected (unless demo mode)"""
         for record in self:
-            if record.use_payment_terminal == 'tamara' and not record.tamara_demo_mode and not record.tamara_api_token:
+            if record.use_payment_terminal != 'tamara' or record.tamara_demo_mode:
+                continue
+            if not record.tamara_api_token:
                 raise ValidationError(_('API Token is required for Tamara payment method (or enable Demo Mode for testing)'))
+            if not record.tamara_notification_token:
+                raise ValidationError(_('Notification Token is required for Tamara payment method, '
+                                        'webhooks cannot be verified without it (or enable Demo Mode for testing)'))
 
     @api.constrains('tamara_demo_delay')
     def _check_demo_delay(self):
@@ -90,10 +102,18 @@ class PosPaymentMethod(models.Model):
             if record.tamara_demo_delay < 1 or record.tamara_demo_delay > 30:
                 raise ValidationError(_('Demo delay must be between 1 and 30 seconds'))
 
+    def _get_tamara_api_url(self):
+        """Get Tamara API base URL based on test mode, unless overridden in odoo.conf"""
+        self.ensure_one()
+        mock_url = config.get(CONFIG_KEY_TAMARA_API_URL)
+        if mock_url:
+            return mock_url.rstrip('/')
+        return 'https://api-sandbox.tamara.co' if self.sudo().tamara_test_mode else 'https://api.tamara.co'
+
     def _get_tamara_endpoints(self):
         """Get Tamara API endpoints based on test mode"""
         self.ensure_one()
-        base_url = 'https://api-sandbox.tamara.co' if self.sudo().tamara_test_mode else 'https://api.tamara.co'
+        base_url = self._get_tamara_api_url()
 
         return {
             'checkout': f'{base_url}/checkout',
@@ -103,10 +123,6 @@ class PosPaymentMethod(models.Model):
             'get_order': f'{base_url}/orders/{{order_id}}',
         }
 
-    def _is_write_forbidden(self, fields):
-        """Allow webhook to update tamara_latest_response even when POS session is open"""
-        return super(PosPaymentMethod, self)._is_write_forbidden(fields - {'tamara_latest_response'})
-
     def _call_tamara_api(self, endpoint, method='POST', data=None):
         """
         Make authenticated API call to Tamara
@@ -121,8 +137,7 @@ class PosPaymentMethod(models.Model):
         """
         self.ensure_one()
 
-        base_url = 'https://api-sandbox.tamara.co' if self.sudo().tamara_test_mode else 'https://api.tamara.co'
-        url = f"{base_url}{endpoint}"
+        base_url = self._get_tamara_api_url()
 
         headers = {
             'Authorization': f'Bearer {self.sudo().tamara_api_token}',
@@ -134,7 +149,8 @@ class PosPaymentMethod(models.Model):
             _logger.info('Tamara API request data: %s', pprint.pformat(data))
 
         try:
-            response = requests.request(method, url, json=data, headers=headers, timeout=10)
+            # Pooled keep-alive session; GETs are retried, and calls fail fast while Tamara is down
+            response = tamara_request(method, base_url, endpoint, json=data, headers=headers)
 
             if response.status_code == 401:
                 _logger.error('Tamara API authentication failed')
@@ -153,6 +169,9 @@ class PosPaymentMethod(models.Model):
             else:
                 return {'success': True, 'status_code': response.status_code}
 
+        except CircuitOpenError:
+            _logger.warning('Tamara API unavailable, circuit breaker open: %s %s', method, endpoint)
+            return {'error': {'message': _('Tamara is temporarily unavailable. Please try again in a moment.')}}
         except requests.exceptions.Timeout:
             _logger.error('Tamara API request timeout')
             return {'error': {'message': _('Request timeout. Please try again.')}}
@@ -189,62 +208,6 @@ class PosPaymentMethod(models.Model):
             'demo_mode': True
         }
 
-    def proxy_tamara_poll(self, data):
-        """
-        Poll Tamara payment status
-        RPC method called from POS frontend
-        """
-        self.ensure_one()
-        if not self.env.user.has_group('point_of_sale.group_pos_user'):
-            raise AccessDenied()
-
-        order_id = data.get('order_id')
-        if not order_id:
-            return {'error': {'message': _('Order ID is required')}}
-
-        _logger.info("Polling status for order: %s", order_id)
-
-        # Check if demo mode - simulate polling logic using timestamp
-        if self.sudo().tamara_demo_mode:
-            import time
-            
-            # Check if this is a time-encoded demo order
-            if order_id.startswith('DEMO-'):
-                try:
-                    parts = order_id.split('-')
-                    # Format: DEMO-{timestamp}-{random}
-                    if len(parts) >= 3:
-                        start_time = int(parts[1])
-                        current_time = int(time.time())
-                        elapsed = current_time - start_time
-                        
-                        delay = self.tamara_demo_delay or 5
-                        
-                        if elapsed >= delay:
-                            # Time passed! Return final status
-                            status = 'approved' if self.tamara_demo_outcome == 'approve' else 'declined'
-                            if self.tamara_demo_outcome == 'timeout':
-                                return {'status': 'initiated', 'demo_mode': True}
-
-                            return {
-                                'status': status,
-                                'transaction_id': f'DEMO-TXN-{order_id}',
-                                'payment_type': 'PAY_BY_INSTALMENTS',
-                                'total_amount': {'amount': 100.0, 'currency': 'SAR'},
-                                'demo_mode': True
-                            }
-                except (ValueError, IndexError):
-                    _logger.warning("Failed to parse demo order timestamp: %s", order_id)
-            
-            # If not ready yet or parsing failed
-            return {'status': 'initiated', 'demo_mode': True}
-
-        # Real Mode: Call Tamara API
-        endpoint = f"/orders/{order_id}"
-        response = self.sudo()._call_tamara_api(endpoint, 'GET')
-        
-        return response
-
     def proxy_tamara_checkout(self, data):
         """
         Create Tamara checkout session and send SMS payment link
@@ -257,7 +220,9 @@ class PosPaymentMethod(models.Model):
 
         # Check if demo mode - simulate checkout
         if self.sudo().tamara_demo_mode:
-            return self.sudo()._simulate_tamara_checkout(data)
+            response = self.sudo()._simulate_tamara_checkout(data)
+            self._track_tamara_transaction(response['order_id'], data['order_reference'], response)
+            return response
 
         # Build Tamara checkout request
         checkout_data = {
@@ -303,6 +268,8 @@ class PosPaymentMethod(models.Model):
         if 'error' in response:
             return response
 
+        self._track_tamara_transaction(response.get('order_id'), data['order_reference'], response)
+
         return {
             'order_id': response.get('order_id'),
             'checkout_url': response.get('checkout_url'),
@@ -403,21 +370,48 @@ class PosPaymentMethod(models.Model):
         RPC method called from POS frontend for polling
 
         Returns:
-            dict: Latest webhook notification or False
+            dict: Latest notification of this payment method or False
         """
         self.ensure_one()
         if not self.env.user.has_group('point_of_sale.group_pos_user'):
             raise AccessDenied()
 
-        latest_response = self.sudo().tamara_latest_response
-        latest_response = json.loads(latest_response) if latest_response else False
-        return latest_response
+        transaction = self.env['pos.tamara.transaction'].sudo().search(
+            [('payment_method_id', '=', self.id)], limit=1)
+        return transaction._get_status_response() if transaction else False
+
+    @api.model
+    def _get_tamara_notification_tokens(self):
+        """Notification tokens of all Tamara payment methods, to verify webhooks"""
+        methods = self.sudo().search([('use_payment_terminal', '=', 'tamara')])
+        return [token for token in methods.mapped('tamara_notification_token') if token]
+
+    @api.model
+    def _get_tamara_pos_session(self, order_reference):
+        """Get the POS session from an order reference in format 'uuid--session_id'"""
+        try:
+            session_id = int(order_reference.split('--')[1])
+        except (AttributeError, IndexError, ValueError):
+            return self.env['pos.session']
+        return self.env['pos.session'].sudo().browse(session_id).exists()
+
+    def _track_tamara_transaction(self, order_id, order_reference, data):
+        """Record the status of a Tamara payment of this method, if its POS session is known"""
+        self.ensure_one()
+        Transaction = self.env['pos.tamara.transaction'].sudo()
+        transaction = Transaction._find(order_id)
+        pos_session = transaction.pos_session_id or self._get_tamara_pos_session(order_reference)
+        if not pos_session:
+            _logger.warning('No POS session found for Tamara order %s', order_id)
+            return Transaction
+        return Transaction._record_status(order_id, pos_session, self, data, order_reference=order_reference)
 
     def proxy_tamara_poll(self, data):
         """
         Poll Tamara payment status
         
-        RPC method called from POS frontend
+        RPC method called from POS frontend. The stored transaction is checked
+        first, so Tamara is only called while no final status is known.
         
         Args:
             data: dict with 'order_id'
@@ -437,28 +431,23 @@ class PosPaymentMethod(models.Model):
         if not order_id:
             return {'error': {'message': _('Order ID is required')}}
 
+        transaction = self.env['pos.tamara.transaction'].sudo()._find(order_id)
+        if transaction.status in TAMARA_FINAL_STATUSES:
+            return transaction._get_status_response()
+
         # Check if demo mode - simulate polling logic with state management
         if self.sudo().tamara_demo_mode:
             _logger.info('DEMO MODE: Polling payment status for order: %s', order_id)
 
-            # First check if we already have a completed response
-            latest = self.sudo().tamara_latest_response
-            if latest:
-                try:
-                    resp = json.loads(latest)
-                    if resp.get('order_id') == order_id:
-                        _logger.info('DEMO MODE: Found existing response for order: %s', order_id)
-                        return resp
-                except:
-                    pass
-
             # If timeout outcome configured, keep returning pending
             if self.tamara_demo_outcome == 'timeout':
                 _logger.info('DEMO MODE: Timeout scenario - returning pending')
                 return {'status': 'pending', 'demo_mode': True}
 
-            # Otherwise simulate instant approval/decline (polling fallback)
-            # This ensures payment works even if cron fails
+            # Customer "pays" once the configured delay has passed since checkout
+            if transaction and fields.Datetime.now() - transaction.create_date < timedelta(seconds=self.sudo().tamara_demo_delay or 5):
+                return {'status': 'pending', 'demo_mode': True}
+
             status = 'approved' if self.tamara_demo_outcome == 'approve' else 'declined'
             fake_order_id = order_id.split('--')[0] if '--' in order_id else order_id
 
@@ -475,10 +464,15 @@ class PosPaymentMethod(models.Model):
             }
 
             _logger.info('DEMO MODE: Polling returned %s status', status)
+            if transaction:
+                transaction._record_status(order_id, transaction.pos_session_id, self, webhook_data)
             return webhook_data
 
         # Real Mode: Call Tamara API
         endpoint = f"/orders/{order_id}"
         response = self.sudo()._call_tamara_api(endpoint, 'GET')
-        
+
+        if transaction and 'error' not in response and response.get('status') in TAMARA_FINAL_STATUSES:
+            transaction._record_status(order_id, transaction.pos_session_id, self, response)
+
         return response
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+import psycopg2
+
+from odoo import fields, models, api
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
+
+_logger = logging.getLogger(__name__)
+
+NOTIFICATION_RETENTION_DAYS = 30
+PROCESS_BATCH_SIZE = 100
+# Transient failures (serialization, deadlock, lock timeout) are retried by later runs
+PROCESS_MAX_ATTEMPTS = 5
+PROCESS_RETRY_DELAY_SECONDS = 10
+
+
+class PosTamaraNotification(models.Model):
+    """
+    Webhook notification received from Tamara
+
+    The webhook only stores the notification and acknowledges it; the cron
+    applies it to the POS transaction and notifies the terminal. Tamara
+    retries a notification until it is acknowledged, the unique event key
+    makes every retry after the first one a no-op.
+    """
+    _name = 'pos.tamara.notification'
+    _description = 'POS Tamara Webhook Notification'
+    _order = 'id'
+
+    event_key = fields.Char(string="Event Key", required=True, readonly=True,
+                            help="Tamara event id, or a hash of the order, its status and the event type and time")
+    tamara_order_id = fields.Char(string="Tamara Order ID", readonly=True, index=True)
+    payload = fields.Text(string="Payload", required=True, readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Processed'),
+        ('error', 'Error'),
+    ], string="State", default='pending', required=True, readonly=True, index=True)
+    error = fields.Text(string="Error", readonly=True)
+    attempts = fields.Integer(string="Attempts", readonly=True, default=0,
+                              help="Runs that failed on a transient error, the notification is retried until the limit")
+
+    _sql_constraints = [
+        ('event_key_uniq', 'unique (event_key)', 'A Tamara notification is only stored once'),
+    ]
+
+    @api.model
+    def _get_event_key(self, data):
+        """
+        Identify a notification across Tamara's retries
+
+        Without an event id, the event type and time are hashed with the order
+        and status: retries repeat them, while a later event reaching the same
+        status again is still stored.
+        """
+        if data.get('event_id'):
+            return str(data['event_id'])
+        status = data.get('status') or data.get('order_status')
+        event_time = data.get('event_time') or data.get('created_at') or data.get('timestamp')
+        return hashlib.sha256(json.dumps(
+            [data.get('order_id'), status, data.get('event_type'), event_time], default=str,
+        ).encode()).hexdigest()
+
+    @api.model
+    def _enqueue(self, data):
+        """
+        Store a notification for processing, unless it was received before
+
+        Args:
+            data: Notification payload received from Tamara
+
+        Returns:
+            bool: False if the notification is a duplicate
+        """
+        vals = {
+            'event_key': self._get_event_key(data),
+            'tamara_order_id': data.get('order_id'),
+            'payload': json.dumps(data),
+        }
+        try:
+            with self.env.cr.savepoint():
+                self.sudo().create(vals)
+        except psycopg2.IntegrityError:
+            _logger.info('Duplicate Tamara notification ignored for order: %s', vals['tamara_order_id'])
+            return False
+        self.env.ref('pos_tamara_payment.ir_cron_process_tamara_notifications').sudo()._trigger()
+        return True
+
+    @api.model
+    def _process_pending(self, limit=PROCESS_BATCH_SIZE):
+        """
+        Cron: apply stored notifications, oldest first
+
+        A concurrency error (e.g. the transaction row upserted by a poll at the
+        same time) would fail the same way again in this transaction's
+        snapshot, so the notification stays pending for a later run; other
+        errors are final.
+        """
+        cron = self.env.ref('pos_tamara_payment.ir_cron_process_tamara_notifications').sudo()
+        notifications = self.sudo().search([('state', '=', 'pending')], limit=limit)
+        retry = False
+        for notification in notifications:
+            try:
+                with self.env.cr.savepoint():
+                    notification._process()
+                    notification.state = 'done'
+            except psycopg2.OperationalError as e:
+                if e.pgcode not in PG_CONCURRENCY_ERRORS_TO_RETRY:
+                    raise
+                attempts = notification.attempts + 1
+                if attempts < PROCESS_MAX_ATTEMPTS:
+                    _logger.info('Tamara notification %s hit a concurrency error, retrying later', notification.id)
+                    notification.write({'attempts': attempts, 'error': str(e)})
+                    retry = True
+                else:
+                    _logger.error('Tamara notification %s still failing after %d attempts', notification.id, attempts)
+                    notification.write({'attempts': attempts, 'state': 'error', 'error': str(e)})
+            except Exception as e:
+                _logger.exception('Failed to process Tamara notification %s', notification.id)
+                notification.write({'state': 'error', 'error': str(e)})
+        if len(notifications) == limit:
+            cron._trigger()
+        elif retry:
+            cron._trigger(at=fields.Datetime.now() + timedelta(seconds=PROCESS_RETRY_DELAY_SECONDS))
+
+    def _process(self):
+        """Record the status on the POS transaction and push it to the terminal"""
+        self.ensure_one()
+        data = json.loads(self.payload)
+        order_id = data.get('order_id')
+        order_reference = data.get('order_reference_id') or order_id
+        status = data.get('status') or data.get('order_status')
+
+        _logger.info('Processing Tamara payment notification for order: %s, status: %s', order_id, status)
+
+        PaymentMethod = self.env['pos.payment.method'].sudo()
+        transaction = self.env['pos.tamara.transaction'].sudo()._find(order_id)
+        pos_session = transaction.pos_session_id or PaymentMethod._get_tamara_pos_session(order_reference)
+        if not pos_session:
+            _logger.warning('Could not find POS session for order reference: %s', order_reference)
+            return
+
+        payment_method = transaction.payment_method_id or PaymentMethod.search([
+            ('use_payment_terminal', '=', 'tamara'),
+            ('id', 'in', pos_session.config_id.payment_method_ids.ids),
+        ], limit=1)
+        if not payment_method:
+            _logger.warning('No Tamara payment method found for POS session: %s', pos_session.id)
+            return
+
+        # Store the status on this payment's own row for the polling fallback
+        self.env['pos.tamara.transaction'].sudo()._record_status(
+            order_id, pos_session, payment_method, data, order_reference=order_reference)
+
+        # Notify POS frontend via WebSocket
+        total_amount = data.get('total_amount') or {}
+        pos_session.config_id._notify('TAMARA_LATEST_RESPONSE', {
+            'config_id': pos_session.config_id.id,
+            'order_id': order_id,
+            'order_reference': order_reference,
+            'status': status,
+            'transaction_id': data.get('transaction_id'),
+            'payment_type': data.get('payment_type'),
+            'amount': total_amount.get('amount'),
+            'currency': total_amount.get('currency'),
+        })
+
+    @api.model
+    def _gc_processed(self):
+        """Cron: delete processed notifications past the retention period"""
+        limit_date = fields.Datetime.now() - timedelta(days=NOTIFICATION_RETENTION_DAYS)
+        self.sudo().search([('state', '=', 'done'), ('create_date', '<', limit_date)]).unlink()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+
+from odoo import fields, models, api
+
+_logger = logging.getLogger(__name__)
+
+TAMARA_FINAL_STATUSES = ('approved', 'declined', 'expired', 'failed', 'canceled')
+
+
+class PosTamaraTransaction(models.Model):
+    """
+    State of one Tamara payment started from a POS terminal
+
+    One row per Tamara order and POS session, created at checkout and updated
+    by the webhook or by polling. Concurrent payments on the same payment
+    method each write their own row, and the terminal looks up its status by
+    Tamara order id instead of parsing a shared buffer.
+    """
+    _name = 'pos.tamara.transaction'
+    _description = 'POS Tamara Transaction'
+    _order = 'id desc'
+
+    tamara_order_id = fields.Char(string="Tamara Order ID", required=True, readonly=True, index=True)
+    order_reference = fields.Char(string="Order Reference", readonly=True, index=True,
+                                  help="POS order reference sent to Tamara (uuid--session_id)")
+    pos_session_id = fields.Many2one('pos.session', string="POS Session", required=True, readonly=True,
+                                     index=True, ondelete='cascade')
+    payment_method_id = fields.Many2one('pos.payment.method', string="Payment Method", readonly=True,
+                                        ondelete='cascade')
+    status = fields.Char(string="Status", readonly=True, default='initiated')
+    transaction_id = fields.Char(string="Transaction ID", readonly=True)
+    response = fields.Text(string="Latest Response", readonly=True,
+                           help="Latest notification or status received for this payment")
+
+    _sql_constraints = [
+        ('tamara_order_session_uniq', 'unique (tamara_order_id, pos_session_id)',
+         'A Tamara order can only be tracked once per POS session'),
+    ]
+
+    @api.model
+    def _find(self, tamara_order_id, pos_session=None):
+        """
+        Get the transaction of a Tamara order
+
+        Args:
+            tamara_order_id: Tamara order id, or the order reference of older notifications
+            pos_session: pos.session record to narrow the lookup, optional
+
+        Returns:
+            pos.tamara.transaction record, possibly empty
+        """
+        if not tamara_order_id:
+            return self.browse()
+        domain = ['|', ('tamara_order_id', '=', tamara_order_id), ('order_reference', '=', tamara_order_id)]
+        if pos_session:
+            domain.append(('pos_session_id', '=', pos_session.id))
+        return self.sudo().search(domain, limit=1)
+
+    @api.model
+    def _record_status(self, tamara_order_id, pos_session, payment_method, data, order_reference=None):
+        """
+        Create or update the transaction of a Tamara order with a new status
+
+        Args:
+            tamara_order_id: Tamara order id
+            pos_session: pos.session record the payment belongs to
+            payment_method: pos.payment.method record
+            data: Notification or status dict received from Tamara
+            order_reference: POS order reference, optional
+
+        Returns:
+            pos.tamara.transaction record
+        """
+        vals = {
+            'payment_method_id': payment_method.id,
+            'response': json.dumps(data, default=str),
+        }
+        status = data.get('status') or data.get('order_status')
+        if status:
+            vals['status'] = status
+        if data.get('transaction_id'):
+            vals['transaction_id'] = data['transaction_id']
+        if order_reference:
+            vals['order_reference'] = order_reference
+
+        transaction = self._find(tamara_order_id, pos_session)
+        if transaction:
+            if transaction.status in TAMARA_FINAL_STATUSES and vals.get('status') != transaction.status:
+                # Late or out-of-order notification, keep the final status
+                _logger.info('Tamara order %s already %s, ignoring status %s',
+                             tamara_order_id, transaction.status, vals.get('status'))
+                return transaction
+            transaction.write(vals)
+            return transaction
+
+        return self._upsert_status(tamara_order_id, pos_session, vals)
+
+    @api.model
+    def _upsert_status(self, tamara_order_id, pos_session, vals):
+        """
+        Insert the transaction, or update the row a concurrent request created
+
+        Under REPEATABLE READ a row committed after our snapshot is invisible to
+        a search, so creating and catching the unique violation would lose the
+        status. ON CONFLICT updates that row instead, or fails with a
+        serialization error that makes Odoo retry the whole request.
+        """
+        self.flush_model()
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            INSERT INTO pos_tamara_transaction AS t
+                (tamara_order_id, pos_session_id, payment_method_id, status, transaction_id,
+                 order_reference, response, create_uid, create_date, write_uid, write_date)
+            VALUES (%(tamara_order_id)s, %(pos_session_id)s, %(payment_method_id)s,
+                    COALESCE(%(status)s, 'initiated'), %(transaction_id)s, %(order_reference)s,
+                    %(response)s, %(uid)s, %(now)s, %(uid)s, %(now)s)
+            ON CONFLICT (tamara_order_id, pos_session_id) DO UPDATE SET
+                payment_method_id = EXCLUDED.payment_method_id,
+                status = COALESCE(%(status)s, t.status),
+                transaction_id = COALESCE(EXCLUDED.transaction_id, t.transaction_id),
+                order_reference = COALESCE(EXCLUDED.order_reference, t.order_reference),
+                response = EXCLUDED.response,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+            -- Late or out-of-order notification, keep the final status
+            WHERE t.status NOT IN %(final_statuses)s OR t.status = %(status)s
+            RETURNING id
+        """, {
+            'tamara_order_id': tamara_order_id,
+            'pos_session_id': pos_session.id,
+            'payment_method_id': vals['payment_method_id'],
+            'status': vals.get('status'),
+            'transaction_id': vals.get('transaction_id'),
+            'order_reference': vals.get('order_reference'),
+            'response': vals['response'],
+            'uid': self.env.uid,
+            'now': now,
+            'final_statuses': TAMARA_FINAL_STATUSES,
+        })
+        row = self.env.cr.fetchone()
+        self.invalidate_model()
+        if not row:
+            _logger.info('Tamara order %s already final, ignoring status %s', tamara_order_id, vals.get('status'))
+            return self._find(tamara_order_id, pos_session)
+        return self.sudo().browse(row[0])
+
+    def _get_status_response(self):
+        """Latest response of a final transaction, in the format the terminal expects"""
+        self.ensure_one()
+        result = json.loads(self.response) if self.response else {}
+        result.update({
+            'order_id': self.tamara_order_id,
+            'status': self.status,
+            'transaction_id': self.transaction_id or result.get('transaction_id'),
+        })
+        return result
@@ -2,10 +2,18 @@ import { _t } from "@web/core/l10n/translation";
 import { PaymentInterface } from "@point_of_sale/app/payment/payment_interface";
 import { AlertDialog } from "@web/core/confirmation_dialog/confirmation_dialog";
 
+// Statuses are pushed by the webhook over the bus; polling only catches missed notifications
+const FALLBACK_POLL_INTERVAL_MS = 45000;
+const DEMO_POLL_INTERVAL_MS = 5000;
+const PAYMENT_TIMEOUT_MS = 300000; // 5 minutes
+export const FINAL_STATUSES = ['approved', 'declined', 'expired', 'failed', 'canceled'];
+
 export class PaymentTamara extends PaymentInterface {
     setup() {
         super.setup(...arguments);
         this.paymentLineResolvers = {};
+        this.paymentLineTimers = {};
+        this.env.services.bus_service.addEventListener("reconnect", () => this._tamara_poll_pending());
     }
 
     /**
@@ -46,6 +54,15 @@ export class PaymentTamara extends PaymentInterface {
         super.send_payment_cancel(order, uuid);
 
         const line = order.payment_ids.find(pl => pl.uuid === uuid);
+        if (line) {
+            // Stop the fallback polling and timeout of the cancelled payment
+            this._clear_payment_timers(line);
+            const resolver = this.paymentLineResolvers[line.uuid];
+            if (resolver) {
+                delete this.paymentLineResolvers[line.uuid];
+                resolver(false);
+            }
+        }
         if (line && line.uiState?.tamaraOrderId) {
             try {
                 await this.pos.data.silentCall(
@@ -176,6 +193,7 @@ export class PaymentTamara extends PaymentInterface {
                 line.uiState = {};
             }
             line.uiState.tamaraOrderId = response.order_id;
+            line.uiState.tamaraOrderReference = data.order_reference;
 
             console.log('Tamara checkout created:', response.order_id);
 
@@ -187,7 +205,7 @@ export class PaymentTamara extends PaymentInterface {
             }
 
             // Wait for webhook notification
-            return this.waitForPaymentConfirmation(line);
+            return this.waitForPaymentConfirmation(line, response.demo_mode);
 
         } catch (error) {
             console.error('Tamara checkout error:', error);
@@ -198,54 +216,85 @@ export class PaymentTamara extends PaymentInterface {
 
     /**
      * Wait for payment confirmation via webhook
-     * Returns promise that resolves when webhook is received
+     * Returns promise that resolves when the webhook's bus notification is
+     * received (see pos_store.js). Polling is only a slow fallback for missed
+     * notifications, e.g. while the bus was disconnected.
      */
-    waitForPaymentConfirmation(line) {
+    waitForPaymentConfirmation(line, demoMode = false) {
         return new Promise((resolve) => {
             // Store resolver to be called by webhook handler
             this.paymentLineResolvers[line.uuid] = resolve;
 
-            // Start polling timer (every 5 seconds)
-            const pollIntervalMs = 5000;
-            const pollTimer = setInterval(async () => {
-                if (!this.paymentLineResolvers[line.uuid]) {
-                    clearInterval(pollTimer);
-                    return;
-                }
-
-                try {
-                    const response = await this.pos.data.silentCall(
-                        'pos.payment.method',
-                        'proxy_tamara_poll',
-                        [[this.payment_method_id.id], { order_id: line.uiState.tamaraOrderId }]
-                    );
-
-                    // Check if we got a final status
-                    if (response && ['approved', 'declined', 'expired', 'failed', 'canceled'].includes(response.status)) {
-                        console.log('Tamara polling status update:', response);
-                        this.handleTamaraStatusResponse(line, response);
-                    }
-                } catch (error) {
-                    console.error('Tamara polling failed:', error);
-                    // Continue polling even if one request fails
-                }
-            }, pollIntervalMs);
+            // Demo mode has no webhook, polling is the only way to get a status
+            const pollIntervalMs = demoMode ? DEMO_POLL_INTERVAL_MS : FALLBACK_POLL_INTERVAL_MS;
+            const pollTimer = setInterval(() => this._tamara_poll_status(line), pollIntervalMs);
 
             // Set strict timeout: 5 minutes
-            const timeoutMs = 300000; // 5 minutes
-            setTimeout(() => {
-                clearInterval(pollTimer); // Stop polling
+            const timeoutTimer = setTimeout(() => {
                 if (this.paymentLineResolvers[line.uuid]) {
                     // Timeout reached, payment not completed
+                    this._clear_payment_timers(line);
                     delete this.paymentLineResolvers[line.uuid];
                     this._show_error(_t('Payment timeout. Customer did not complete payment within 5 minutes.'));
                     line.set_payment_status('retry');
                     resolve(false);
                 }
-            }, timeoutMs);
+            }, PAYMENT_TIMEOUT_MS);
+
+            this.paymentLineTimers[line.uuid] = { pollTimer, timeoutTimer };
         });
     }
 
+    /**
+     * Ask the backend for the status of a pending payment
+     * Fallback for a missed bus notification; does nothing once resolved
+     */
+    async _tamara_poll_status(line) {
+        if (!this.paymentLineResolvers[line.uuid]) {
+            this._clear_payment_timers(line);
+            return;
+        }
+
+        try {
+            const response = await this.pos.data.silentCall(
+                'pos.payment.method',
+                'proxy_tamara_poll',
+                [[this.payment_method_id.id], { order_id: line.uiState.tamaraOrderId }]
+            );
+
+            // The webhook may have resolved the line while the call was running
+            if (this.paymentLineResolvers[line.uuid] && response && FINAL_STATUSES.includes(response.status)) {
+                console.log('Tamara polling status update:', response);
+                this.handleTamaraStatusResponse(line, response);
+            }
+        } catch (error) {
+            console.error('Tamara polling failed:', error);
+            // Continue polling even if one request fails
+        }
+    }
+
+    /**
+     * Poll every pending payment right away
+     * Called when the bus reconnects, as notifications sent meanwhile are lost
+     */
+    _tamara_poll_pending() {
+        const order = this.pos.get_order();
+        for (const line of order?.payment_ids || []) {
+            if (this.paymentLineResolvers[line.uuid]) {
+                this._tamara_poll_status(line);
+            }
+        }
+    }
+
+    _clear_payment_timers(line) {
+        const timers = this.paymentLineTimers[line.uuid];
+        if (timers) {
+            clearInterval(timers.pollTimer);
+            clearTimeout(timers.timeoutTimer);
+            delete this.paymentLineTimers[line.uuid];
+        }
+    }
+
     /**
      * Handle webhook notification response
      * Called by WebSocket listener when payment status updates
@@ -268,6 +317,7 @@ export class PaymentTamara extends PaymentInterface {
         }
 
         // Resolve waiting promise
+        this._clear_payment_timers(line);
         const resolver = this.paymentLineResolvers[line.uuid];
         if (resolver) {
             delete this.paymentLineResolvers[line.uuid];
@@ -1,22 +1,26 @@
 import { patch } from "@web/core/utils/patch";
 import { PosStore } from "@point_of_sale/app/store/pos_store";
+import { FINAL_STATUSES } from "@pos_tamara_payment/app/payment_tamara";
 
 patch(PosStore.prototype, {
     async setup() {
         await super.setup(...arguments);
 
         // Connect to WebSocket to receive Tamara payment notifications
+        // This is the primary status channel; the terminal only polls as a fallback
         this.data.connectWebSocket("TAMARA_LATEST_RESPONSE", (payload) => {
             // Only process notifications for this POS config
             if (payload.config_id === this.config.id) {
                 console.log('Tamara WebSocket notification received:', payload);
 
-                // Find the payment line by Tamara order_id
+                // Find the payment line by Tamara order_id (or our order reference)
                 const paymentLine = this.models["pos.payment"].find(
-                    line => line.uiState?.tamaraOrderId === payload.order_id
+                    line => line.uiState?.tamaraOrderId === payload.order_id ||
+                        (payload.order_reference && line.uiState?.tamaraOrderReference === payload.order_reference)
                 );
 
                 if (paymentLine &&
+                    FINAL_STATUSES.includes(payload.status) &&
                     !paymentLine.is_done() &&
                     paymentLine.get_payment_status() !== 'retry') {
 
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+from . import tamara_http
+from . import tamara_signature
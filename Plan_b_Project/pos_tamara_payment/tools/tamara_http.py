@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Shared HTTP plumbing for the Tamara API
+
+- one pooled keep-alive requests.Session per worker process, so calls reuse
+  the TLS connection instead of handshaking every time
+- bounded retries with jittered backoff, for idempotent GETs only
+- a circuit breaker per Tamara host that fails fast while Tamara is degraded
+"""
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds
+TAMARA_TIMEOUT = (3.05, 10)
+POOL_MAXSIZE = 16
+
+# Retries apply to GET only: a retried POST could create a second checkout
+RETRY_METHODS = {'GET'}
+RETRY_STATUSES = {502, 503, 504}
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.3
+RETRY_BACKOFF_MAX = 2.0
+
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Tamara while its circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Closed: calls go through. After `failure_threshold` failures in a row it
+    opens and rejects calls for `reset_timeout` seconds; then a single trial
+    call is let through (half-open), which closes it again on success.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go to Tamara now"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return
+            if state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return
+            raise CircuitOpenError()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._trial_running:
+                    _logger.warning('Tamara circuit breaker opened after %d failures', self.failures)
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+_local = {'pid': None, 'session': None, 'breakers': {}}
+_local_lock = threading.Lock()
+
+
+def _get_state():
+    """Per-process session and breakers; a forked worker must not share sockets"""
+    with _local_lock:
+        if _local['pid'] != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _local.update(pid=os.getpid(), session=session, breakers={})
+        return _local
+
+
+def get_breaker(base_url):
+    state = _get_state()
+    with _local_lock:
+        return state['breakers'].setdefault(base_url, CircuitBreaker())
+
+
+def _backoff(attempt):
+    """Exponential backoff with full jitter, so retries of many workers spread out"""
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** attempt))
+
+
+def tamara_request(method, base_url, endpoint, **kwargs):
+    """
+    Send a request to Tamara through the pooled session
+
+    Args:
+        method: HTTP method
+        base_url: Tamara host, one circuit breaker per host
+        endpoint: API endpoint path (e.g., '/checkout')
+        **kwargs: Passed to requests.Session.request
+
+    Returns:
+        requests.Response: The last response, possibly a 5xx
+
+    Raises:
+        CircuitOpenError: If Tamara failed repeatedly and is not called
+        requests.exceptions.RequestException: If the last attempt failed
+    """
+    session = _get_state()['session']
+    breaker = get_breaker(base_url)
+    breaker.before_call()
+    kwargs.setdefault('timeout', TAMARA_TIMEOUT)
+    retries = MAX_RETRIES if method.upper() in RETRY_METHODS else 0
+
+    for attempt in range(retries + 1):
+        try:
+            response = session.request(method, f"{base_url}{endpoint}", **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt < retries:
+                _logger.info('Tamara %s %s failed, retry %d/%d', method, endpoint, attempt + 1, retries)
+                time.sleep(_backoff(attempt))
+                continue
+            breaker.record_failure()
+            raise
+        except requests.exceptions.RequestException:
+            breaker.record_failure()
+            raise
+
+        if response.status_code in RETRY_STATUSES and attempt < retries:
+            _logger.info('Tamara %s %s returned %s, retry %d/%d',
+                         method, endpoint, response.status_code, attempt + 1, retries)
+            time.sleep(_backoff(attempt))
+            continue
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Verification of the token Tamara signs its notifications with
+
+Tamara sends a JWT signed (HS256) with the merchant's notification token,
+either as the `tamaraToken` query parameter or as a Bearer Authorization
+header. Only HS256 is accepted.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+def verify_notification_token(token, secret, leeway=60):
+    """
+    Check the signature and expiry of a Tamara notification token
+
+    Args:
+        token: JWT received with the notification
+        secret: Notification token of the merchant
+        leeway: Clock skew allowed on exp, in seconds
+
+    Returns:
+        bool: True if the token is signed with secret and not expired
+    """
+    if not token or not secret:
+        return False
+    try:
+        header_b64, payload_b64, signature_b64 = token.split('.')
+        header = json.loads(_b64decode(header_b64))
+        payload = json.loads(_b64decode(payload_b64))
+        signature = _b64decode(signature_b64)
+    except (ValueError, TypeError):
+        return False
+
+    if header.get('alg') != 'HS256':
+        return False
+    expected = hmac.new(secret.encode(), f'{header_b64}.{payload_b64}'.encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, signature):
+        return False
+    exp = payload.get('exp') if isinstance(payload, dict) else None
+    return not (isinstance(exp, (int, float)) and exp + leeway < time.time())
@@ -14,6 +14,7 @@
         'data/payment_method_data.xml',
         'data/payment_provider_data.xml',
         'data/tamara_correction.xml',
+        'data/ir_cron.xml',
     ],
     'assets': {
         'web.assets_frontend': [
@@ -0,0 +1,16 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+# Mapping of transaction states to Tamara order statuses.
+STATUS_MAPPING = {
+    'pending': ('new',),
+    'approved': ('approved',),
+    'authorized': ('authorised',),
+    'done': ('fully_captured', 'captured'),
+    'cancel': ('canceled', 'expired'),
+    'error': ('declined',),
+}
+
+# Pending transactions are only reconciled once Tamara had time to notify us, and for a limited time.
+RECONCILIATION_DELAY_MINUTES = 10
+RECONCILIATION_MAX_AGE_DAYS = 7
+RECONCILIATION_PAGE_SIZE = 50
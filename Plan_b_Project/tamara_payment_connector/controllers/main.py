@@ -1,9 +1,17 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+import base64
+import hashlib
+import hmac
+import json
 import logging
 import pprint
+import time
+
+from werkzeug.exceptions import Forbidden
 
 from odoo import _, http
+from odoo.exceptions import ValidationError
 from odoo.http import request
 
 _logger = logging.getLogger(__name__)
@@ -25,20 +33,114 @@ class TamaraController(http.Controller):
 
     @http.route('/payment/tamara/return', type='http', auth='public', csrf=False, save_session=False)
     def tamara_return(self, **post):
-        """ Process the return from Tamara (Real or Simulated). """
+        """ Process the return from Tamara (Real or Simulated).
+
+        Anyone can call this route, so only the reference and the outcome shown to the customer are
+        passed on: the order status is only taken from the webhook or the reconciliation cron, and
+        the simulated outcome is ignored outside test mode.
+        """
         _logger.info('Tamara: entering return handler with data %s', pprint.pformat(post))
-        
+        notification_data = {
+            key: post[key] for key in ('order_reference', 'paymentStatus', 'payment_outcome') if key in post
+        }
+
         _logger.info('Tamara: dispatching to _handle_notification_data')
-        request.env['payment.transaction'].sudo()._handle_notification_data('tamara', post)
+        request.env['payment.transaction'].sudo()._handle_notification_data('tamara', notification_data)
         
         _logger.info('Tamara: redirecting to status page')
         return request.redirect('/payment/status')
 
-    @http.route('/payment/tamara/webhook', type='http', auth='public', methods=['POST'], csrf=False)
-    def tamara_webhook(self, **post):
-        """ Process Webhook from Tamara. """
-        _logger.info("Tamara: processing webhook not implemented for simulation mode")
-        return 'OK'
+    @http.route(_webhook_url, type='http', auth='public', methods=['POST'], csrf=False)
+    def tamara_webhook(self, **kwargs):
+        """ Process the notification data sent by Tamara to the webhook.
+
+        The transaction is settled from the order status, so that it does not depend on the
+        customer's browser coming back. Transactions whose notification never arrives are settled
+        by the reconciliation cron. Without a notification token to verify the notification, the
+        status is read from Tamara's order API instead of the notification body.
+
+        :return: An empty JSON response to acknowledge the notification.
+        :rtype: odoo.http.Response
+        """
+        data = request.get_json_data()
+        _logger.info("Tamara: notification received from Tamara with data:\n%s", pprint.pformat(data))
+        event_type = data.get('event_type') or ''
+        order_status = data.get('order_status') or event_type.removeprefix('order_')
+        notification_data = {
+            'order_reference': data.get('order_reference_id'),
+            'tamara_order_id': data.get('order_id'),
+            'tamara_order_status': 'fully_captured' if order_status == 'captured' else order_status,
+        }
+        try:
+            tx_sudo = request.env['payment.transaction'].sudo()._get_tx_from_notification_data(
+                'tamara', notification_data
+            )
+            if not self._verify_notification_token(tx_sudo) and not tx_sudo.provider_id.tamara_test_mode:
+                if not tx_sudo.provider_reference:
+                    raise ValidationError("Tamara: " + _("No order to check the notification against."))
+                order_data = tx_sudo.provider_id._tamara_make_request(
+                    f'/orders/{tx_sudo.provider_reference}', method='GET'
+                )
+                notification_data.update({
+                    'tamara_order_id': tx_sudo.provider_reference,
+                    'tamara_order_status': order_data.get('status'),
+                })
+            tx_sudo.with_context(tamara_verified_status=True)._handle_notification_data(
+                'tamara', notification_data
+            )
+        except ValidationError:  # Acknowledge the notification to avoid getting spammed
+            _logger.exception("Tamara: unable to handle the notification data; skipping to acknowledge")
+        return request.make_json_response('')
+
+    @staticmethod
+    def _verify_notification_token(tx_sudo):
+        """ Check that the notification was signed by Tamara with the provider's notification token.
+
+        Tamara sends a JWT signed with HS256, as the `tamaraToken` query parameter or as a Bearer
+        Authorization header.
+
+        :param recordset tx_sudo: The sudoed transaction referenced by the notification data, as a
+                                  `payment.transaction` record.
+        :return: Whether the token was verified, False if no notification token is configured.
+        :rtype: bool
+        :raise Forbidden: If the token is missing, invalid or expired.
+        """
+        secret = tx_sudo.provider_id.tamara_notification_token
+        if not secret:
+            _logger.warning("Tamara: no notification token configured; the notification is not trusted")
+            return False
+
+        token = request.httprequest.args.get('tamaraToken')
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if not token and authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):]
+        if not token:
+            _logger.warning("Tamara: received notification without token")
+            raise Forbidden()
+
+        def b64decode(segment):
+            return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+        try:
+            header_b64, payload_b64, signature_b64 = token.split('.')
+            header = json.loads(b64decode(header_b64))
+            payload = json.loads(b64decode(payload_b64))
+            signature = b64decode(signature_b64)
+        except (ValueError, TypeError):
+            _logger.warning("Tamara: received notification with malformed token")
+            raise Forbidden()
+
+        expected_signature = hmac.new(
+            secret.encode(), f'{header_b64}.{payload_b64}'.encode(), hashlib.sha256
+        ).digest()
+        if header.get('alg') != 'HS256' or not hmac.compare_digest(signature, expected_signature):
+            _logger.warning("Tamara: received notification with invalid token")
+            raise Forbidden()
+        exp = payload.get('exp') if isinstance(payload, dict) else None
+        if isinstance(exp, (int, float)) and exp < time.time():
+            _logger.warning("Tamara: received notification with expired token")
+            raise Forbidden()
+        return True
 
     @http.route('/payment/tamara/process', type='json', auth='public')
     def tamara_process(self, reference, payment_outcome, payment_details, **kwargs):
@@ -51,5 +153,12 @@ class TamaraController(http.Controller):
             'payment_details': payment_details,
         }
 
-        request.env['payment.transaction'].sudo()._handle_notification_data('tamara', notification_data)
+        # Outside test mode, transactions are only settled by Tamara's notifications
+        tx_sudo = request.env['payment.transaction'].sudo()._get_tx_from_notification_data(
+            'tamara', notification_data
+        )
+        if not tx_sudo.provider_id.tamara_test_mode:
+            raise Forbidden()
+
+        tx_sudo._handle_notification_data('tamara', notification_data)
         return True
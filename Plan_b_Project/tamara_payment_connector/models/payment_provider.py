@@ -1,6 +1,14 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
-from odoo import fields, models
+import logging
+import pprint
+
+import requests
+
+from odoo import _, fields, models
+from odoo.exceptions import ValidationError
+
+_logger = logging.getLogger(__name__)
 
 
 class PaymentProvider(models.Model):
@@ -16,6 +24,11 @@ class PaymentProvider(models.Model):
         required_if_provider='tamara',
         groups='base.group_system',
     )
+    tamara_notification_token = fields.Char(
+        string="Notification Token",
+        help="The token used to verify the notifications and webhooks sent by Tamara",
+        groups='base.group_system',
+    )
     tamara_test_mode = fields.Boolean(
         string="Test Mode",
         help="Run transactions in the test environment.",
@@ -37,3 +50,51 @@ class PaymentProvider(models.Model):
         if self.code != 'tamara':
             return default_codes
         return {'tamara'}
+
+    # === BUSINESS METHODS === #
+
+    def _tamara_get_api_url(self):
+        """ Return the URL of the Tamara API, the sandbox one when the provider is in test state.
+
+        Note: With `tamara_test_mode`, the checkout is simulated locally and the API is not called.
+
+        :return: The API URL.
+        :rtype: str
+        """
+        self.ensure_one()
+        return 'https://api-sandbox.tamara.co' if self.state == 'test' else 'https://api.tamara.co'
+
+    def _tamara_make_request(self, endpoint, payload=None, method='POST'):
+        """ Make a request to the Tamara API at the specified endpoint.
+
+        Note: self.ensure_one()
+
+        :param str endpoint: The endpoint to be reached by the request, e.g. '/checkout'.
+        :param dict payload: The payload of the request.
+        :param str method: The HTTP method of the request.
+        :return: The JSON-formatted content of the response.
+        :rtype: dict
+        :raise ValidationError: If an HTTP error occurs.
+        """
+        self.ensure_one()
+
+        url = f'{self._tamara_get_api_url()}{endpoint}'
+        headers = {'Authorization': f'Bearer {self.tamara_api_token}'}
+        try:
+            response = requests.request(method, url, json=payload, headers=headers, timeout=10)
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError:
+                _logger.exception(
+                    "Invalid API request at %s with data:\n%s", url, pprint.pformat(payload)
+                )
+                raise ValidationError("Tamara: " + _(
+                    "The communication with the API failed. Tamara gave us the following"
+                    " information: %s", response.text
+                ))
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            _logger.exception("Unable to reach endpoint at %s", url)
+            raise ValidationError(
+                "Tamara: " + _("Could not establish the connection to the API.")
+            )
+        return response.json() if response.text else {}
@@ -2,13 +2,15 @@
 
 import logging
 import pprint
+from datetime import timedelta
 
 from werkzeug import urls
 
-from odoo import _, models
+from odoo import _, api, fields, models
 from odoo.exceptions import ValidationError
 
 from odoo.addons.payment import utils as payment_utils
+from odoo.addons.tamara_payment_connector import const
 from odoo.addons.tamara_payment_connector.controllers.main import TamaraController
 
 _logger = logging.getLogger(__name__)
@@ -35,18 +37,76 @@ class PaymentTransaction(models.Model):
         # In this connector, we will redirect to a controller which handles the actual checkout
         # to either Tamara's real API or our Local Simulation.
         
-        simulation_url = urls.url_join(base_url, '/tamara/simulate')
-        
+        if self.provider_id.tamara_test_mode:
+            api_url = urls.url_join(base_url, '/tamara/simulate')
+        else:
+            api_url = self._tamara_create_checkout()
+
         values = {
-            'api_url': simulation_url if self.provider_id.tamara_test_mode else 'https://api.tamara.co/checkout',
+            'api_url': api_url,
             'order_reference': self.reference,
             'amount': self.amount,
             'currency': self.currency_id.name,
             'return_url': redirect_url,
         }
+        if not self.provider_id.tamara_test_mode:
+            values['tamara_checkout_url'] = api_url
         _logger.info("Tamara: prepared processing values: %s", pprint.pformat(values))
         return values
 
+    def _tamara_create_checkout(self):
+        """ Create the checkout session of the transaction on Tamara.
+
+        Tamara's order id is saved as provider reference, to match the webhooks and reconcile the
+        transaction later on.
+
+        Note: self.ensure_one()
+
+        :return: The URL of Tamara's checkout page.
+        :rtype: str
+        """
+        base_url = self.provider_id.get_base_url()
+        return_url = urls.url_join(base_url, TamaraController._return_url)
+        return_url = f'{return_url}?{urls.url_encode({"order_reference": self.reference})}'
+        amount = {'amount': self.amount, 'currency': self.currency_id.name}
+        payload = {
+            'order_reference_id': self.reference,
+            'total_amount': amount,
+            'description': self.reference,
+            'country_code': self.partner_country_id.code or 'SA',
+            'payment_type': 'PAY_BY_INSTALMENTS',
+            'items': [{
+                'name': self.reference,
+                'type': 'Digital',
+                'reference_id': self.reference,
+                'sku': self.reference,
+                'quantity': 1,
+                'total_amount': amount,
+            }],
+            'consumer': {
+                'first_name': self.partner_name or '',
+                'last_name': '',
+                'phone_number': self.partner_phone or '',
+                'email': self.partner_email or '',
+            },
+            'shipping_address': {
+                'first_name': self.partner_name or '',
+                'last_name': '',
+                'line1': self.partner_address or '',
+                'city': self.partner_city or '',
+                'country_code': self.partner_country_id.code or 'SA',
+            },
+            'merchant_url': {
+                'success': return_url,
+                'failure': return_url,
+                'cancel': return_url,
+                'notification': urls.url_join(base_url, TamaraController._webhook_url),
+            },
+        }
+        checkout_data = self.provider_id._tamara_make_request('/checkout', payload=payload)
+        self.provider_reference = checkout_data.get('order_id')
+        return checkout_data.get('checkout_url')
+
     def _get_specific_rendering_values(self, processing_values):
         """ Override of `payment` to return the specific rendering values. """
         res = super()._get_specific_rendering_values(processing_values)
@@ -67,12 +127,16 @@ class PaymentTransaction(models.Model):
         
         _logger.info("Tamara: finding tx from notification data: %s", pprint.pformat(notification_data))
         reference = notification_data.get('order_reference')
-        if not reference:
-             raise ValidationError("Tamara: " + _("Received data with missing reference."))
+        tamara_order_id = notification_data.get('tamara_order_id')
+        if reference:
+            tx = self.search([('reference', '=', reference), ('provider_code', '=', 'tamara')])
+        elif tamara_order_id:
+            tx = self.search([('provider_reference', '=', tamara_order_id), ('provider_code', '=', 'tamara')])
+        else:
+            raise ValidationError("Tamara: " + _("Received data with missing reference."))
 
-        tx = self.search([('reference', '=', reference), ('provider_code', '=', 'tamara')])
         if not tx:
-            raise ValidationError("Tamara: " + _("No transaction found matching reference %s.", reference))
+            raise ValidationError("Tamara: " + _("No transaction found matching reference %s.", reference or tamara_order_id))
         
         _logger.info("Tamara: found transaction %s", tx.reference)
         return tx
@@ -93,6 +157,27 @@ class PaymentTransaction(models.Model):
             self._set_canceled(state_message=_("The customer left the payment page."))
             return
 
+        # Order status from a webhook or from the reconciliation cron
+        if notification_data.get('tamara_order_status'):
+            if not self.provider_id.tamara_test_mode and not self.env.context.get('tamara_verified_status'):
+                _logger.warning("Tamara: ignoring unverified order status for tx %s", self.reference)
+                return
+            if notification_data.get('tamara_order_id') and not self.provider_reference:
+                self.provider_reference = notification_data['tamara_order_id']
+            self._tamara_process_order_status(notification_data['tamara_order_status'])
+            return
+
+        # Customer back from Tamara's checkout page: the webhook settles the transaction
+        if notification_data.get('paymentStatus'):
+            if self.state == 'draft':
+                self._set_pending()
+            return
+
+        # Outcome of the simulated checkout, anyone could send it outside test mode
+        if not self.provider_id.tamara_test_mode:
+            _logger.warning("Tamara: ignoring simulated payment outcome for tx %s", self.reference)
+            return
+
         payment_outcome = notification_data.get('payment_outcome')
 
         # Handle different payment outcomes
@@ -110,3 +195,88 @@ class PaymentTransaction(models.Model):
             _logger.warning("Tamara: payment failed or unknown outcome: %s", payment_outcome)
             self._set_error(_("Payment failed. Status: %s", payment_outcome or "Unknown"))
 
+
+    def _tamara_process_order_status(self, order_status):
+        """ Update the transaction from the status of its Tamara order.
+
+        An approved order is authorised, and an authorised order is captured right away, both
+        through the API. A notification received twice, or after the reconciliation, does nothing.
+
+        Note: self.ensure_one()
+
+        :param str order_status: The status of the Tamara order.
+        :return: None
+        :raise ValidationError: If the authorisation or the capture request fails.
+        """
+        if self.state == 'done':
+            return
+
+        if order_status in const.STATUS_MAPPING['pending']:
+            self._set_pending()
+        elif order_status in const.STATUS_MAPPING['approved']:
+            _logger.info("Tamara: order %s approved, authorising tx %s", self.provider_reference, self.reference)
+            if not self.provider_id.tamara_test_mode:
+                self.provider_id._tamara_make_request(f'/orders/{self.provider_reference}/authorise')
+            self._tamara_process_order_status('authorised')
+        elif order_status in const.STATUS_MAPPING['authorized']:
+            _logger.info("Tamara: order %s authorised, capturing tx %s", self.provider_reference, self.reference)
+            if not self.provider_id.tamara_test_mode:
+                self.provider_id._tamara_make_request('/payments/capture', payload={
+                    'order_id': self.provider_reference,
+                    'total_amount': {'amount': self.amount, 'currency': self.currency_id.name},
+                    'shipping_info': {
+                        'shipped_at': fields.Datetime.now().isoformat(),
+                        'shipping_company': 'N/A',
+                    },
+                })
+            self._set_done()
+        elif order_status in const.STATUS_MAPPING['done']:
+            self._set_done()
+        elif order_status in const.STATUS_MAPPING['cancel']:
+            self._set_canceled()
+        elif order_status in const.STATUS_MAPPING['error']:
+            self._set_error(_("The payment was declined by Tamara."))
+        else:
+            _logger.warning(
+                "Tamara: received unknown order status %s for tx %s", order_status, self.reference
+            )
+
+    @api.model
+    def _cron_tamara_reconcile_pending(self):
+        """ Settle the Tamara transactions whose webhook was missed, from the order API.
+
+        Transactions still pending a while after their checkout are fetched one page at a time
+        and the cursor is committed after each page, so a failure only loses the current page.
+
+        :return: None
+        """
+        now = fields.Datetime.now()
+        domain = [
+            ('provider_code', '=', 'tamara'),
+            ('provider_id.tamara_test_mode', '=', False),
+            ('state', 'in', ('draft', 'pending')),
+            ('provider_reference', '!=', False),
+            ('create_date', '>=', now - timedelta(days=const.RECONCILIATION_MAX_AGE_DAYS)),
+            ('last_state_change', '<=', now - timedelta(minutes=const.RECONCILIATION_DELAY_MINUTES)),
+        ]
+        last_id = 0
+        while True:
+            txs = self.search(
+                domain + [('id', '>', last_id)], order='id', limit=const.RECONCILIATION_PAGE_SIZE
+            )
+            for tx in txs:
+                try:
+                    order_data = tx.provider_id._tamara_make_request(
+                        f'/orders/{tx.provider_reference}', method='GET'
+                    )
+                    tx.with_context(tamara_verified_status=True)._handle_notification_data('tamara', {
+                        'order_reference': tx.reference,
+                        'tamara_order_id': tx.provider_reference,
+                        'tamara_order_status': order_data.get('status'),
+                    })
+                except ValidationError:
+                    _logger.exception("Tamara: could not reconcile tx %s", tx.reference)
+            self.env.cr.commit()
+            if len(txs) < const.RECONCILIATION_PAGE_SIZE:
+                break
+            last_id = txs[-1].id
@@ -40,6 +40,11 @@ PaymentForm.include({
                 providerCode, paymentOptionId, paymentMethodCode, 'direct'
             ),
         }).then(processingValues => {
+            // Live mode: the customer pays on Tamara's checkout page, the webhook settles the transaction
+            if (processingValues.tamara_checkout_url) {
+                window.location = processingValues.tamara_checkout_url;
+                return new Promise(() => {});
+            }
             // Simulate immediate payment processing
             return rpc('/payment/tamara/process', {
                 'reference': processingValues.reference,
@@ -1,11 +1,15 @@
+import json
 import logging
-from datetime import date
+
+from werkzeug.exceptions import abort
 
 from odoo import http
 from odoo.http import request
 
 _logger = logging.getLogger(__name__)
 
+MAX_BULK_CONFIGS = 500
+
 
 class PaymentReminderAPI(http.Controller):
 
@@ -32,6 +36,7 @@ class PaymentReminderAPI(http.Controller):
             "database_uuid": payload.get("database_uuid"),
             "base_url": payload.get("base_url"),
             "name": payload.get("name"),
+            "user_count": payload.get("user_count"),
         }
         client = (
             env["payment.reminder.client"]
@@ -48,80 +53,69 @@ class PaymentReminderAPI(http.Controller):
         csrf=False,
     )
     def get_client_config(self, database_uuid, **kwargs):
-        """Return current notification configuration for a client identified by database_uuid."""
-
+        """Return current notification configuration for a client identified by database_uuid.
 
+        The configuration is precomputed on the client record (see
+        payment.reminder.client._refresh_banner_state), this only looks it up.
+        """
         env = request.env
-        if (
-            env["ir.config_parameter"]
-            .sudo()
-            .get_param("payment_reminder.role", "client_instance")
-            != "upward_master"
-        ):
+        if not self._is_master(env):
             return {"active": False}
 
-        client = (
-            env["payment.reminder.client"]
-            .sudo()
-            .search([("database_uuid", "=", database_uuid)], limit=1)
+        state, etag = env["payment.reminder.client"].sudo()._get_banner_state([database_uuid]).get(
+            database_uuid, (None, None)
         )
-        if not client or not client.active_notification:
+        if not state:
             return {"active": False}
+        if request.httprequest.if_none_match.contains_raw(etag):
+            # abort() with a response bypasses the JSON-RPC envelope, keeping the 304 status
+            abort(request.make_response("", headers=[("ETag", etag)], status=304))
+        request.future_response.headers["ETag"] = etag
+        return json.loads(state)
 
-        today = date.today()
-        start = client.notification_start_date
-        end = client.notification_end_date
-
-        active = False
-        if start and today >= start and (not end or today <= end):
-            active = True
-
-        days_remaining = None
-        if end:
-            days_remaining = (end - today).days
-
-        color = "green"
-        if days_remaining is not None:
-            if client.red_threshold_days is not None and days_remaining <= client.red_threshold_days:
-                color = "red"
-            elif (
-                client.yellow_threshold_days is not None
-                and days_remaining <= client.yellow_threshold_days
-            ):
-                color = "yellow"
-            elif (
-                client.green_threshold_days is not None
-                and days_remaining <= client.green_threshold_days
-            ):
-                color = "green"
-
-        # Select the correct message based on the determined color
-        selected_message = ""
-        template = None
-        
-        if color == "green":
-            template = client.template_green_id
-        elif color == "yellow":
-            template = client.template_yellow_id
-        elif color == "red":
-            template = client.template_red_id
-
-        if template and template.body:
-            # Inject dynamic placeholders
-            # We use safe format or just replace to avoid errors if placeholder is missing
-            try:
-                # Calculate absolute days for display (e.g. "15 days left")
-                display_days = days_remaining if days_remaining is not None else 0
-                selected_message = template.body.replace("{days}", str(display_days))
-            except Exception:
-                selected_message = template.body
-
-        res = {
-            "active": bool(active),
-            "message": selected_message or "",
-            "color": color,
-            "days_remaining": days_remaining,
-            "start_date": str(start) if start else None,
-            "end_date": str(end) if end else None,
-        }
-        return res
+    @http.route(
+        "/payment_reminder/configs",
+        type="json",
+        auth="public",
+        methods=["POST"],
+        csrf=False,
+    )
+    def get_client_configs(self, database_uuids=None, etags=None, **kwargs):
+        """Return the configuration of several clients at once, e.g. for a proxy in front of them.
+
+        Params:
+            database_uuids: list of client database UUIDs (at most MAX_BULK_CONFIGS)
+            etags: optional {database_uuid: etag} of the configurations already held
+
+        Returns {database_uuid: {"etag": ..., "config": {...}}}; "config" is
+        left out when the given etag is still current, unknown clients get
+        an inactive configuration.
+        """
+        env = request.env
+        if not isinstance(database_uuids, list) or not all(isinstance(uuid, str) for uuid in database_uuids):
+            return {"error": "database_uuids must be a list of strings"}
+        if len(database_uuids) > MAX_BULK_CONFIGS:
+            return {"error": "At most %s database_uuids per request" % MAX_BULK_CONFIGS}
+        if not self._is_master(env):
+            return {uuid: {"etag": None, "config": {"active": False}} for uuid in database_uuids}
+
+        etags = etags if isinstance(etags, dict) else {}
+        states = env["payment.reminder.client"].sudo()._get_banner_state(database_uuids)
+        result = {}
+        for uuid in database_uuids:
+            state, etag = states.get(uuid, (None, None))
+            if not state:
+                result[uuid] = {"etag": None, "config": {"active": False}}
+            elif etags.get(uuid) == etag:
+                result[uuid] = {"etag": etag}
+            else:
+                result[uuid] = {"etag": etag, "config": json.loads(state)}
+        return result
+
+    def _is_master(self, env):
+        return (
+            env["ir.config_parameter"]
+            .sudo()
+            .get_param("payment_reminder.role", "client_instance")
+            == "upward_master"
+        )
@@ -1,3 +1,4 @@
+from . import payment_reminder_banner
 from . import payment_reminder_client
 from . import payment_reminder_settings
 from . import payment_reminder_template
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+import requests
+
+from odoo import SUPERUSER_ID, api, models
+from odoo.modules.registry import Registry
+
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_TTL = 300
+INACTIVE_CONFIG = {"active": False}
+# (connect, read) timeouts of the calls to the master, in seconds
+MASTER_TIMEOUT = (2, 5)
+# After a failure the master is not called for BACKOFF_BASE * 2 ** (failures - 1) seconds, up to BACKOFF_MAX
+BACKOFF_BASE = 60
+BACKOFF_MAX = 1800
+
+# Banner config per database, shared by the requests of this worker:
+# {dbname: {"config": dict, "etag": str, "fetched_at": float, "refreshing": bool}}
+_config_cache = {}
+# Circuit breaker and counters per database, see _get_health()
+_health = {}
+_config_cache_lock = threading.Lock()
+
+
+def _get_health_entry(dbname):
+    """Health entry of dbname; call with _config_cache_lock held."""
+    return _health.setdefault(dbname, {
+        "failures": 0,
+        "open_until": 0.0,
+        "last_error": None,
+        "last_failure_at": None,
+        "last_success_at": None,
+        "requests": 0,
+        "served_stale": 0,
+        "short_circuited": 0,
+        "refreshes": 0,
+        "refresh_failures": 0,
+        "not_modified": 0,
+    })
+
+
+class PaymentReminderBanner(models.AbstractModel):
+    _name = "payment.reminder.banner"
+    _description = "Payment Reminder Banner (Client Side)"
+
+    @api.model
+    def _get_banner_config(self):
+        """Return the banner configuration of this database without waiting for the master.
+
+        The config fetched from the master is cached per database for
+        `payment_reminder.config_ttl` seconds. Once expired, the cached config
+        is still served while a background thread revalidates it with the
+        master (If-None-Match). The last config received is also stored in a
+        system parameter, so a restarted worker has something to serve at once.
+        Only a database that never received a config waits for the master.
+        """
+        params = self.env["ir.config_parameter"].sudo()
+        # If this database is the master itself, never show the banner.
+        if params.get_param("payment_reminder.role", "client_instance") == "upward_master":
+            return INACTIVE_CONFIG
+
+        master_url = params.get_param("payment_reminder.master_url")
+        database_uuid = params.get_param("database.uuid")
+        if not master_url or not database_uuid:
+            return INACTIVE_CONFIG
+
+        dbname = self.env.cr.dbname
+        with _config_cache_lock:
+            health = _get_health_entry(dbname)
+            health["requests"] += 1
+            # While the breaker is open the master is known to be down: do not wait for it
+            master_down = time.monotonic() < health["open_until"]
+            entry = _config_cache.get(dbname)
+            if entry is None:
+                stored = self._get_stored_config()
+                if stored:
+                    # Serve it, but revalidate it right away
+                    entry = _config_cache[dbname] = dict(stored, fetched_at=0.0, refreshing=False)
+
+        if entry is None:
+            if master_down:
+                with _config_cache_lock:
+                    health["short_circuited"] += 1
+                return INACTIVE_CONFIG
+            self._refresh_config(dbname, self._get_master_request_values())
+            entry = _config_cache.get(dbname)
+            return entry["config"] if entry else INACTIVE_CONFIG
+
+        if time.monotonic() - entry["fetched_at"] >= self._get_config_ttl():
+            with _config_cache_lock:
+                health["served_stale"] += 1
+                if master_down:
+                    health["short_circuited"] += 1
+                start_refresh = not entry["refreshing"] and not master_down
+                entry["refreshing"] = entry["refreshing"] or start_refresh
+            if start_refresh:
+                threading.Thread(
+                    target=self._refresh_config,
+                    args=(dbname, self._get_master_request_values()),
+                    name="payment_reminder_refresh_%s" % dbname,
+                    daemon=True,
+                ).start()
+        return entry["config"]
+
+    @api.model
+    def _get_config_ttl(self):
+        value = self.env["ir.config_parameter"].sudo().get_param(
+            "payment_reminder.config_ttl", str(DEFAULT_CONFIG_TTL)
+        )
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return DEFAULT_CONFIG_TTL
+
+    @api.model
+    def _get_stored_config(self):
+        """Last config received from the master, as {"config", "etag"} or None."""
+        stored = self.env["ir.config_parameter"].sudo().get_param("payment_reminder.banner_config")
+        try:
+            stored = json.loads(stored) if stored else None
+        except ValueError:
+            return None
+        return stored if isinstance(stored, dict) and "config" in stored else None
+
+    @api.model
+    def _get_master_request_values(self):
+        """Everything the refresh needs from the database, read before leaving the request."""
+        params = self.env["ir.config_parameter"].sudo()
+        return {
+            "master_url": params.get_param("payment_reminder.master_url").rstrip("/"),
+            "database_uuid": params.get_param("database.uuid"),
+        }
+
+    @classmethod
+    def _refresh_config(cls, dbname, values):
+        """Fetch the config from the master and update the cache of dbname.
+
+        Runs in the request for a database without config, in a background
+        thread otherwise; it must not use the request's environment.
+        """
+        with _config_cache_lock:
+            entry = _config_cache.get(dbname) or {}
+            health = _get_health_entry(dbname)
+            health["refreshes"] += 1
+        try:
+            status, config, etag = cls._fetch_master_config(values, entry.get("etag"))
+        except Exception as e:
+            with _config_cache_lock:
+                health["refresh_failures"] += 1
+                health["failures"] += 1
+                backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (health["failures"] - 1))
+                health.update(
+                    open_until=time.monotonic() + backoff,
+                    last_error=str(e),
+                    last_failure_at=time.time(),
+                )
+                if dbname in _config_cache:
+                    _config_cache[dbname]["refreshing"] = False
+            _logger.warning(
+                "Could not fetch payment reminder config from the master, not retrying for %ss: %s", backoff, e
+            )
+            return
+
+        changed = status != 304 and (config != entry.get("config") or etag != entry.get("etag"))
+        with _config_cache_lock:
+            health.update(failures=0, open_until=0.0, last_success_at=time.time())
+            health["not_modified"] += int(status == 304)
+            cached = _config_cache.setdefault(dbname, {"config": config, "etag": etag})
+            if status != 304:
+                cached.update(config=config, etag=etag)
+            cached.update(fetched_at=time.monotonic(), refreshing=False)
+        if changed:
+            cls._store_config(dbname, config, etag)
+
+    @classmethod
+    def _fetch_master_config(cls, values, etag=None):
+        """Call the master; return (status, config, etag), config is None on 304."""
+        master_url = values["master_url"]
+        headers = {
+            "Content-Type": "application/json",
+        }
+
+        # Fetch configuration (JSON-RPC format); registration is left to the cron
+        config_payload = {
+            "jsonrpc": "2.0",
+            "method": "call",
+            "params": {},
+            "id": None,
+        }
+        if etag:
+            headers["If-None-Match"] = etag
+        response = requests.post(
+            f"{master_url}/payment_reminder/config/{values['database_uuid']}",
+            json=config_payload,
+            headers=headers,
+            timeout=MASTER_TIMEOUT,
+        )
+        if response.status_code == 304:
+            return 304, None, etag
+        response.raise_for_status()
+        json_response = response.json()
+        # Extract result from JSON-RPC wrapper
+        data = json_response.get("result", {}) if isinstance(json_response, dict) else {}
+        if not isinstance(data, dict):
+            data = {}
+        # Ensure the JSON has at least the keys we expect.
+        data.setdefault("active", False)
+        data.setdefault("message", "")
+        data.setdefault("color", "green")
+        return response.status_code, data, response.headers.get("ETag") or config_etag(data)
+
+    @api.model
+    def _get_health(self):
+        """Health of the link to the master for this database, in this worker."""
+        dbname = self.env.cr.dbname
+        now = time.monotonic()
+        with _config_cache_lock:
+            health = dict(_get_health_entry(dbname))
+            entry = _config_cache.get(dbname)
+            health.update(
+                circuit="open" if now < health["open_until"] else "closed",
+                retry_in=max(0, round(health.pop("open_until") - now)),
+                cached=bool(entry),
+                cache_age=round(now - entry["fetched_at"]) if entry and entry.get("fetched_at") else None,
+            )
+        return health
+
+    @classmethod
+    def _store_config(cls, dbname, config, etag):
+        try:
+            with Registry(dbname).cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                env["ir.config_parameter"].set_param(
+                    "payment_reminder.banner_config", json.dumps({"config": config, "etag": etag})
+                )
+        except Exception:
+            _logger.exception("Could not store the payment reminder config of %s", dbname)
+
+
+def config_etag(config):
+    """Strong ETag of a banner config, as computed by the master."""
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+    return '"%s"' % digest[:32]
@@ -1,13 +1,27 @@
+import hashlib
 import json
 import logging
+from datetime import date, timedelta
 
 import requests
 
 from odoo import api, fields, models
 
+from .payment_reminder_banner import config_etag
+
 
 _logger = logging.getLogger(__name__)
 
+# Registration is repeated when nothing changed only to keep last_seen current on the master
+REGISTRATION_HEARTBEAT_HOURS = 24
+
+# Fields the precomputed banner state depends on
+BANNER_FIELDS = {
+    "active_notification", "notification_start_date", "notification_end_date",
+    "red_threshold_days", "yellow_threshold_days", "green_threshold_days",
+    "template_green_id", "template_yellow_id", "template_red_id",
+}
+
 
 class PaymentReminderClient(models.Model):
     _name = "payment.reminder.client"
@@ -68,11 +82,134 @@ class PaymentReminderClient(models.Model):
         pass
 
     last_seen = fields.Datetime(string="Last Seen", readonly=True)
+    user_count = fields.Integer(string="Active Users", readonly=True)
+
+    # Banner state served to the client, precomputed for banner_date
+    banner_state = fields.Text(string="Banner State", readonly=True, copy=False)
+    banner_etag = fields.Char(string="Banner ETag", readonly=True, copy=False)
+    banner_date = fields.Date(string="Banner Computed For", readonly=True, copy=False)
 
     _sql_constraints = [
         ("database_uuid_uniq", "unique(database_uuid)", "Database UUID must be unique per client."),
     ]
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        clients = super().create(vals_list)
+        clients._refresh_banner_state()
+        return clients
+
+    def write(self, vals):
+        res = super().write(vals)
+        if BANNER_FIELDS.intersection(vals):
+            self._refresh_banner_state()
+        return res
+
+    def _compute_banner_config(self, today):
+        """Banner configuration of the client on the given day."""
+        self.ensure_one()
+        if not self.active_notification:
+            return {"active": False}
+
+        start = self.notification_start_date
+        end = self.notification_end_date
+
+        active = False
+        if start and today >= start and (not end or today <= end):
+            active = True
+
+        days_remaining = None
+        if end:
+            days_remaining = (end - today).days
+
+        color = "green"
+        if days_remaining is not None:
+            if self.red_threshold_days is not None and days_remaining <= self.red_threshold_days:
+                color = "red"
+            elif (
+                self.yellow_threshold_days is not None
+                and days_remaining <= self.yellow_threshold_days
+            ):
+                color = "yellow"
+            elif (
+                self.green_threshold_days is not None
+                and days_remaining <= self.green_threshold_days
+            ):
+                color = "green"
+
+        # Select the correct message based on the determined color
+        selected_message = ""
+        template = None
+        
+        if color == "green":
+            template = self.template_green_id
+        elif color == "yellow":
+            template = self.template_yellow_id
+        elif color == "red":
+            template = self.template_red_id
+
+        if template and template.body:
+            # Inject dynamic placeholders
+            # We use safe format or just replace to avoid errors if placeholder is missing
+            try:
+                # Calculate absolute days for display (e.g. "15 days left")
+                display_days = days_remaining if days_remaining is not None else 0
+                selected_message = template.body.replace("{days}", str(display_days))
+            except Exception:
+                selected_message = template.body
+
+        return {
+            "active": bool(active),
+            "message": selected_message or "",
+            "color": color,
+            "days_remaining": days_remaining,
+            "start_date": str(start) if start else None,
+            "end_date": str(end) if end else None,
+        }
+
+    def _refresh_banner_state(self, today=None):
+        """Precompute the banner served to each client, with its ETag."""
+        today = today or date.today()
+        for client in self:
+            config = client._compute_banner_config(today)
+            # Plain SQL: the precomputed state is not a user change (no write_date, no recursion)
+            self.env.cr.execute(
+                """UPDATE payment_reminder_client
+                      SET banner_state = %s, banner_etag = %s, banner_date = %s
+                    WHERE id = %s""",
+                (json.dumps(config), config_etag(config), today, client.id),
+            )
+        self.invalidate_recordset(["banner_state", "banner_etag", "banner_date"])
+
+    @api.model
+    def _get_banner_state(self, database_uuids):
+        """Precomputed banner state per database UUID, as {uuid: (state_json, etag)}.
+
+        One indexed lookup; states computed before today are refreshed first.
+        """
+        if not database_uuids:
+            return {}
+        query = """SELECT database_uuid, banner_state, banner_etag, banner_date
+                     FROM payment_reminder_client WHERE database_uuid IN %s"""
+        self.env.cr.execute(query, (tuple(database_uuids),))
+        rows = self.env.cr.fetchall()
+        today = date.today()
+        outdated = [uuid for uuid, state, _etag, banner_date in rows if not state or banner_date != today]
+        if outdated:
+            # The daily cron did not run yet
+            self.sudo().search([("database_uuid", "in", outdated)])._refresh_banner_state(today)
+            self.env.cr.execute(query, (tuple(database_uuids),))
+            rows = self.env.cr.fetchall()
+        return {uuid: (state, etag) for uuid, state, etag, _banner_date in rows}
+
+    @api.model
+    def cron_refresh_banner_state(self):
+        """Cron job executed on the master: recompute every banner for the new day."""
+        params = self.env["ir.config_parameter"].sudo()
+        if params.get_param("payment_reminder.role", "client_instance") != "upward_master":
+            return
+        self.sudo().search([])._refresh_banner_state()
+
     @api.model
     def upsert_from_registration(self, vals):
         """Create or update a client record from a registration payload."""
@@ -91,7 +228,9 @@ class PaymentReminderClient(models.Model):
     def cron_register_self(self):
         """Cron job executed on ALL databases.
 
-        On client instances, it will (re)register the database on the Upward master.
+        On client instances, it will (re)register the database on the Upward master,
+        but only when the registration data changed since the last successful
+        registration, or once a day to keep last_seen current.
         On the master itself, it will simply do nothing.
         """
         params = self.env["ir.config_parameter"].sudo()
@@ -105,6 +244,18 @@ class PaymentReminderClient(models.Model):
         if not master_url or not database_uuid:
             return
 
+        registration = {
+            "database_uuid": database_uuid,
+            "base_url": base_url,
+            "name": self.env.cr.dbname,
+            "user_count": self.env["res.users"].sudo().search_count([("share", "=", False)]),
+        }
+        fingerprint = hashlib.sha256(
+            json.dumps([master_url, registration], sort_keys=True).encode()
+        ).hexdigest()
+        if not self._registration_needed(fingerprint):
+            return
+
         try:
             # Retrieve the shared secret key
             api_key = params.get_param("payment_reminder.api_key", "")
@@ -115,18 +266,33 @@ class PaymentReminderClient(models.Model):
             payload = {
                 "jsonrpc": "2.0",
                 "method": "call",
-                "params": {
-                    "database_uuid": database_uuid,
-                    "base_url": base_url,
-                    "name": self.env.cr.dbname,
-                },
+                "params": registration,
                 "id": None,
             }
             headers = {
                 "Content-Type": "application/json",
                 "X-Odoo-Payment-Reminder-Secret": api_key,
             }
-            requests.post(register_url, json=payload, headers=headers, timeout=5)
+            response = requests.post(register_url, json=payload, headers=headers, timeout=5)
+            response.raise_for_status()
         except Exception as e:
             _logger.exception("Error in cron_register_self while registering client: %s", e)
+            return
 
+        params.set_param("payment_reminder.registration", json.dumps({
+            "fingerprint": fingerprint,
+            "registered_at": fields.Datetime.to_string(fields.Datetime.now()),
+        }))
+
+    @api.model
+    def _registration_needed(self, fingerprint):
+        """Whether the registration data changed or the last registration is too old."""
+        stored = self.env["ir.config_parameter"].sudo().get_param("payment_reminder.registration")
+        try:
+            stored = json.loads(stored) if stored else {}
+            registered_at = fields.Datetime.to_datetime(stored.get("registered_at"))
+        except (ValueError, TypeError, AttributeError):
+            return True
+        if stored.get("fingerprint") != fingerprint or not registered_at:
+            return True
+        return fields.Datetime.now() - registered_at >= timedelta(hours=REGISTRATION_HEARTBEAT_HOURS)
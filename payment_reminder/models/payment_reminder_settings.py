@@ -37,7 +37,12 @@ class PaymentReminderSettings(models.TransientModel):
     def set_values(self):
         super().set_values()
         params = self.env["ir.config_parameter"].sudo()
+        old_values = (params.get_param("payment_reminder.role"), params.get_param("payment_reminder.master_url"))
         params.set_param("payment_reminder.role", self.payment_reminder_role or "client_instance")
         params.set_param("payment_reminder.master_url", self.payment_reminder_master_url or "")
+        new_values = (params.get_param("payment_reminder.role"), params.get_param("payment_reminder.master_url"))
+        if new_values != old_values:
+            # Register with the (new) master now rather than at the next cron run
+            self.env.ref("payment_reminder.ir_cron_payment_reminder_register_self")._trigger()
 
 
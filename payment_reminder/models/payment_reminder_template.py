@@ -19,3 +19,15 @@ class PaymentReminderTemplate(models.Model):
         index=True,
     )
     sequence = fields.Integer(default=10)
+
+    def write(self, vals):
+        res = super().write(vals)
+        if "body" in vals:
+            # The message is part of the banner state precomputed on the clients
+            self.env["payment.reminder.client"].sudo().search([
+                "|", "|",
+                ("template_green_id", "in", self.ids),
+                ("template_yellow_id", "in", self.ids),
+                ("template_red_id", "in", self.ids),
+            ])._refresh_banner_state()
+        return res